@@ -28,7 +28,8 @@ from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from contentstore.tests.modulestore_config import TEST_MODULESTORE
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 
-from xmodule.modulestore import Location, mongo
+from xmodule.modulestore import Location, mongo, search
+from xmodule.modulestore.mongo.item_cache import ItemCache
 from xmodule.modulestore.store_utilities import clone_course
 from xmodule.modulestore.store_utilities import delete_course
 from xmodule.modulestore.django import modulestore
@@ -1776,6 +1777,200 @@ class ContentStoreTest(ModuleStoreTestCase):
 
         self.assertEqual(timedelta(1), new_module.graceperiod)
 
+    def test_incremental_metadata_inheritance(self):
+        module_store = modulestore('direct')
+        import_from_xml(module_store, 'common/test/data/', ['toy'])
+        course_location = Location(['i4x', 'edX', 'toy', 'course', '2012_Fall', None])
+
+        def assert_tree_up_to_date():
+            """The cached tree is the one computed from scratch"""
+            self.assertEqual(
+                module_store.get_cached_metadata_inheritance_tree(course_location),
+                module_store.compute_metadata_inheritance_tree(course_location)['metadata']
+            )
+
+        module_store.refresh_cached_metadata_inheritance_tree(course_location)
+        chapter = module_store.get_items(['i4x', 'edX', 'toy', 'chapter', None, None])[0]
+        html_location = Location('i4x', 'edX', 'toy', 'html', 'new_html')
+        sequential_location = Location('i4x', 'edX', 'toy', 'sequential', 'new_sequential')
+
+        with mock.patch.object(
+            module_store, 'compute_metadata_inheritance_tree', wraps=module_store.compute_metadata_inheritance_tree
+        ) as mock_compute:
+            # a metadata change on a container
+            chapter.xqa_key = 'chapter key'
+            module_store.update_metadata(chapter.location, own_metadata(chapter))
+            # new leaves and containers
+            module_store.create_and_save_xmodule(html_location)
+            module_store.create_and_save_xmodule(sequential_location, metadata={'xqa_key': 'sequential key'})
+            module_store.update_children(sequential_location, [html_location.url()])
+            module_store.update_children(chapter.location, chapter.children + [sequential_location.url()])
+            # a leaf's own metadata isn't inherited
+            module_store.update_metadata(html_location, {'xqa_key': 'html key'})
+            # removed and deleted containers
+            module_store.update_children(chapter.location, chapter.children[1:] + [sequential_location.url()])
+            module_store.delete_item(sequential_location)
+            self.assertFalse(mock_compute.called)
+
+        assert_tree_up_to_date()
+        self.assertNotIn(chapter.children[0], module_store.get_cached_metadata_inheritance_tree(course_location))
+
+    def test_concurrent_inheritance_tree_updates(self):
+        module_store = modulestore('direct')
+        import_from_xml(module_store, 'common/test/data/', ['toy'])
+        course_location = Location(['i4x', 'edX', 'toy', 'course', '2012_Fall', None])
+        module_store.refresh_cached_metadata_inheritance_tree(course_location)
+        module_store.get_cached_metadata_inheritance_tree(course_location)
+        chapters = module_store.get_items(['i4x', 'edX', 'toy', 'chapter', None, None])
+
+        # another process updates the tree, so the copy in this request's cache is stale
+        request_cache = module_store.request_cache
+        module_store.request_cache = None
+        chapters[0].xqa_key = 'other process key'
+        module_store.update_metadata(chapters[0].location, own_metadata(chapters[0]))
+        module_store.request_cache = request_cache
+
+        chapters[1].xqa_key = 'this process key'
+        module_store.update_metadata(chapters[1].location, own_metadata(chapters[1]))
+        self.assertEqual(
+            module_store._read_cached_inheritance_tree(course_location)['metadata'],  # pylint: disable=protected-access
+            module_store.compute_metadata_inheritance_tree(course_location)['metadata']
+        )
+
+    def test_inheritance_tree_lock_timeout(self):
+        module_store = modulestore('direct')
+        import_from_xml(module_store, 'common/test/data/', ['toy'])
+        course_location = Location(['i4x', 'edX', 'toy', 'course', '2012_Fall', None])
+        module_store.refresh_cached_metadata_inheritance_tree(course_location)
+        chapter = module_store.get_items(['i4x', 'edX', 'toy', 'chapter', None, None])[0]
+
+        # a write that can't take the lock drops the tree rather than update it
+        lock_key = mongo.base.inheritance_tree_cache_key('edX', 'toy', 'lock')
+        module_store.metadata_inheritance_cache_subsystem.add(lock_key, 'other process', 10)
+        with mock.patch('xmodule.modulestore.mongo.base.INHERITANCE_TREE_LOCK_TIMEOUT', 0):
+            chapter.xqa_key = 'chapter key'
+            module_store.update_metadata(chapter.location, own_metadata(chapter))
+        module_store.metadata_inheritance_cache_subsystem.delete(lock_key)
+
+        self.assertIsNone(module_store._read_cached_inheritance_tree(course_location))  # pylint: disable=protected-access
+        self.assertEqual(
+            module_store.get_cached_metadata_inheritance_tree(course_location)[chapter.location.url()]['xqa_key'],
+            'chapter key'
+        )
+
+    def test_inheritance_tree_chunks(self):
+        module_store = modulestore('direct')
+        import_from_xml(module_store, 'common/test/data/', ['toy'])
+        course_location = Location(['i4x', 'edX', 'toy', 'course', '2012_Fall', None])
+
+        # large trees are split in chunks that fit in memcached items
+        with mock.patch('xmodule.modulestore.mongo.base.INHERITANCE_TREE_CHUNK_SIZE', 100):
+            module_store.refresh_cached_metadata_inheritance_tree(course_location)
+        head = module_store.metadata_inheritance_cache_subsystem.get(mongo.base.metadata_cache_key(course_location))
+        self.assertGreater(head['chunks'], 1)
+        self.assertEqual(
+            module_store._read_cached_inheritance_tree(course_location)['metadata'],  # pylint: disable=protected-access
+            module_store.compute_metadata_inheritance_tree(course_location)['metadata']
+        )
+
+    def test_parent_locations_cached(self):
+        module_store = modulestore('direct')
+        import_from_xml(module_store, 'common/test/data/', ['toy'])
+        chapters = module_store.get_items(['i4x', 'edX', 'toy', 'chapter', None, None])
+        child = chapters[0].children[0]
+
+        wrapper = MongoCollectionFindWrapper(module_store.collection.find)
+        module_store.collection.find = wrapper.find
+        try:
+            self.assertEqual([Location(parent) for parent in module_store.get_parent_locations(child, None)],
+                             [chapters[0].location])
+            module_store.get_parent_locations(chapters[0].location, None)
+            # one query for the course's parent map
+            self.assertEqual(wrapper.counter, 1)
+
+            # writes are seen straight away
+            module_store.update_children(chapters[1].location, chapters[1].children + [child])
+            self.assertItemsEqual([Location(parent) for parent in module_store.get_parent_locations(child, None)],
+                                  [chapters[0].location, chapters[1].location])
+        finally:
+            module_store.collection.find = wrapper.original
+
+    def test_parent_map_chunks(self):
+        module_store = modulestore('direct')
+        import_from_xml(module_store, 'common/test/data/', ['toy'])
+        chapters = module_store.get_items(['i4x', 'edX', 'toy', 'chapter', None, None])
+        child = chapters[0].children[0]
+
+        # large maps are split in chunks that fit in memcached items
+        with mock.patch('xmodule.modulestore.mongo.base.INHERITANCE_TREE_CHUNK_SIZE', 100):
+            module_store.get_parent_locations(child, None)
+        head = module_store.metadata_inheritance_cache_subsystem.get(mongo.base.course_parents_cache_key('edX', 'toy'))
+        self.assertGreater(head['chunks'], 1)
+
+        module_store.request_cache = None
+        with mock.patch.object(module_store, 'compute_parent_map') as mock_compute:
+            self.assertEqual([Location(parent) for parent in module_store.get_parent_locations(child, None)],
+                             [chapters[0].location])
+        self.assertFalse(mock_compute.called)
+
+    def test_parent_map_not_stored(self):
+        module_store = modulestore('direct')
+        import_from_xml(module_store, 'common/test/data/', ['toy'])
+        chapters = module_store.get_items(['i4x', 'edX', 'toy', 'chapter', None, None])
+        child = chapters[0].children[0]
+        module_store.request_cache = None
+
+        # the cache refuses the chunks, e.g. as they are too large
+        with mock.patch.object(module_store.metadata_inheritance_cache_subsystem, 'set_many'):
+            module_store.get_parent_locations(child, None)
+
+        # the parents of each location are then queried, rather than the whole course
+        with mock.patch.object(module_store, 'compute_parent_map') as mock_compute:
+            self.assertEqual([Location(parent) for parent in module_store.get_parent_locations(child, None)],
+                             [chapters[0].location])
+        self.assertFalse(mock_compute.called)
+
+    def test_item_cache(self):
+        module_store = modulestore('direct')
+        import_from_xml(module_store, 'common/test/data/', ['toy'])
+        location = Location('i4x://edX/toy/course/2012_Fall')
+
+        module_store.item_cache = ItemCache(10 ** 7)
+        wrapper = MongoCollectionFindWrapper(module_store.collection.find)
+        module_store.collection.find = wrapper.find
+        try:
+            module_store.get_item(location, depth=2)
+            reads = wrapper.counter
+            self.assertGreater(reads, 0)
+            course = module_store.get_item(location, depth=2)
+            chapter = course.get_children()[0]
+            self.assertEqual(wrapper.counter, reads)
+
+            # writes are seen straight away
+            module_store.update_metadata(chapter.location, {'display_name': 'Changed'})
+            self.assertEqual(module_store.get_item(chapter.location).display_name, 'Changed')
+        finally:
+            module_store.collection.find = wrapper.original
+            module_store.item_cache = None
+
+    def test_path_to_location_cached(self):
+        module_store = modulestore('direct')
+        import_from_xml(module_store, 'common/test/data/', ['toy'])
+        course_id = 'edX/toy/2012_Fall'
+        location = Location('i4x://edX/toy/video/Welcome')
+        expected = (course_id, 'Overview', 'Welcome', None)
+
+        with mock.patch('xmodule.modulestore.search._path_to_location', wraps=search._path_to_location) as mock_path:
+            self.assertEqual(search.path_to_location(module_store, course_id, location), expected)
+            self.assertEqual(search.path_to_location(module_store, course_id, location), expected)
+            self.assertEqual(mock_path.call_count, 1)
+
+            # a write to the course invalidates the cached paths
+            chapter = module_store.get_item(Location('i4x://edX/toy/chapter/Overview'))
+            module_store.update_children(chapter.location, chapter.children)
+            self.assertEqual(search.path_to_location(module_store, course_id, location), expected)
+            self.assertEqual(mock_path.call_count, 2)
+
     def test_default_metadata_inheritance(self):
         course = CourseFactory.create()
         vertical = ItemFactory.create(parent_location=course.location)
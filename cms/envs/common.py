@@ -169,6 +169,10 @@ MIDDLEWARE_CLASSES = (
     'ratelimitbackend.middleware.RateLimitMiddleware',
 )
 
+# Large assets served from the contentstore can be cached on local disk,
+# see contentserver.disk_cache
+ASSET_DISK_CACHE = None
+
 ############# XBlock Configuration ##########
 
 # This should be moved into an XBlock Runtime/Application object
@@ -411,6 +415,12 @@ TRACKING_BACKENDS = {
     }
 }
 
+# Deliver events to the tracking backends in batches, from a background
+# thread, instead of during the request; see track.batching for the options.
+TRACKING_ASYNC = {
+    'ENABLED': False,
+}
+
 # We're already logging events, and we don't want to capture user
 # names/passwords.  Heartbeat events are likely not interesting.
 TRACKING_IGNORE_URL_PATTERNS = [r'^/event', r'^/login', r'^/heartbeat']
@@ -103,7 +103,7 @@ urlpatterns = ('',  # nopep8
     url(r'^event$', 'contentstore.views.event', name='event'),
 
     url(r'^xmodule/', include('pipeline_js.urls')),
-    url(r'^heartbeat$', include('heartbeat.urls')),
+    url(r'^heartbeat', include('heartbeat.urls')),
 )
 
 # User creation and updating views
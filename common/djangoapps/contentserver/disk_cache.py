@@ -0,0 +1,206 @@
+"""
+A cache of large assets on the local disk.
+
+Assets too large for the django cache (see StaticContentServer) are otherwise
+read from GridFS on every request. With settings.ASSET_DISK_CACHE set, they
+are written to a directory as they are first served, and served from there
+afterwards:
+
+    ASSET_DISK_CACHE = {
+        # where the assets are written
+        'DIRECTORY': '/var/tmp/asset_cache',
+        # the number of bytes of assets to keep
+        'MAX_SIZE': 10 * 1024 ** 3,
+        # assets smaller than this are left to the django cache
+        'MIN_ASSET_SIZE': 1048576,
+        # if set, the internal location of nginx serving DIRECTORY, in which
+        # case responses only tell nginx which file to send (X-Accel-Redirect)
+        'X_ACCEL_REDIRECT': '/asset_cache',
+    }
+
+Files are named after the location, the upload date and the md5 of the asset,
+so a replaced asset is never served from its previous file. A file is only
+kept if the md5 of what was written matches the one GridFS stored. When the
+directory grows over MAX_SIZE, the files used least recently are removed.
+"""
+import calendar
+import hashlib
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+
+log = logging.getLogger(__name__)
+
+TEMP_FILE_PREFIX = '.tmp-'
+
+STREAM_CHUNK_SIZE = 256 * 1024
+
+_DISK_ASSET_CACHE = {}
+
+
+def disk_asset_cache():
+    """
+    Returns the DiskAssetCache configured by settings.ASSET_DISK_CACHE, or None
+    """
+    config = getattr(settings, 'ASSET_DISK_CACHE', None)
+    if not config:
+        return None
+    key = tuple(sorted(config.items()))
+    if key not in _DISK_ASSET_CACHE:
+        _DISK_ASSET_CACHE[key] = DiskAssetCache(
+            config['DIRECTORY'],
+            config['MAX_SIZE'],
+            min_asset_size=config.get('MIN_ASSET_SIZE', 1048576),
+            x_accel_redirect=config.get('X_ACCEL_REDIRECT'),
+        )
+    return _DISK_ASSET_CACHE[key]
+
+
+class DiskAssetCache(object):
+    """
+    Large assets, kept in files of a directory shared by the processes of the host
+    """
+    def __init__(self, directory, max_size, min_asset_size=1048576, x_accel_redirect=None):
+        self.directory = directory
+        self.max_size = max_size
+        self.min_asset_size = min_asset_size
+        self.x_accel_redirect = x_accel_redirect
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # made by another process meanwhile
+                if not os.path.isdir(directory):
+                    raise
+
+    def file_name(self, content):
+        """
+        The name of the file of content, or None if content can't be cached
+        """
+        content_digest = getattr(content, 'content_digest', None)
+        if content_digest is None or content.last_modified_at is None or content.length is None:
+            return None
+        if not self.min_asset_size <= content.length <= self.max_size:
+            return None
+        return '{0}-{1}-{2}'.format(
+            hashlib.sha1(content.location.url()).hexdigest(),
+            calendar.timegm(content.last_modified_at.utctimetuple()),
+            content_digest,
+        )
+
+    def get(self, content):
+        """
+        Returns the path of the file of content, or None if it isn't cached
+        """
+        name = self.file_name(content)
+        if name is None:
+            return None
+        file_path = os.path.join(self.directory, name)
+        try:
+            # the modification time records when the file was last used
+            os.utime(file_path, None)
+        except OSError:
+            return None
+        return file_path
+
+    def accel_redirect_path(self, file_path):
+        """
+        The X-Accel-Redirect path of the cached file file_path, or None if
+        files aren't sent by nginx
+        """
+        if self.x_accel_redirect is None:
+            return None
+        return '{0}/{1}'.format(self.x_accel_redirect.rstrip('/'), os.path.basename(file_path))
+
+    def store_while_streaming(self, content, chunks):
+        """
+        Yields the chunks of chunks, the whole data of content, writing them to
+        the file of content. The file is kept if all of the data was streamed and
+        its md5 is the one of content.
+        """
+        name = self.file_name(content)
+        if name is None:
+            for chunk in chunks:
+                yield chunk
+            return
+
+        temp_file = None
+        try:
+            temp_fd, temp_path = tempfile.mkstemp(prefix=TEMP_FILE_PREFIX, dir=self.directory)
+            temp_file = os.fdopen(temp_fd, 'wb')
+        except (IOError, OSError):
+            log.warning("Can't write assets to %s", self.directory, exc_info=True)
+
+        md5 = hashlib.md5()
+        completed = False
+        try:
+            for chunk in chunks:
+                if temp_file is not None:
+                    try:
+                        temp_file.write(chunk)
+                        md5.update(chunk)
+                    except (IOError, OSError):
+                        log.warning("Failed to write asset %s to %s", content.location, temp_path, exc_info=True)
+                        temp_file.close()
+                        os.remove(temp_path)
+                        temp_file = None
+                yield chunk
+            completed = True
+        finally:
+            if temp_file is not None:
+                temp_file.close()
+                if completed and md5.hexdigest() == content.content_digest:
+                    os.rename(temp_path, os.path.join(self.directory, name))
+                    self.evict()
+                else:
+                    if completed:
+                        log.warning("The md5 of asset %s doesn't match its data", content.location)
+                    os.remove(temp_path)
+
+    def evict(self):
+        """
+        Remove the files used least recently until the cached files fit in max_size
+        """
+        entries = []
+        total_size = 0
+        for name in os.listdir(self.directory):
+            if name.startswith(TEMP_FILE_PREFIX):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total_size += stat.st_size
+
+        entries.sort()
+        for _, size, name in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                # removed by another process meanwhile
+                pass
+            total_size -= size
+
+
+def stream_file(cached_file, first_byte=0, last_byte=None):
+    """
+    Yields the bytes of the open file cached_file, from first_byte to last_byte,
+    inclusive, then closes it
+    """
+    try:
+        cached_file.seek(first_byte)
+        remaining = None if last_byte is None else last_byte - first_byte + 1
+        while remaining is None or remaining > 0:
+            chunk = cached_file.read(STREAM_CHUNK_SIZE if remaining is None else min(STREAM_CHUNK_SIZE, remaining))
+            if len(chunk) == 0:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        cached_file.close()
@@ -1,13 +1,64 @@
+import calendar
+import re
+
 from django.http import (HttpResponse, HttpResponseNotModified,
     HttpResponseForbidden)
+from django.utils.http import http_date, parse_http_date_safe
 from student.models import CourseEnrollment
 
 from xmodule.contentstore.django import contentstore
-from xmodule.contentstore.content import StaticContent, XASSET_LOCATION_TAG
+from xmodule.contentstore.content import StaticContent, StaticContentStream, XASSET_LOCATION_TAG
 from xmodule.modulestore import InvalidLocationError
 from cache_toolbox.core import get_cached_content, set_cached_content
 from xmodule.exceptions import NotFoundError
 
+from .disk_cache import disk_asset_cache, stream_file
+
+# a single range of bytes, such as bytes=0-499, bytes=500- or bytes=-500
+RANGE_HEADER_RE = re.compile(r'^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$')
+
+
+def parse_range_header(header_value, content_length):
+    """
+    Returns the (first, last) byte positions, inclusive, of the range of the Range
+    header header_value for content of content_length bytes; or None if the header
+    isn't a single range of bytes, which is served as a request of the whole content.
+    Raises ValueError if the range can't be satisfied.
+    """
+    match = RANGE_HEADER_RE.match(header_value)
+    if match is None:
+        return None
+    first, last = match.groups()
+    if first == '' and last == '':
+        return None
+    if first == '':
+        # the last `last` bytes
+        suffix_length = int(last)
+        if suffix_length == 0:
+            raise ValueError(header_value)
+        return max(content_length - suffix_length, 0), content_length - 1
+    first = int(first)
+    last = int(last) if last != '' else content_length - 1
+    if first > last or first >= content_length:
+        raise ValueError(header_value)
+    return first, min(last, content_length - 1)
+
+
+def etag_matches(etag, header_value):
+    """
+    Returns whether the If-None-Match or If-Range header header_value matches etag
+    """
+    if header_value.strip() == '*':
+        return True
+    for tag in header_value.split(','):
+        tag = tag.strip()
+        # weak validators are good enough to say the content didn't change
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
 
 class StaticContentServer(object):
     def process_request(self, request):
@@ -33,7 +84,8 @@ class StaticContentServer(object):
                     return response
 
                 # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
-                # this is because I haven't been able to find a means to stream data out of memcached
+                # this is because I haven't been able to find a means to stream data out of memcached.
+                # Larger content is streamed from the DB a chunk at a time.
                 if content.length is not None:
                     if content.length < 1048576:
                         # since we've queried as a stream, let's read in the stream into memory to set in cache
@@ -52,18 +104,89 @@ class StaticContentServer(object):
                         request.user, course_partial_id):
                     return HttpResponseForbidden('Unauthorized')
 
-            # convert over the DB persistent last modified timestamp to a HTTP compatible
-            # timestamp, so we can simply compare the strings
-            last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+            last_modified_at = calendar.timegm(content.last_modified_at.utctimetuple())
+            last_modified_at_str = http_date(last_modified_at)
+            # getattr b/c caching may mean some pickled instances don't have attr
+            content_digest = getattr(content, 'content_digest', None)
+            etag = '"{0}"'.format(content_digest) if content_digest else None
+
+            # see if the client has cached this content, if so then return a 304 (Not Modified).
+            # If-None-Match takes precedence over If-Modified-Since
+            if etag is not None and 'HTTP_IF_NONE_MATCH' in request.META:
+                if etag_matches(etag, request.META['HTTP_IF_NONE_MATCH']):
+                    return self._not_modified(last_modified_at_str, etag)
+            elif 'HTTP_IF_MODIFIED_SINCE' in request.META:
+                if_modified_since = parse_http_date_safe(request.META['HTTP_IF_MODIFIED_SINCE'])
+                if if_modified_since is not None and last_modified_at <= if_modified_since:
+                    return self._not_modified(last_modified_at_str, etag)
+
+            # large content may be cached on disk, in which case it isn't read from the DB
+            disk_cache = disk_asset_cache() if isinstance(content, StaticContentStream) else None
+            cached_file = None
+            if disk_cache is not None:
+                cached_path = disk_cache.get(content)
+                if cached_path is not None:
+                    accel_redirect_path = disk_cache.accel_redirect_path(cached_path)
+                    if accel_redirect_path is not None:
+                        # let the web server send the file, and answer range requests
+                        content.close()
+                        response = HttpResponse(content_type=content.content_type)
+                        response['X-Accel-Redirect'] = accel_redirect_path
+                        return self._add_validators(response, last_modified_at_str, etag)
+                    try:
+                        cached_file = open(cached_path, 'rb')
+                        content.close()
+                    except IOError:
+                        # removed by another process meanwhile
+                        pass
+
+            byte_range = None
+            if 'HTTP_RANGE' in request.META and content.length is not None:
+                # only serve a range of the content the client already has part of
+                if_range = request.META.get('HTTP_IF_RANGE')
+                if if_range is None or (etag is not None and if_range.strip() == etag) or \
+                        parse_http_date_safe(if_range) == last_modified_at:
+                    try:
+                        byte_range = parse_range_header(request.META['HTTP_RANGE'], content.length)
+                    except ValueError:
+                        response = HttpResponse(status=416)
+                        response['Content-Range'] = 'bytes */{0}'.format(content.length)
+                        return response
+
+            if byte_range is not None:
+                first_byte, last_byte = byte_range
+                if cached_file is not None:
+                    data = stream_file(cached_file, first_byte, last_byte)
+                else:
+                    data = content.stream_data_in_range(first_byte, last_byte)
+                response = HttpResponse(data, content_type=content.content_type, status=206)
+                response['Content-Range'] = 'bytes {0}-{1}/{2}'.format(first_byte, last_byte, content.length)
+                response['Content-Length'] = str(last_byte - first_byte + 1)
+            else:
+                if cached_file is not None:
+                    data = stream_file(cached_file)
+                elif disk_cache is not None:
+                    data = disk_cache.store_while_streaming(content, content.stream_data())
+                else:
+                    data = content.stream_data()
+                response = HttpResponse(data, content_type=content.content_type)
+                if content.length is not None:
+                    response['Content-Length'] = str(content.length)
 
-            # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+            response['Accept-Ranges'] = 'bytes'
+            return self._add_validators(response, last_modified_at_str, etag)
 
-            response = HttpResponse(content.stream_data(), content_type=content.content_type)
-            response['Last-Modified'] = last_modified_at_str
+    def _not_modified(self, last_modified_at_str, etag):
+        """
+        A 304 (Not Modified) response, with the validators of the content
+        """
+        return self._add_validators(HttpResponseNotModified(), last_modified_at_str, etag)
 
-            return response
+    def _add_validators(self, response, last_modified_at_str, etag):
+        """
+        Set the Last-Modified and ETag headers of response, and return it
+        """
+        response['Last-Modified'] = last_modified_at_str
+        if etag is not None:
+            response['ETag'] = etag
+        return response
@@ -134,3 +134,45 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         resp = self.client.get(self.url_locked)
         self.assertEqual(resp.status_code, 200) #pylint: disable=E1103
 
+
+    def test_range_request(self):
+        """
+        Test that a range of the asset is served on a Range request.
+        """
+        resp = self.client.get(self.url_unlocked)
+        content = resp.content  #pylint: disable=E1103
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(resp.status_code, 206) #pylint: disable=E1103
+        self.assertEqual(resp.content, content[10:20]) #pylint: disable=E1103
+        self.assertEqual(resp['Content-Range'], 'bytes 10-19/{0}'.format(len(content)))
+
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=-5')
+        self.assertEqual(resp.content, content[-5:]) #pylint: disable=E1103
+
+    def test_unsatisfiable_range(self):
+        """
+        Test that a range past the end of the asset is refused.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=100000-')
+        self.assertEqual(resp.status_code, 416) #pylint: disable=E1103
+
+    def test_etag(self):
+        """
+        Test that the asset isn't served again to clients which have it.
+        """
+        resp = self.client.get(self.url_unlocked)
+        etag = resp['ETag']
+        self.assertEqual(resp['Accept-Ranges'], 'bytes')
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304) #pylint: disable=E1103
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(resp.status_code, 200) #pylint: disable=E1103
+
+    def test_if_modified_since(self):
+        """
+        Test that the asset isn't served again if it wasn't modified since the client got it.
+        """
+        resp = self.client.get(self.url_unlocked)
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE=resp['Last-Modified'])
+        self.assertEqual(resp.status_code, 304) #pylint: disable=E1103
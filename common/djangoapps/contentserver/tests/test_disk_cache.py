@@ -0,0 +1,82 @@
+"""
+Tests for contentserver.disk_cache
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from unittest import TestCase
+
+from xmodule.modulestore import Location
+
+from contentserver.disk_cache import DiskAssetCache, stream_file
+
+
+class FakeContent(object):
+    """
+    The attributes of a StaticContent used by DiskAssetCache
+    """
+    def __init__(self, name, data, content_digest=None):
+        self.location = Location('c4x', 'edX', 'toy', 'asset', name)
+        self.last_modified_at = datetime(2013, 10, 1)
+        self.length = len(data)
+        self.content_digest = content_digest or hashlib.md5(data).hexdigest()
+
+
+class DiskAssetCacheTest(TestCase):
+    """
+    Tests of DiskAssetCache.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = DiskAssetCache(self.directory, 100, min_asset_size=10)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def store(self, content, data):
+        """Stream data, the data of content, through the cache"""
+        chunks = [data[:5], data[5:]]
+        self.assertEqual(list(self.cache.store_while_streaming(content, iter(chunks))), chunks)
+
+    def test_store_and_get(self):
+        content = FakeContent('a', 'a' * 20)
+        self.assertIsNone(self.cache.get(content))
+        self.store(content, 'a' * 20)
+
+        with open(self.cache.get(content), 'rb') as cached_file:
+            self.assertEqual(''.join(stream_file(cached_file, 5, 9)), 'a' * 5)
+
+    def test_md5_mismatch(self):
+        content = FakeContent('a', 'a' * 20, content_digest='0' * 32)
+        self.store(content, 'a' * 20)
+        self.assertIsNone(self.cache.get(content))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_interrupted_stream(self):
+        content = FakeContent('a', 'a' * 20)
+        streaming = self.cache.store_while_streaming(content, iter(['a' * 10, 'a' * 10]))
+        next(streaming)
+        streaming.close()
+        self.assertIsNone(self.cache.get(content))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_small_assets_not_cached(self):
+        content = FakeContent('a', 'a' * 5)
+        self.store(content, 'a' * 5)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_least_recently_used_evicted(self):
+        contents = [FakeContent(name, name * 40) for name in 'abc']
+        self.store(contents[0], 'a' * 40)
+        self.store(contents[1], 'b' * 40)
+        # make 'a' the most recently used
+        os.utime(self.cache.get(contents[1]), (0, 0))
+        self.cache.get(contents[0])
+        self.store(contents[2], 'c' * 40)
+
+        self.assertIsNotNone(self.cache.get(contents[0]))
+        self.assertIsNone(self.cache.get(contents[1]))
+        self.assertIsNotNone(self.cache.get(contents[2]))
@@ -0,0 +1,51 @@
+"""
+Tests of the heartbeat views
+"""
+import json
+
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from mock import patch, Mock
+
+
+@patch('heartbeat.views.modulestore')
+class HeartbeatTestCase(TestCase):
+    """
+    Check that the heartbeat is cheap, and that failing checks are reported.
+    """
+
+    def test_heartbeat(self, mock_modulestore):
+        for _ in xrange(3):
+            response = self.client.get(reverse('heartbeat'))
+            self.assertEqual(response.status_code, 200)
+            output = json.loads(response.content)
+            self.assertEqual(output['status'], {'modulestore': 'OK', 'sql': 'OK', 'cache': 'OK'})
+            self.assertNotIn('course_count', output)
+
+        # Courses are never listed
+        self.assertFalse(mock_modulestore.return_value.get_courses.called)
+        self.assertEqual(mock_modulestore.return_value.heartbeat.call_count, 3)
+
+    def test_modulestore_down(self, mock_modulestore):
+        mock_modulestore.return_value.heartbeat.side_effect = Exception('connection refused')
+
+        response = self.client.get(reverse('heartbeat'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(json.loads(response.content)['status']['modulestore'], 'ERROR')
+        self.assertFalse(mock_modulestore.return_value.get_courses.called)
+
+    def test_deep_heartbeat(self, mock_modulestore):
+        course = Mock()
+        course.location.url.return_value = 'i4x://edX/toy/course/2012_Fall'
+        mock_modulestore.return_value.get_courses.return_value = [course]
+
+        response = self.client.get(reverse('deep_heartbeat'))
+        self.assertEqual(response.status_code, 200)
+        output = json.loads(response.content)
+        self.assertEqual(output['course_count'], 1)
+        checks = output['checks']
+        self.assertEqual(set(checks), set(['modulestore', 'sql', 'cache', 'courses']))
+        self.assertEqual(checks['courses']['value'], ['i4x://edX/toy/course/2012_Fall'])
+        for check in checks.values():
+            self.assertEqual(check['status'], 'OK')
+            self.assertIn('latency_ms', check)
@@ -1,18 +1,124 @@
+"""
+Health checks for load balancers and monitoring.
+
+heartbeat() is probed every few seconds by every load balancer, so it only
+makes trivial round trips to the modulestore, the database and the cache.
+
+deep_heartbeat() is for humans and monitoring: it also lists (and counts) every
+course, and reports how long each of its checks took.
+"""
 import json
+import time
 from datetime import datetime
 from pytz import UTC
+from django.core.cache import cache
+from django.db import connection
 from django.http import HttpResponse
 from xmodule.modulestore.django import modulestore
 from dogapi import dog_stats_api
 
+CACHE_CHECK_KEY = 'heartbeat.check'
+
+
+def check_modulestore():
+    """
+    Checks that the modulestore's storage can be reached
+    """
+    modulestore().heartbeat()
+
+
+def check_database():
+    """
+    Runs a trivial query on the SQL database
+    """
+    cursor = connection.cursor()
+    cursor.execute('SELECT 1')
+    cursor.fetchone()
+
+
+def check_cache():
+    """
+    Checks that a value can be stored in, and read back from, the default cache
+    """
+    value = str(time.time())
+    cache.set(CACHE_CHECK_KEY, value, 60)
+    if cache.get(CACHE_CHECK_KEY) != value:
+        raise Exception("Value not read back from the cache")
+
+
+def list_courses():
+    """
+    Lists every course in the modulestore
+    """
+    return [course.location.url() for course in modulestore().get_courses()]
+
+
+def run_checks(checks):
+    """
+    Runs each (name, check) of `checks`, returning (all_ok, results), where
+    results is a dict of name -> {'status', 'latency_ms'[, 'value']}
+    """
+    all_ok = True
+    results = {}
+    for name, check in checks:
+        start = time.time()
+        try:
+            value = check()
+        except Exception as exc:  # pylint: disable=broad-except
+            all_ok = False
+            result = {'status': 'ERROR', 'error': u'{0}: {1}'.format(type(exc).__name__, exc)}
+        else:
+            result = {'status': 'OK'}
+            if value is not None:
+                result['value'] = value
+        result['latency_ms'] = round((time.time() - start) * 1000, 3)
+        results[name] = result
+    return all_ok, results
+
+
+def _response(all_ok, output):
+    """
+    Renders the output of a heartbeat; failing checks make it a 503
+    """
+    return HttpResponse(
+        json.dumps(output, indent=4),
+        content_type='application/json',
+        status=200 if all_ok else 503,
+    )
+
 
 @dog_stats_api.timed('edxapp.heartbeat')
 def heartbeat(request):
     """
     Simple view that a loadbalancer can check to verify that the app is up
     """
+    all_ok, results = run_checks([
+        ('modulestore', check_modulestore),
+        ('sql', check_database),
+        ('cache', check_cache),
+    ])
+    output = {
+        'date': datetime.now(UTC).isoformat(),
+        'status': dict((name, result['status']) for name, result in results.items()),
+    }
+    return _response(all_ok, output)
+
+
+@dog_stats_api.timed('edxapp.heartbeat.deep')
+def deep_heartbeat(request):
+    """
+    Runs every check, plus a full listing of the courses, and reports their latencies
+    """
+    all_ok, results = run_checks([
+        ('modulestore', check_modulestore),
+        ('sql', check_database),
+        ('cache', check_cache),
+        ('courses', list_courses),
+    ])
     output = {
         'date': datetime.now(UTC).isoformat(),
-        'courses': [course.location.url() for course in modulestore().get_courses()],
+        'checks': results,
     }
-    return HttpResponse(json.dumps(output, indent=4))
+    if 'value' in results['courses']:
+        output['course_count'] = len(results['courses']['value'])
+    return _response(all_ok, output)
@@ -0,0 +1,172 @@
+"""
+Asynchronous, batched delivery of tracking events.
+
+When TRACKING_ASYNC['ENABLED'] is set, track.tracker.send() only appends the
+event to a bounded in-process queue. A background thread takes events off the
+queue in batches and passes each batch to every backend's send_many(), so
+requests don't wait on tracking I/O.
+
+When the queue is full, send() waits up to TRACKING_ASYNC['BLOCK_TIMEOUT']
+seconds for room (back-pressure), then drops the event and counts it.
+
+The settings, with their defaults::
+
+  TRACKING_ASYNC = {
+      'ENABLED': False,
+      'QUEUE_SIZE': 10000,     # events waiting to be delivered
+      'BATCH_SIZE': 100,       # events delivered to the backends at once
+      'FLUSH_INTERVAL': 1.0,   # seconds to wait for a batch to fill up
+      'BLOCK_TIMEOUT': 0,      # seconds send() may wait when the queue is full
+  }
+
+"""
+
+import atexit
+import logging
+import os
+import threading
+from Queue import Queue, Empty, Full
+
+from dogapi import dog_stats_api
+
+
+log = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'QUEUE_SIZE': 10000,
+    'BATCH_SIZE': 100,
+    'FLUSH_INTERVAL': 1.0,
+    'BLOCK_TIMEOUT': 0,
+}
+
+
+class BatchingSender(object):
+    """
+    Delivers events to backends (a dict of name -> backend) from a background thread.
+    """
+
+    def __init__(self, backends, queue_size=DEFAULTS['QUEUE_SIZE'], batch_size=DEFAULTS['BATCH_SIZE'],
+                 flush_interval=DEFAULTS['FLUSH_INTERVAL'], block_timeout=DEFAULTS['BLOCK_TIMEOUT']):
+        self.backends = backends
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.block_timeout = block_timeout
+
+        # Number of events dropped because the queue was full
+        self.dropped = 0
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._worker = None
+
+    def _ensure_worker(self):
+        """
+        Start the worker thread, unless it is already running in this
+        process (threads don't survive a fork, so each process needs its own).
+        """
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = Queue(self.queue_size)
+            self._worker = threading.Thread(target=self._run, name='track.batching')
+            self._worker.daemon = True
+            self._worker.start()
+            self._pid = os.getpid()
+
+    def put(self, event):
+        """
+        Queue an event for delivery. Returns False if it had to be dropped.
+        """
+        self._ensure_worker()
+        try:
+            if self.block_timeout:
+                self._queue.put(event, True, self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except Full:
+            with self._lock:
+                self.dropped += 1
+                dropped = self.dropped
+            dog_stats_api.increment('track.send.dropped')
+            if dropped == 1 or dropped % 1000 == 0:
+                log.warning("Tracking queue is full, %d events dropped so far", dropped)
+            return False
+        return True
+
+    def _next_batch(self, timeout, limit):
+        """
+        Wait up to `timeout` seconds for an event (None waits forever), then
+        return it with whatever other events are queued, up to `limit` events.
+        """
+        try:
+            batch = [self._queue.get(True, timeout)]
+        except Empty:
+            return []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Worker thread loop"""
+        while True:
+            batch = self._next_batch(None, self.batch_size)
+            # Give a small batch a chance to fill up, rather than delivering it right away
+            if len(batch) < self.batch_size:
+                batch.extend(self._next_batch(self.flush_interval, self.batch_size - len(batch)))
+            self.deliver(batch)
+
+    def deliver(self, events):
+        """
+        Send a batch of events to every backend. Errors are logged, so that
+        one failing backend doesn't stop delivery to the others.
+        """
+        if not events:
+            return
+        dog_stats_api.histogram('track.send.batch_size', len(events))
+        for name, backend in self.backends.iteritems():
+            with dog_stats_api.timer('track.send.backend.{0}'.format(name)):
+                try:
+                    backend.send_many(events)
+                except Exception:  # pylint: disable=broad-except
+                    log.exception("Error sending %d events to tracking backend %s", len(events), name)
+
+    def flush(self):
+        """
+        Deliver, from the calling thread, all the events that are queued.
+        """
+        if self._pid != os.getpid():
+            return
+        while True:
+            batch = self._next_batch(0, self.batch_size)
+            if not batch:
+                return
+            self.deliver(batch)
+
+
+def create_sender(backends, config):
+    """
+    Returns a BatchingSender for backends if `config` (the TRACKING_ASYNC
+    setting) enables asynchronous tracking, else None.
+    """
+    options = dict(DEFAULTS, **(config or {}))
+    if not options['ENABLED']:
+        return None
+
+    sender = BatchingSender(
+        backends,
+        queue_size=options['QUEUE_SIZE'],
+        batch_size=options['BATCH_SIZE'],
+        flush_interval=options['FLUSH_INTERVAL'],
+        block_timeout=options['BLOCK_TIMEOUT'],
+    )
+    # Don't lose the events still queued when the process exits normally
+    atexit.register(sender.flush)
+    return sender
@@ -0,0 +1,107 @@
+import time
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from mock import patch
+
+import track.tracker as tracker
+from track.batching import BatchingSender, create_sender
+from track.tests.test_tracker import DummyBackend, SIMPLE_SETTINGS
+
+
+class RecordingBackend(DummyBackend):
+    """Records the batches of events it is sent"""
+    def __init__(self, **options):
+        super(RecordingBackend, self).__init__(**options)
+        self.batches = []
+
+    def send_many(self, events):
+        self.batches.append(list(events))
+
+
+class FailingBackend(DummyBackend):
+    def send_many(self, events):
+        raise Exception('backend down')
+
+
+class TestBatchingSender(TestCase):
+    """Test queueing and batched delivery of events."""
+
+    def setUp(self):
+        self.backend = RecordingBackend()
+        # Don't let the worker thread take events off the queue
+        patcher = patch.object(BatchingSender, '_run')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_flush_in_batches(self):
+        sender = BatchingSender({'default': self.backend}, batch_size=2)
+        for i in xrange(5):
+            self.assertTrue(sender.put({'id': i}))
+
+        sender.flush()
+
+        self.assertEqual(
+            self.backend.batches,
+            [[{'id': 0}, {'id': 1}], [{'id': 2}, {'id': 3}], [{'id': 4}]]
+        )
+
+    def test_drop_when_full(self):
+        sender = BatchingSender({'default': self.backend}, queue_size=2)
+        results = [sender.put({'id': i}) for i in xrange(3)]
+
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(sender.dropped, 1)
+
+        sender.flush()
+        self.assertEqual(self.backend.batches, [[{'id': 0}, {'id': 1}]])
+
+    def test_failing_backend(self):
+        sender = BatchingSender({'failing': FailingBackend(), 'default': self.backend})
+        sender.put({})
+        sender.flush()
+
+        self.assertEqual(self.backend.batches, [[{}]])
+
+    def test_default_send_many(self):
+        backend = DummyBackend()
+        backend.send_many([{}, {}, {}])
+        self.assertEqual(backend.count, 3)
+
+
+class TestBatchingSenderWorker(TestCase):
+    """Test delivery from the worker thread."""
+
+    def test_worker_delivers(self):
+        backend = RecordingBackend()
+        sender = BatchingSender({'default': backend}, batch_size=2, flush_interval=10)
+        sender.put({'id': 0})
+        sender.put({'id': 1})
+
+        # A full batch is delivered without waiting for the flush interval
+        for _ in xrange(50):
+            if backend.batches:
+                break
+            time.sleep(0.01)
+        self.assertEqual(backend.batches, [[{'id': 0}, {'id': 1}]])
+
+
+class TestTrackerAsync(TestCase):
+    """Test that the tracker only queues events when asynchronous tracking is enabled."""
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(create_sender({}, None))
+        self.assertIsNone(create_sender({}, {'ENABLED': False}))
+
+    @override_settings(TRACKING_BACKENDS=SIMPLE_SETTINGS, TRACKING_ASYNC={'ENABLED': True, 'BATCH_SIZE': 5})
+    @patch.object(BatchingSender, '_run')
+    def test_async_send(self, _mock_run):
+        tracker._initialize_backends_from_django_settings()  # pylint: disable=protected-access
+        self.addCleanup(tracker._initialize_backends_from_django_settings)  # pylint: disable=protected-access
+
+        backend = tracker.backends['default']
+        tracker.send({})
+        self.assertEqual(backend.count, 0)
+
+        tracker.sender.flush()
+        self.assertEqual(backend.count, 1)
@@ -16,6 +16,9 @@ below::
       }
   }
 
+Events can be delivered to the backends asynchronously, in batches, by a
+background thread; see track.batching for the TRACKING_ASYNC setting.
+
 """
 
 import inspect
@@ -26,6 +29,7 @@ from dogapi import dog_stats_api
 from django.conf import settings
 
 from track.backends import BaseBackend
+from track.batching import create_sender
 
 
 __all__ = ['send']
@@ -33,6 +37,9 @@ __all__ = ['send']
 
 backends = {}
 
+# The BatchingSender delivering events asynchronously, if enabled
+sender = None
+
 
 def _initialize_backends_from_django_settings():
     """
@@ -40,6 +47,8 @@ def _initialize_backends_from_django_settings():
     configuration in django settings
 
     """
+    global sender  # pylint: disable=global-statement
+
     backends.clear()
 
     config = getattr(settings, 'TRACKING_BACKENDS', {})
@@ -51,6 +60,8 @@ def _initialize_backends_from_django_settings():
             options = values.get('OPTIONS', {})
             backends[name] = _instantiate_backend_from_name(engine, options)
 
+    sender = create_sender(backends, getattr(settings, 'TRACKING_ASYNC', None))
+
 
 def _instantiate_backend_from_name(name, options):
     """
@@ -91,6 +102,10 @@ def send(event):
     """
     dog_stats_api.increment('track.send.count')
 
+    if sender is not None:
+        sender.put(event)
+        return
+
     for name, backend in backends.iteritems():
         with dog_stats_api.timer('track.send.backend.{0}'.format(name)):
             backend.send(event)
@@ -6,7 +6,9 @@ Uses pyparsing to parse. Main function as of now is evaluator().
 
 import math
 import operator
-import numbers
+import threading
+from collections import OrderedDict
+
 import numpy
 import scipy.constants
 import functions
@@ -73,6 +75,18 @@ SUFFIXES = {
 }
 
 
+# The number of expressions each process keeps parsed, see ParseAugmenter
+PARSE_CACHE_SIZE = 10000
+
+# (math_expr, case_sensitive) -> (tree, variables_used, functions_used), from
+# the least to the most recently used
+_parsed_expressions = OrderedDict()
+_parsed_expressions_lock = threading.Lock()
+
+# The pyparsing grammar of expressions, see algebra_grammar
+_algebra_grammar = None
+
+
 class UndefinedVariable(Exception):
     """
     Indicate when a student inputs a variable which was not expected.
@@ -94,6 +108,16 @@ def lower_dict(input_dict):
 # The following few functions define evaluation actions, which are run on lists
 # of results from each parse component. They convert the strings and (previously
 # calculated) numbers into the number that component represents.
+# The numbers may also be NumPy arrays, holding a number for each sample of the
+# variables, see evaluate_samples.
+
+def is_operand(token):
+    """
+    Whether the token of a parse result is a (number) value, rather than an
+    operator or parenthesis string.
+    """
+    return not isinstance(token, basestring)
+
 
 def super_float(text):
     """
@@ -122,7 +146,7 @@ def eval_atom(parse_result):
     In the case of parenthesis, ignore them.
     """
     # Find first number in the list
-    result = next(k for k in parse_result if isinstance(k, numbers.Number))
+    result = next(k for k in parse_result if is_operand(k))
     return result
 
 
@@ -136,7 +160,7 @@ def eval_power(parse_result):
     # `reduce` will go from left to right; reverse the list.
     parse_result = reversed(
         [k for k in parse_result
-         if isinstance(k, numbers.Number)]  # Ignore the '^' marks.
+         if is_operand(k)]  # Ignore the '^' marks.
     )
     # Having reversed it, raise `b` to the power of `a`.
     power = reduce(lambda a, b: b ** a, parse_result)
@@ -155,10 +179,15 @@ def eval_parallel(parse_result):
     """
     if len(parse_result) == 1:
         return parse_result[0]
-    if 0 in parse_result:
+    inputs = [e for e in parse_result if is_operand(e)]
+    if any(isinstance(e, numpy.ndarray) for e in inputs):
+        # NaN for the samples with a zero input.
+        has_zero = reduce(numpy.logical_or, [numpy.equal(e, 0) for e in inputs])
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            return numpy.where(has_zero, float('nan'), 1. / sum(1. / e for e in inputs))
+    if 0 in inputs:
         return float('nan')
-    reciprocals = [1. / e for e in parse_result
-                   if isinstance(e, numbers.Number)]
+    reciprocals = [1. / e for e in inputs]
     return 1. / sum(reciprocals)
 
 
@@ -173,12 +202,12 @@ def eval_sum(parse_result):
     total = 0.0
     current_op = operator.add
     for token in parse_result:
-        if token == '+':
+        if is_operand(token):
+            total = current_op(total, token)
+        elif token == '+':
             current_op = operator.add
         elif token == '-':
             current_op = operator.sub
-        else:
-            total = current_op(total, token)
     return total
 
 
@@ -191,12 +220,12 @@ def eval_product(parse_result):
     prod = 1.0
     current_op = operator.mul
     for token in parse_result:
-        if token == '*':
+        if is_operand(token):
+            prod = current_op(prod, token)
+        elif token == '*':
             current_op = operator.mul
         elif token == '/':
             current_op = operator.truediv
-        else:
-            prod = current_op(prod, token)
     return prod
 
 
@@ -221,7 +250,7 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     Evaluate an expression; that is, take a string of math and return a float.
 
     -Variables are passed as a dictionary from string to value. They must be
-     python numbers.
+     python numbers (or NumPy arrays, see `evaluate_samples`).
     -Unary functions are passed as a dictionary from string to function.
     """
     # No need to go further.
@@ -258,6 +287,108 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
     return math_interpreter.reduce_tree(evaluate_actions)
 
 
+def evaluate_samples(variables_list, functions, math_expr, case_sensitive=False):
+    """
+    Evaluate an expression for each dictionary of variables in `variables_list`;
+    that is, return the list of `evaluator(variables, functions, math_expr)`.
+
+    The tree of the expression is reduced once, with NumPy arrays of the values
+    of each variable as variables, and functions called with these arrays. If
+    this fails, e.g. because a function only takes numbers, or gives a value
+    which isn't finite, the samples are evaluated one by one instead: the
+    results and errors are those of `evaluator`.
+    """
+    names = set(variables_list[0]) if variables_list else set()
+    if all(set(variables) == names for variables in variables_list[1:]):
+        samples = {
+            name: numpy.array([variables[name] for variables in variables_list])
+            for name in names
+        }
+        try:
+            with numpy.errstate(all='ignore'):
+                results = evaluator(samples, functions, math_expr, case_sensitive)
+            vectorized = (
+                numpy.shape(results) in [(), (len(variables_list),)] and
+                numpy.all(numpy.isfinite(results))
+            )
+        except Exception:  # pylint: disable=broad-except
+            vectorized = False
+        if vectorized:
+            if numpy.ndim(results) == 0:
+                # The expression doesn't depend on the samples.
+                return [results] * len(variables_list)
+            return list(results)
+
+    return [
+        evaluator(variables, functions, math_expr, case_sensitive)
+        for variables in variables_list
+    ]
+
+
+def algebra_grammar():
+    """
+    Return the pyparsing grammar of the expressions, built on first use.
+
+    Parsing with it gives a `pyparsing.ParseResult` with proper groupings to
+    reflect parenthesis and order of operations. All operators are left in the
+    tree and strings of numbers are not parsed into their float versions.
+    """
+    global _algebra_grammar  # pylint: disable=global-statement
+    if _algebra_grammar is not None:
+        return _algebra_grammar
+
+    # 0.33 or 7 or .34 or 16.
+    number_part = Word(nums)
+    inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
+    # pyparsing allows spaces between tokens--`Combine` prevents that.
+    inner_number = Combine(inner_number)
+
+    # SI suffixes and percent.
+    number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
+
+    # 0.33k or 17
+    plus_minus = Literal('+') | Literal('-')
+    number = Group(
+        Optional(plus_minus) +
+        inner_number +
+        Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
+        Optional(number_suffix)
+    )
+    number = number("number")
+
+    # Predefine recursive variables.
+    expr = Forward()
+
+    # Handle variables passed in. They must start with letters/underscores
+    # and may contain numbers afterward.
+    inner_varname = Word(alphas + "_", alphanums + "_")
+    varname = Group(inner_varname)("variable")
+
+    # Same thing for functions.
+    function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
+
+    atom = number | function | varname | "(" + expr + ")"
+    atom = Group(atom)("atom")
+
+    # Do the following in the correct order to preserve order of operation.
+    pow_term = atom + ZeroOrMore("^" + atom)
+    pow_term = Group(pow_term)("power")
+
+    par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
+    par_term = Group(par_term)("parallel")
+
+    prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
+    prod_term = Group(prod_term)("product")
+
+    sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
+    sum_term = Group(sum_term)("sum")
+
+    # Finish the recursion.
+    expr << sum_term  # pylint: disable=W0104
+    _algebra_grammar = expr + stringEnd
+    return _algebra_grammar
+
+
 class ParseAugmenter(object):
     """
     Holds the data for a particular parse.
@@ -278,86 +409,53 @@ class ParseAugmenter(object):
         self.variables_used = set()
         self.functions_used = set()
 
-        def vpa(tokens):
-            """
-            When a variable is recognized, store it in `variables_used`.
-            """
-            varname = tokens[0][0]
-            self.variables_used.add(varname)
-
-        def fpa(tokens):
-            """
-            When a function is recognized, store it in `functions_used`.
-            """
-            varname = tokens[0][0]
-            self.functions_used.add(varname)
-
-        self.variable_parse_action = vpa
-        self.function_parse_action = fpa
-
     def parse_algebra(self):
         """
         Parse an algebraic expression into a tree.
 
-        Store a `pyparsing.ParseResult` in `self.tree` with proper groupings to
-        reflect parenthesis and order of operations. Leave all operators in the
-        tree and do not parse any strings of numbers into their float versions.
+        Store a `pyparsing.ParseResult` in `self.tree`, as parsed by
+        `algebra_grammar`, and the variables and functions it uses. Each process
+        keeps the trees of the last PARSE_CACHE_SIZE expressions: the trees are
+        shared, and are not to be modified.
 
         Adding the groups and result names makes the `repr()` of the result
         really gross. For debugging, use something like
           print OBJ.tree.asXML()
         """
-        # 0.33 or 7 or .34 or 16.
-        number_part = Word(nums)
-        inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
-        # pyparsing allows spaces between tokens--`Combine` prevents that.
-        inner_number = Combine(inner_number)
-
-        # SI suffixes and percent.
-        number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
-
-        # 0.33k or 17
-        plus_minus = Literal('+') | Literal('-')
-        number = Group(
-            Optional(plus_minus) +
-            inner_number +
-            Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
-            Optional(number_suffix)
-        )
-        number = number("number")
-
-        # Predefine recursive variables.
-        expr = Forward()
-
-        # Handle variables passed in. They must start with letters/underscores
-        # and may contain numbers afterward.
-        inner_varname = Word(alphas + "_", alphanums + "_")
-        varname = Group(inner_varname)("variable")
-        varname.setParseAction(self.variable_parse_action)
-
-        # Same thing for functions.
-        function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
-        function.setParseAction(self.function_parse_action)
-
-        atom = number | function | varname | "(" + expr + ")"
-        atom = Group(atom)("atom")
-
-        # Do the following in the correct order to preserve order of operation.
-        pow_term = atom + ZeroOrMore("^" + atom)
-        pow_term = Group(pow_term)("power")
-
-        par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
-        par_term = Group(par_term)("parallel")
-
-        prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
-        prod_term = Group(prod_term)("product")
-
-        sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
-        sum_term = Group(sum_term)("sum")
-
-        # Finish the recursion.
-        expr << sum_term  # pylint: disable=W0104
-        self.tree = (expr + stringEnd).parseString(self.math_expr)[0]
+        key = (self.math_expr, self.case_sensitive)
+        with _parsed_expressions_lock:
+            parsed = _parsed_expressions.pop(key, None)
+            if parsed is not None:
+                _parsed_expressions[key] = parsed
+        if parsed is None:
+            tree = algebra_grammar().parseString(self.math_expr)[0]
+            variables_used = set()
+            functions_used = set()
+            self._find_names(tree, variables_used, functions_used)
+            parsed = (tree, frozenset(variables_used), frozenset(functions_used))
+            with _parsed_expressions_lock:
+                _parsed_expressions[key] = parsed
+                while len(_parsed_expressions) > PARSE_CACHE_SIZE:
+                    _parsed_expressions.popitem(last=False)
+
+        self.tree, variables_used, functions_used = parsed
+        self.variables_used = set(variables_used)
+        self.functions_used = set(functions_used)
+
+    @classmethod
+    def _find_names(cls, node, variables_used, functions_used):
+        """
+        Add the names of the variables and functions used in the tree of `node`
+        to `variables_used` and `functions_used`.
+        """
+        for child in node:
+            if not isinstance(child, ParseResults):
+                continue
+            if child.getName() == 'variable':
+                variables_used.add(child[0])
+            elif child.getName() == 'function':
+                functions_used.add(child[0])
+            cls._find_names(child, variables_used, functions_used)
 
     def reduce_tree(self, handle_actions, terminal_converter=None):
         """
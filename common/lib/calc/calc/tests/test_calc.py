@@ -3,6 +3,7 @@ Unit tests for calc.py
 """
 
 import unittest
+import mock
 import numpy
 import calc
 from pyparsing import ParseException
@@ -558,3 +559,64 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+    def test_parse_cache(self):
+        """
+        Expressions are parsed once, whatever the variables
+        """
+        calc.calc._parsed_expressions.clear()  # pylint: disable=protected-access
+        self.assertEqual(calc.evaluator({'x': 2.0}, {}, "x^2"), 4.0)
+        self.assertEqual(calc.evaluator({'x': 3.0}, {}, "x^2"), 9.0)
+        self.assertEqual(len(calc.calc._parsed_expressions), 1)  # pylint: disable=protected-access
+
+        # The variables used are still checked.
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'y'):
+            calc.evaluator({'x': 2.0}, {}, "x^2+y")
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'X'):
+            calc.evaluator({'x': 2.0}, {}, "X^2", case_sensitive=True)
+
+
+class EvaluateSamplesTest(unittest.TestCase):
+    """
+    Run tests for calc.evaluate_samples
+    """
+    def assert_same_as_evaluator(self, samples, math_expr):
+        """
+        Check evaluate_samples gives the results of evaluator for each sample
+        """
+        results = calc.evaluate_samples(samples, {}, math_expr)
+        self.assertEqual(len(results), len(samples))
+        for variables, result in zip(samples, results):
+            expected = calc.evaluator(variables, {}, math_expr)
+            if numpy.isnan(expected):
+                self.assertTrue(numpy.isnan(result))
+            else:
+                self.assertAlmostEqual(result, expected)
+
+    def test_single_pass(self):
+        samples = [{'x': 0.5 * k} for k in range(1, 10)]
+        with mock.patch('calc.calc.evaluator', wraps=calc.calc.evaluator) as evaluator:
+            calc.evaluate_samples(samples, {}, "x^2 + sin(x)")
+        self.assertEqual(evaluator.call_count, 1)
+
+    def test_vectorized(self):
+        samples = [{'x': 0.5 * k, 'y': 1.5 + k} for k in range(10)]
+        self.assert_same_as_evaluator(samples, "x^2 + 3*y - sin(x)/y")
+        self.assert_same_as_evaluator(samples, "x || y")
+        self.assert_same_as_evaluator(samples, "-(x*y)^2 + 1.5k")
+        self.assert_same_as_evaluator(samples, "2 + 3")
+
+    def test_fallback(self):
+        # factorial only takes numbers
+        samples = [{'x': float(k)} for k in range(5)]
+        self.assert_same_as_evaluator(samples, "fact(x)")
+        # the parallel operator gives NaN for a zero input
+        results = calc.evaluate_samples(samples, {}, "x || 1")
+        self.assertTrue(numpy.isnan(results[0]))
+        self.assertAlmostEqual(results[1], 0.5)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            calc.evaluate_samples([{'x': -1.0}, {'x': 2.0}], {}, "fact(x)")
+        with self.assertRaises(calc.UndefinedVariable):
+            calc.evaluate_samples([{'x': 1.0}], {}, "x + y")
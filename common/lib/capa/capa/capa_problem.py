@@ -13,10 +13,13 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 '''
 
+from collections import OrderedDict
 from datetime import datetime
+import hashlib
 import logging
 import os.path
 import re
+import threading
 
 from lxml import etree
 from xml.sax.saxutils import unescape
@@ -61,8 +64,84 @@ html_problem_semantics = [
     "openendedrubric"
 ]
 
+# the number of problems each process keeps parsed, with their script context,
+# for other instances of the same problem with the same seed
+COMPILED_PROBLEM_CACHE_SIZE = 1000
+
+# (hash of the problem text with its includes, seed, problem id, filestore root)
+# -> (tree, context),
+# from the least to the most recently used
+_compiled_problems = OrderedDict()
+_compiled_problems_lock = threading.Lock()
+
+# problem text hash -> static max score, see static_max_score
+STATIC_MAX_SCORE_CACHE_SIZE = 10000
+_static_max_scores = OrderedDict()
+_static_max_scores_lock = threading.Lock()
+
 log = logging.getLogger(__name__)
 
+
+def _problem_text_hash(problem_text):
+    """
+    A hash of the text of a problem, to key caches with
+    """
+    if isinstance(problem_text, unicode):
+        problem_text = problem_text.encode('utf-8')
+    return hashlib.sha1(problem_text).hexdigest()
+
+
+def _compute_static_max_score(problem_text):
+    """
+    Computes the maximum score of the problem as LoncapaProblem.get_max_score
+    would, from the input fields of its responses
+    """
+    problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
+    problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
+    try:
+        tree = etree.XML(problem_text)
+    except (etree.XMLSyntaxError, ValueError):
+        return None
+    if tree.find('.//include') is not None:
+        return None
+
+    input_tags = inputtypes.registry.registered_tags() + solution_tags
+    max_score = 0
+    for response in tree.xpath('//' + "|//".join(response_tag_dict)):
+        response_class = response_tag_dict[response.tag]
+        if response_class.get_max_score.im_func is not responsetypes.LoncapaResponse.get_max_score.im_func or \
+                issubclass(response_class, responsetypes.AnnotationResponse):
+            # this response scores its input fields its own way
+            return None
+        for inputfield in response.xpath('|'.join('.//' + tag for tag in input_tags)):
+            try:
+                max_score += int(inputfield.get('points', '1'))
+            except ValueError:
+                return None
+    return max_score
+
+
+def static_max_score(problem_text):
+    """
+    Returns the maximum score of the problem of problem_text, found from its XML
+    without running its scripts; or None if it can't be, e.g. if it includes other
+    files.
+    """
+    key = _problem_text_hash(problem_text)
+    with _static_max_scores_lock:
+        if key in _static_max_scores:
+            max_score = _static_max_scores.pop(key)
+            _static_max_scores[key] = max_score
+            return max_score
+
+    max_score = _compute_static_max_score(problem_text)
+    with _static_max_scores_lock:
+        _static_max_scores[key] = max_score
+        while len(_static_max_scores) > STATIC_MAX_SCORE_CACHE_SIZE:
+            _static_max_scores.popitem(last=False)
+    return max_score
+
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -118,14 +197,10 @@ class LoncapaProblem(object):
         problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
         self.problem_text = problem_text
 
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
-
-        # handle any <include file="foo"> tags
-        self._process_includes()
-
-        # construct script processor context (eg for customresponse problems)
-        self.context = self._extract_context(self.tree)
+        # parse problem XML file into an element tree, handle any <include file="foo"> tags,
+        # and construct script processor context (eg for customresponse problems); or
+        # copy them from another instance of this problem with the same seed
+        self.tree, self.context = self._compile()
 
         # Pre-parse the XML tree: modifies it to add ID's and perform some in-place
         # transformations.  This also creates the dict (self.responders) of Response
@@ -406,6 +481,51 @@ class LoncapaProblem(object):
 
     # ======= Private Methods Below ========
 
+    def _compile(self):
+        '''
+        Returns the element tree of the problem, with its includes, and its script
+        context. They are computed once per process for each problem and seed:
+        instances get their own copy.
+        '''
+        tree = None
+        problem_text = self.problem_text
+        if '<include' in problem_text:
+            # the included files can change without the problem text changing
+            tree = etree.XML(problem_text)
+            self.tree = tree
+            self._process_includes()
+            problem_text = etree.tostring(tree)
+        key = (
+            _problem_text_hash(problem_text),
+            self.seed,
+            self.problem_id,
+            getattr(self.system.filestore, 'root_path', None),
+        )
+        with _compiled_problems_lock:
+            compiled = _compiled_problems.pop(key, None)
+            if compiled is not None:
+                _compiled_problems[key] = compiled
+        if compiled is not None:
+            tree, context = compiled
+            return deepcopy(tree), deepcopy(context)
+
+        if tree is None:
+            self.tree = etree.XML(self.problem_text)
+            self._process_includes()
+        context = self._extract_context(self.tree)
+
+        try:
+            compiled = (deepcopy(self.tree), deepcopy(context))
+        except Exception:  # pylint: disable=broad-except
+            # the context of code executed unsafely may hold anything, e.g. modules
+            log.debug("Not caching problem %s: its context can't be copied", self.problem_id)
+            return self.tree, context
+        with _compiled_problems_lock:
+            _compiled_problems[key] = compiled
+            while len(_compiled_problems) > COMPILED_PROBLEM_CACHE_SIZE:
+                _compiled_problems.popitem(last=False)
+        return self.tree, context
+
     def _process_includes(self):
         '''
         Handle any <include file="foo"> tags by reading in the specified file and inserting it
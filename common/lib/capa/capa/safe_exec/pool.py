@@ -0,0 +1,462 @@
+"""
+A pool of warm sandboxed Python workers for safe_exec.
+
+CodeJail starts a new sandboxed Python for each execution, which then imports
+what the code uses: most of the time of a short execution goes to starting up.
+A pool worker is started once, in the sandbox CodeJail is configured with (the
+same sandboxed Python, run as the same user), and imports the modules problems
+assume up front. It then runs each job in a process forked for it, so:
+
+  - jobs start with the modules already imported,
+  - no state is left from one job to the next, as each job's process exits,
+  - the job's process gets CodeJail's resource limits (CPU, VMEM), can't
+    create processes or write files, and is killed past the REALTIME limit
+    (or the timeout of the pool, if there is none).
+
+Jobs run as the same user as their worker, so the worker protects itself from
+them: it ignores the signals it can, and isn't dumpable, so jobs can't trace it
+or open its memory or file descriptors through /proc. A job can still stop or
+kill its worker: the pool then kills and replaces the worker, and the code is
+run by CodeJail instead.
+
+When no worker can be started, the code is run by CodeJail, and the pool tries
+again to start its workers WORKER_RETRY_DELAY seconds later.
+
+Jobs whose code needs files on its Python path aren't run in the pool, as
+workers can only read their own directory.
+
+Each process using safe_exec has its own pool, created on first use.
+"""
+
+import json
+import logging
+import os
+import Queue
+import select
+import subprocess
+import tempfile
+import threading
+import time
+
+from codejail import jail_code
+from codejail.safe_exec import json_safe, SafeExecException
+from dogapi import dog_stats_api
+
+log = logging.getLogger(__name__)
+
+# The program of the workers. Once ready, it writes its pid to stdout, then reads
+# jobs, one JSON object per line, from stdin and writes their results, one JSON
+# object per line, to stdout.
+WORKER_PY = r'''
+import ctypes
+import json
+import os
+import resource
+import select
+import signal
+import sys
+import time
+
+PR_SET_DUMPABLE = 4
+IGNORED_SIGNALS = (
+    signal.SIGHUP, signal.SIGINT, signal.SIGQUIT, signal.SIGTERM,
+    signal.SIGUSR1, signal.SIGUSR2, signal.SIGALRM,
+)
+
+# the group of the worker and its jobs' processes, for the pool to kill them
+if os.getpgrp() != os.getpid():
+    os.setpgrp()
+for signum in IGNORED_SIGNALS:
+    signal.signal(signum, signal.SIG_IGN)
+if ctypes.CDLL(None).prctl(PR_SET_DUMPABLE, 0, 0, 0, 0) != 0:
+    sys.exit(1)
+
+for modname in %(preimports)r:
+    try:
+        __import__(modname)
+    except Exception:
+        pass
+
+sys.stdout.write(json.dumps({"pid": os.getpid()}) + "\n")
+sys.stdout.flush()
+
+
+def run_job(job, result_w, error_w):
+    """Run the job in this forked process, which then exits"""
+    for signum in IGNORED_SIGNALS:
+        signal.signal(signum, signal.SIG_DFL)
+    for name, value in job["rlimits"]:
+        resource.setrlimit(getattr(resource, name), (value, value))
+    os.close(0)
+    os.dup2(result_w, 1)
+    os.dup2(error_w, 2)
+
+    g_dict = job["globals"]
+    exec job["code"] in g_dict
+
+    ok_types = (
+        type(None), int, long, float, str, unicode, list, tuple, dict
+    )
+    bad_keys = ("__builtins__",)
+
+    def jsonable(v):
+        if not isinstance(v, ok_types):
+            return False
+        try:
+            json.dumps(v)
+        except Exception:
+            return False
+        return True
+    g_dict = dict(
+        (k, v)
+        for k, v in g_dict.iteritems()
+        if jsonable(v) and k not in bad_keys
+    )
+    json.dump(g_dict, sys.stdout)
+    sys.stdout.flush()
+
+
+while True:
+    line = sys.stdin.readline()
+    if not line:
+        break
+    job = json.loads(line)
+    result_r, result_w = os.pipe()
+    error_r, error_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(result_r)
+            os.close(error_r)
+            run_job(job, result_w, error_w)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            sys.stderr.flush()
+            os._exit(1)
+        os._exit(0)
+    os.close(result_w)
+    os.close(error_w)
+    chunks = {result_r: [], error_r: []}
+    open_fds = [result_r, error_r]
+    deadline = time.time() + job["timeout"]
+    timed_out = False
+    while open_fds:
+        readable, _, _ = select.select(open_fds, [], [], max(deadline - time.time(), 0))
+        if not readable:
+            timed_out = True
+            os.kill(pid, signal.SIGKILL)
+            break
+        for fd in readable:
+            data = os.read(fd, 65536)
+            if data:
+                chunks[fd].append(data)
+            else:
+                open_fds.remove(fd)
+    for fd in (result_r, error_r):
+        os.close(fd)
+    # the job may have closed its pipes and still be running: keep to the
+    # deadline, and kill it by pid, as it may have left the worker's group
+    while True:
+        waited, status = os.waitpid(pid, os.WNOHANG)
+        if waited:
+            break
+        if time.time() >= deadline:
+            timed_out = True
+            os.kill(pid, signal.SIGKILL)
+            _, status = os.waitpid(pid, 0)
+            break
+        time.sleep(0.01)
+    if os.WIFEXITED(status):
+        status = os.WEXITSTATUS(status)
+    else:
+        status = -os.WTERMSIG(status)
+    sys.stdout.write(json.dumps({
+        "status": status,
+        "timed_out": timed_out,
+        "stdout": "".join(chunks[result_r]),
+        "stderr": "".join(chunks[error_r]),
+    }) + "\n")
+    sys.stdout.flush()
+'''
+
+# resource limits of the jobs' processes, for CodeJail's limits
+RLIMITS = {
+    'CPU': 'RLIMIT_CPU',
+    'VMEM': 'RLIMIT_AS',
+}
+
+# how long a worker has to import its modules and start answering
+WORKER_START_TIMEOUT = 60
+
+# how long the pool waits to start workers again after one failed to start
+WORKER_RETRY_DELAY = 60
+
+# kills the group of a worker, run as the user of the worker
+KILL_PY = 'import os, signal; os.killpg(%d, signal.SIGKILL)'
+
+_POOL_CONFIG = {'size': 0, 'timeout': 10, 'preimports': ()}
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def configure_pool(size, timeout=10, preimports=()):
+    """
+    Use a pool of `size` workers for safe_exec, 0 meaning no pool. `timeout` is
+    the number of seconds jobs can run when CodeJail has no REALTIME limit.
+    `preimports` are the names of the modules the workers import when started.
+    """
+    global _POOL  # pylint: disable=global-statement
+    with _POOL_LOCK:
+        _POOL_CONFIG.update(size=size, timeout=timeout, preimports=tuple(preimports))
+        if _POOL is not None:
+            _POOL.close()
+            _POOL = None
+
+
+def get_pool():
+    """
+    Returns the SandboxPool of this process, or None if there is no pool to use
+    """
+    global _POOL  # pylint: disable=global-statement
+    if not _POOL_CONFIG['size'] or not jail_code.is_configured('python'):
+        return None
+    with _POOL_LOCK:
+        # a pool is only used by the process which created it: its pipes are
+        # not to be shared with forked processes
+        if _POOL is None or _POOL.pid != os.getpid():
+            _POOL = SandboxPool(_POOL_CONFIG['size'], _POOL_CONFIG['timeout'], _POOL_CONFIG['preimports'])
+        return _POOL
+
+
+class SandboxWorker(object):
+    """
+    A sandboxed Python process running the jobs sent to it
+    """
+    def __init__(self, preimports):
+        command = jail_code.COMMANDS['python']
+        self.sandboxed = []
+        if command['user']:
+            self.sandboxed.extend(['sudo', '-u', command['user']])
+        self.sandboxed.extend(command['cmdline_start'])
+
+        # the pid of the worker's Python, once it is ready
+        self.pid = None
+        # as CodeJail does, run in a directory of our own the sandbox can read
+        self.tmpdir = tempfile.mkdtemp(prefix='codejail-')
+        os.chmod(self.tmpdir, 0775)
+        self.process = subprocess.Popen(
+            self.sandboxed + ['-c', WORKER_PY % {'preimports': list(preimports)}],
+            cwd=self.tmpdir, env={}, close_fds=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=open(os.devnull, 'w'),
+        )
+
+    def wait_ready(self, timeout):
+        """
+        Returns whether the worker started and is ready to run jobs within timeout
+        """
+        try:
+            readable, _, _ = select.select([self.process.stdout], [], [], timeout)
+            if not readable:
+                return False
+            line = self.process.stdout.readline()
+        except (IOError, OSError):
+            return False
+        try:
+            self.pid = json.loads(line)['pid']
+        except (ValueError, TypeError, KeyError):
+            return False
+        return True
+
+    def run(self, job, timeout):
+        """
+        Returns the result of job, or None if the worker didn't answer within timeout
+        """
+        try:
+            self.process.stdin.write(json.dumps(job) + '\n')
+            self.process.stdin.flush()
+            readable, _, _ = select.select([self.process.stdout], [], [], timeout)
+            if not readable:
+                return None
+            line = self.process.stdout.readline()
+        except (IOError, OSError):
+            return None
+        if not line:
+            return None
+        return json.loads(line)
+
+    def close(self):
+        """
+        Stop the worker, killing it and its job if it is running one
+        """
+        try:
+            self.process.stdin.close()
+            self.process.stdout.close()
+        except (IOError, OSError):
+            pass
+        if self.process.poll() is None:
+            if self.pid is None:
+                self.process.kill()
+            else:
+                # the worker runs as the sandbox user: kill it as that user too
+                with open(os.devnull, 'w') as devnull:
+                    subprocess.call(
+                        self.sandboxed + ['-c', KILL_PY % self.pid],
+                        cwd=self.tmpdir, env={}, close_fds=True, stdout=devnull, stderr=devnull,
+                    )
+        self.process.wait()
+        try:
+            os.rmdir(self.tmpdir)
+        except OSError:
+            pass
+
+
+class SandboxPool(object):
+    """
+    `size` warm SandboxWorkers, each running one job at a time
+    """
+    def __init__(self, size, timeout, preimports=()):
+        self.pid = os.getpid()
+        self.size = size
+        self.timeout = timeout
+        self.preimports = preimports
+
+        # the number of workers running, and when to try starting the missing ones
+        self.workers = 0
+        self._retry_at = 0
+
+        # jobs waiting for a worker, run, killed for running too long, and
+        # workers which stopped answering
+        self.waiting = 0
+        self.jobs = 0
+        self.timeouts = 0
+        self.failures = 0
+
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._idle = Queue.Queue()
+        self._start_workers()
+
+    def _start_workers(self):
+        """
+        Start the workers missing from the pool, unless one failed to start
+        less than WORKER_RETRY_DELAY seconds ago, or another thread is at it
+        """
+        if self.workers >= self.size or time.time() < self._retry_at:
+            return
+        if not self._start_lock.acquire(False):
+            return
+        try:
+            while self.workers < self.size:
+                worker = None
+                try:
+                    worker = SandboxWorker(self.preimports)
+                    ready = worker.wait_ready(WORKER_START_TIMEOUT)
+                except OSError:
+                    log.exception("Failed to start a sandbox worker")
+                    ready = False
+                if not ready:
+                    if worker is not None:
+                        worker.close()
+                    log.warning("Sandbox worker failed to start, retrying in %ss", WORKER_RETRY_DELAY)
+                    self._retry_at = time.time() + WORKER_RETRY_DELAY
+                    break
+                with self._lock:
+                    self.workers += 1
+                self._idle.put(worker)
+        finally:
+            self._start_lock.release()
+
+    def stats(self):
+        """
+        Returns the metrics of the pool, as a dict
+        """
+        return {
+            'size': self.size,
+            'workers': self.workers,
+            'idle': self._idle.qsize(),
+            'waiting': self.waiting,
+            'jobs': self.jobs,
+            'timeouts': self.timeouts,
+            'failures': self.failures,
+        }
+
+    def safe_exec(self, code, globals_dict, slug=None):
+        """
+        Execute code in a worker, like codejail.safe_exec.safe_exec: its results are
+        added to globals_dict, and SafeExecException is raised if it fails.
+
+        Returns False, running nothing, if the pool has no worker running, or
+        none is free within the timeout.
+        """
+        self._start_workers()
+        if not self.workers:
+            return False
+
+        job_timeout = jail_code.LIMITS.get('REALTIME') or self.timeout
+        rlimits = [
+            (RLIMITS[name], value) for name, value in jail_code.LIMITS.items()
+            if name in RLIMITS and value
+        ]
+        # processes of jobs can't create processes or files
+        rlimits.extend([('RLIMIT_NPROC', 0), ('RLIMIT_FSIZE', 0)])
+        job = {
+            'code': code,
+            'globals': json_safe(globals_dict),
+            'rlimits': rlimits,
+            'timeout': job_timeout,
+        }
+
+        with self._lock:
+            self.waiting += 1
+            dog_stats_api.histogram('capa.safe_exec.pool.queue_depth', self.waiting)
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except Queue.Empty:
+            log.warning("No sandbox worker free to run %s", slug)
+            return False
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+        result = None
+        try:
+            start = time.time()
+            result = worker.run(job, job_timeout + 1)
+            dog_stats_api.histogram('capa.safe_exec.pool.time', time.time() - start)
+        finally:
+            if result is None:
+                # the worker is stuck or gone: replace it
+                worker.close()
+                with self._lock:
+                    self.failures += 1
+                    self.workers -= 1
+                self._start_workers()
+            else:
+                self._idle.put(worker)
+
+        if result is None:
+            return False
+        with self._lock:
+            self.jobs += 1
+            if result['timed_out']:
+                self.timeouts += 1
+        if result['timed_out']:
+            dog_stats_api.increment('capa.safe_exec.pool.timeouts')
+        if result['status'] != 0:
+            raise SafeExecException("Couldn't execute jailed code: %s" % result['stderr'])
+        globals_dict.update(json.loads(result['stdout']))
+        return True
+
+    def close(self):
+        """
+        Stop the idle workers
+        """
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except Queue.Empty:
+                break
+            worker.close()
+            with self._lock:
+                self.workers -= 1
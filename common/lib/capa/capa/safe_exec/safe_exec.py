@@ -4,6 +4,7 @@ from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
 from . import lazymod
+from . import pool
 from dogapi import dog_stats_api
 
 import hashlib
@@ -46,6 +47,18 @@ for name, modname in ASSUMED_IMPORTS:
 
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
+# Modules the workers of the pool import when they start, for the code they run
+POOL_PREIMPORTS = [modname for _, modname in ASSUMED_IMPORTS] + ["sympy"]
+
+
+def configure_pool(size, timeout=10):
+    """
+    Run sandboxed code in a pool of `size` warm workers (see pool.py), rather than
+    in a new sandbox each time. 0 means no pool. `timeout` is the number of seconds
+    code can run if CodeJail has no REALTIME limit.
+    """
+    pool.configure_pool(size, timeout, preimports=POOL_PREIMPORTS)
+
 
 def update_hash(hasher, obj):
     """
@@ -119,12 +132,17 @@ def safe_exec(code, globals_dict, random_seed=None, python_path=None, cache=None
     else:
         exec_fn = codejail_safe_exec
 
+    # Use a warm worker if there is a pool, for code which doesn't need files.
+    sandbox_pool = pool.get_pool() if not unsafely and not python_path else None
+    full_code = code_prolog + LAZY_IMPORTS + code
+
     # Run the code!  Results are side effects in globals_dict.
     try:
-        exec_fn(
-            code_prolog + LAZY_IMPORTS + code, globals_dict,
-            python_path=python_path, slug=slug,
-        )
+        if sandbox_pool is None or not sandbox_pool.safe_exec(full_code, globals_dict, slug=slug):
+            exec_fn(
+                full_code, globals_dict,
+                python_path=python_path, slug=slug,
+            )
     except SafeExecException as e:
         emsg = e.message
     else:
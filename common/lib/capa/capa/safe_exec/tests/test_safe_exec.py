@@ -5,13 +5,16 @@ import os
 import os.path
 import random
 import textwrap
+import time
 import unittest
 
+from mock import patch
 from nose.plugins.skip import SkipTest
 
-from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec import configure_pool, safe_exec, update_hash
+from capa.safe_exec import pool
 from codejail.safe_exec import SafeExecException
-from codejail.jail_code import is_configured
+from codejail.jail_code import is_configured, LIMITS
 
 
 class TestSafeExec(unittest.TestCase):
@@ -90,6 +93,126 @@ class TestSafeOrNot(unittest.TestCase):
         self.assertEqual(g['files'], os.listdir('/'))
 
 
+class TestSafeExecPool(unittest.TestCase):
+    def setUp(self):
+        # The pool runs its workers in the sandbox, so needs CodeJail configured.
+        if not is_configured("python"):
+            raise SkipTest
+        configure_pool(1, timeout=5)
+
+    def tearDown(self):
+        configure_pool(0)
+
+    def test_runs_in_pool(self):
+        g = {}
+        safe_exec("a = int(math.pi)", g)
+        self.assertEqual(g['a'], 3)
+        self.assertEqual(pool.get_pool().stats()['jobs'], 1)
+
+    def test_no_state_between_jobs(self):
+        g = {}
+        safe_exec("import math; math.leaked = 1", g)
+        safe_exec("leaked = hasattr(math, 'leaked')", g)
+        self.assertFalse(g['leaked'])
+
+    def test_exceptions(self):
+        with self.assertRaises(SafeExecException) as cm:
+            safe_exec("1/0", {})
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+
+    def test_pool_not_configured(self):
+        configure_pool(0)
+        self.assertIsNone(pool.get_pool())
+
+    def test_cpu_limit(self):
+        with patch.dict(LIMITS, {'CPU': 1, 'REALTIME': 10}):
+            with self.assertRaises(SafeExecException):
+                safe_exec("while True: pass", {})
+        stats = pool.get_pool().stats()
+        self.assertEqual((stats['jobs'], stats['timeouts']), (1, 0))
+
+    def test_vmem_limit(self):
+        with patch.dict(LIMITS, {'VMEM': 512 * 1024 ** 2}):
+            with self.assertRaises(SafeExecException) as cm:
+                safe_exec("a = 'a' * (1024 ** 3)", {})
+        self.assertIn("MemoryError", cm.exception.message)
+        self.assertEqual(pool.get_pool().stats()['jobs'], 1)
+
+    def test_realtime_limit(self):
+        start = time.time()
+        with patch.dict(LIMITS, {'REALTIME': 1}):
+            with self.assertRaises(SafeExecException):
+                safe_exec("import time; time.sleep(10)", {})
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(pool.get_pool().stats()['timeouts'], 1)
+
+    def test_realtime_limit_after_closing_pipes(self):
+        start = time.time()
+        with patch.dict(LIMITS, {'REALTIME': 1}):
+            with self.assertRaises(SafeExecException):
+                safe_exec("import os, time; os.close(1); os.close(2); os.setpgrp(); time.sleep(10)", {})
+        self.assertLess(time.time() - start, 5)
+        stats = pool.get_pool().stats()
+        self.assertEqual((stats['timeouts'], stats['failures']), (1, 0))
+
+    def test_job_cannot_tamper_with_worker(self):
+        g = {}
+        safe_exec(textwrap.dedent("""\
+            import os, signal
+            worker = os.getppid()
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGUSR1):
+                os.kill(worker, signum)
+            tampered = []
+            for path in ('/proc/%d/mem', '/proc/%d/fd/1'):
+                try:
+                    os.open(path % worker, os.O_RDWR)
+                    tampered.append(path)
+                except OSError:
+                    pass
+            """), g)
+        self.assertEqual(g['tampered'], [])
+
+        # the worker is still there to run the next job
+        safe_exec("a = 1", g)
+        stats = pool.get_pool().stats()
+        self.assertEqual((stats['jobs'], stats['failures']), (2, 0))
+
+    def test_worker_stopped_by_job_replaced(self):
+        g = {}
+        with patch.dict(LIMITS, {'REALTIME': 1}):
+            safe_exec(textwrap.dedent("""\
+                import os, signal
+                try:
+                    os.kill(os.getppid(), signal.SIGSTOP)
+                except OSError:
+                    # not in the pool: the parent is CodeJail's sudo
+                    pass
+                a = 1
+                """), g)
+        # run by CodeJail instead, while the pool replaced the worker
+        self.assertEqual(g['a'], 1)
+        stats = pool.get_pool().stats()
+        self.assertEqual((stats['failures'], stats['workers']), (1, 1))
+
+    def test_no_worker_started(self):
+        configure_pool(1, timeout=5)
+        with patch.object(pool.SandboxWorker, 'wait_ready', return_value=False):
+            with patch.object(pool, 'WORKER_RETRY_DELAY', 0):
+                sandbox_pool = pool.get_pool()
+                g = {}
+                start = time.time()
+                safe_exec("a = 1", g)
+        # run by CodeJail right away
+        self.assertEqual(g['a'], 1)
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(sandbox_pool.stats()['workers'], 0)
+
+        # the worker is started again for the next job
+        safe_exec("a = 2", g)
+        self.assertEqual(sandbox_pool.stats()['workers'], 1)
+        self.assertEqual(sandbox_pool.stats()['jobs'], 1)
+
+
 class DictCache(object):
     """A cache implementation over a simple dict, for testing."""
 
@@ -0,0 +1,118 @@
+"""
+Tests of the work LoncapaProblem shares between instances of a problem
+"""
+import shutil
+import tempfile
+import textwrap
+import unittest
+
+import fs.osfs
+import mock
+
+from capa.capa_problem import LoncapaProblem, static_max_score
+import capa.capa_problem
+
+from . import test_system
+
+
+class CompiledProblemTest(unittest.TestCase):
+    """
+    Tests that instances of a problem with the same seed share its compilation.
+    """
+    xml = textwrap.dedent("""
+        <problem>
+            <script type="loncapa/python">
+            answer = str(seed)
+            </script>
+            <customresponse cfn="check" expect="$answer">
+                <textline size="10"/>
+            </customresponse>
+            <script type="loncapa/python">
+            def check(expect, ans):
+                return expect == ans
+            </script>
+        </problem>
+    """)
+
+    def setUp(self):
+        super(CompiledProblemTest, self).setUp()
+        self.system = test_system()
+        capa.capa_problem._compiled_problems.clear()  # pylint: disable=protected-access
+
+    def new_problem(self, seed):
+        """A new instance of the problem"""
+        return LoncapaProblem(self.xml, id='compiled', seed=seed, system=self.system)
+
+    def test_script_run_once_per_seed(self):
+        with mock.patch('capa.capa_problem.safe_exec', wraps=capa.capa_problem.safe_exec) as safe_exec:
+            first = self.new_problem(1)
+            second = self.new_problem(1)
+            self.assertEqual(safe_exec.call_count, 1)
+            self.new_problem(2)
+            self.assertEqual(safe_exec.call_count, 2)
+
+        self.assertEqual(first.context['answer'], '1')
+        self.assertEqual(second.context['answer'], '1')
+        self.assertIsNot(first.tree, second.tree)
+        self.assertIsNot(first.context, second.context)
+
+    def test_instances_graded_separately(self):
+        first = self.new_problem(1)
+        second = self.new_problem(1)
+        answer_id = 'compiled_2_1'
+
+        first.grade_answers({answer_id: '1'})
+        second.grade_answers({answer_id: 'wrong'})
+        self.assertEqual(first.correct_map.get_correctness(answer_id), 'correct')
+        self.assertEqual(second.correct_map.get_correctness(answer_id), 'incorrect')
+
+    def test_cache_bounded(self):
+        with mock.patch('capa.capa_problem.COMPILED_PROBLEM_CACHE_SIZE', 2):
+            for seed in range(3):
+                self.new_problem(seed)
+        self.assertEqual(len(capa.capa_problem._compiled_problems), 2)  # pylint: disable=protected-access
+
+    def test_included_file_changed(self):
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        self.system.filestore = fs.osfs.OSFS(tempdir)
+        xml = '<problem><include file="included.xml"/></problem>'
+
+        def included_text(problem):
+            """The text of the included element of problem"""
+            return problem.tree.find('.//p').text
+
+        self.system.filestore.setcontents('included.xml', '<p>first</p>')
+        self.assertEqual(included_text(LoncapaProblem(xml, id='included', seed=1, system=self.system)), 'first')
+        self.system.filestore.setcontents('included.xml', '<p>second</p>')
+        self.assertEqual(included_text(LoncapaProblem(xml, id='included', seed=1, system=self.system)), 'second')
+
+
+
+class StaticMaxScoreTest(unittest.TestCase):
+    """
+    Tests of finding the max score of problems without running them.
+    """
+
+    def test_points_of_inputs(self):
+        xml = textwrap.dedent("""
+            <problem>
+                <script type="loncapa/python">
+                import random
+                </script>
+                <stringresponse answer="a">
+                    <textline/>
+                </stringresponse>
+                <optionresponse>
+                    <optioninput options="('a','b')" correct="a" points="2"/>
+                    <optioninput options="('a','b')" correct="b"/>
+                </optionresponse>
+            </problem>
+        """)
+        self.assertEqual(static_max_score(xml), 4)
+        problem = LoncapaProblem(xml, id='static', seed=1, system=test_system())
+        self.assertEqual(problem.get_max_score(), 4)
+
+    def test_includes(self):
+        xml = '<problem><include file="other.xml"/></problem>'
+        self.assertIsNone(static_max_score(xml))
@@ -10,7 +10,8 @@ import sys
 
 from pkg_resources import resource_string
 
-from capa.capa_problem import LoncapaProblem
+from capa.capa_problem import LoncapaProblem, static_max_score
+from capa.correctmap import CorrectMap
 from capa.responsetypes import StudentInputError, \
     ResponseError, LoncapaProblemError
 from capa.util import convert_files_to_filenames
@@ -201,19 +202,34 @@ class CapaModule(CapaFields, XModule):
         # there.
         self.system.set('location', self.location.url())
 
+        # The LoncapaProblem runs the problem's scripts, so it is only created
+        # when needed: not to find the score or progress of the problem
+        self._lcp = None
+
+        assert self.seed is not None
+
+    @property
+    def lcp(self):
+        """
+        The LoncapaProblem of this module, created on first access
+        """
+        if self._lcp is None:
+            self._lcp = self.create_lcp()
+        return self._lcp
+
+    @lcp.setter
+    def lcp(self, lcp):
+        self._lcp = lcp
+
+    def create_lcp(self):
+        """
+        Create the LoncapaProblem of this module from its state, or one
+        displaying the error if the problem can't be created in DEBUG
+        """
         try:
             # TODO (vshnayder): move as much as possible of this work and error
             # checking to descriptor load time
-            self.lcp = self.new_lcp(self.get_state_for_lcp())
-
-            # At this point, we need to persist the randomization seed
-            # so that when the problem is re-loaded (to check/view/save)
-            # it stays the same.
-            # However, we do not want to write to the database
-            # every time the module is loaded.
-            # So we set the seed ONLY when there is not one set already
-            if self.seed is None:
-                self.seed = self.lcp.seed
+            return self.new_lcp(self.get_state_for_lcp())
 
         except Exception as err:
             msg = u'cannot create LoncapaProblem {loc}: {err}'.format(
@@ -234,14 +250,14 @@ class CapaModule(CapaFields, XModule):
                                     url=self.location.url(),
                                     msg=msg)
                                 )
-                self.lcp = self.new_lcp(self.get_state_for_lcp(), text=problem_text)
+                lcp = self.new_lcp(self.get_state_for_lcp(), text=problem_text)
             else:
                 # add extra info and raise
                 raise Exception(msg), None, sys.exc_info()[2]
 
+            self._lcp = lcp
             self.set_state_from_lcp()
-
-        assert self.seed is not None
+            return lcp
 
     def choose_new_seed(self):
         """
@@ -301,12 +317,26 @@ class CapaModule(CapaFields, XModule):
         """
         Access the problem's score
         """
-        return self.lcp.get_score()
+        if self._lcp is not None:
+            return self.lcp.get_score()
+
+        # as LoncapaProblem.get_score would, from the stored state
+        total = self.max_score()
+        if not self.student_answers:
+            return {'score': 0, 'total': total}
+        correct_map = CorrectMap()
+        correct_map.set_dict(self.correct_map)
+        score = sum(correct_map.get_npoints(answer_id) for answer_id in correct_map)
+        return {'score': score, 'total': total}
 
     def max_score(self):
         """
         Access the problem's max score
         """
+        if self._lcp is None:
+            max_score = static_max_score(self.data)
+            if max_score is not None:
+                return max_score
         return self.lcp.get_max_score()
 
     def get_progress(self):
@@ -470,7 +500,8 @@ class CapaModule(CapaFields, XModule):
 
             # Presumably, student submission has corrupted LoncapaProblem HTML.
             #   First, pull down all student answers
-            student_answers = self.lcp.student_answers
+            #   (from the module's state: the LoncapaProblem may be what failed to be created)
+            student_answers = dict(self.student_answers)
             answer_ids = student_answers.keys()
 
             # Some inputtypes, such as dynamath, have additional "hidden" state that
@@ -482,10 +513,6 @@ class CapaModule(CapaFields, XModule):
                     if answer_id.find(hidden_state_keyword) >= 0:
                         student_answers.pop(answer_id)
 
-            #   Next, generate a fresh LoncapaProblem
-            self.lcp = self.new_lcp(None)
-            self.set_state_from_lcp()
-
             # Prepend a scary warning to the student
             warning = '<div class="capa_reset">'\
                       '<h2>Warning: The problem has been reset to its initial state!</h2>'\
@@ -500,6 +527,17 @@ class CapaModule(CapaFields, XModule):
                        '</div>'
 
             html = warning
+
+            #   Next, generate a fresh LoncapaProblem
+            try:
+                lcp = self.new_lcp(None)
+            except Exception:  # pylint: disable=broad-except
+                # e.g. its scripts fail whatever the state: show the warning alone
+                log.exception("Unable to create a fresh LoncapaProblem")
+                return html
+            self.lcp = lcp
+            self.set_state_from_lcp()
+
             try:
                 html += self.lcp.get_html()
             except Exception:  # Couldn't do it. Give up
@@ -649,7 +687,7 @@ class CapaModule(CapaFields, XModule):
         Pressing RESET button makes this function to return False.
         """
         # used by conditional module
-        return self.lcp.done
+        return self.lcp.done if self._lcp is not None else self.done
 
     def is_attempted(self):
         """
@@ -683,7 +721,7 @@ class CapaModule(CapaFields, XModule):
         elif self.showanswer == 'answered':
             # NOTE: this is slightly different from 'attempted' -- resetting the problems
             # makes lcp.done False, but leaves attempts unchanged.
-            return self.lcp.done
+            return self.lcp.done if self._lcp is not None else self.done
         elif self.showanswer == 'closed':
             return self.closed()
         elif self.showanswer == 'finished':
@@ -1170,6 +1208,9 @@ class CapaDescriptor(CapaFields, RawDescriptor):
     metadata_translations = dict(RawDescriptor.metadata_translations)
     metadata_translations['attempts'] = 'max_attempts'
 
+    def static_max_score(self):
+        return static_max_score(self.data)
+
     def get_context(self):
         _context = RawDescriptor.get_context(self)
         _context.update({'markdown': self.markdown,
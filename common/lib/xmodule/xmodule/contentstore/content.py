@@ -3,6 +3,8 @@ XASSET_SRCREF_PREFIX = 'xasset:'
 
 XASSET_THUMBNAIL_TAIL_NAME = '.jpg'
 
+STREAM_DATA_CHUNK_SIZE = 1024
+
 import os
 import logging
 import StringIO
@@ -15,7 +17,7 @@ from PIL import Image
 
 class StaticContent(object):
     def __init__(self, loc, name, content_type, data, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False):
+                 length=None, locked=False, content_digest=None):
         self.location = loc
         self.name = name  # a display string which can be edited, and thus not part of the location which needs to be fixed
         self.content_type = content_type
@@ -27,6 +29,8 @@ class StaticContent(object):
         # cycles
         self.import_path = import_path
         self.locked = locked
+        # the md5 of the data, as computed by the store
+        self.content_digest = content_digest
 
     @property
     def is_thumbnail(self):
@@ -131,21 +135,54 @@ class StaticContent(object):
     def stream_data(self):
         yield self._data
 
+    def stream_data_in_range(self, first_byte, last_byte):
+        """
+        Yields the bytes of the data from first_byte to last_byte, inclusive
+        """
+        yield self._data[first_byte:last_byte + 1]
+
 
 class StaticContentStream(StaticContent):
     def __init__(self, loc, name, content_type, stream, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False):
+                 length=None, locked=False, content_digest=None):
         super(StaticContentStream, self).__init__(loc, name, content_type, None, last_modified_at=last_modified_at,
                                                   thumbnail_location=thumbnail_location, import_path=import_path,
-                                                  length=length, locked=locked)
+                                                  length=length, locked=locked, content_digest=content_digest)
         self._stream = stream
 
+    @property
+    def chunk_size(self):
+        """
+        The size of the reads from the stream: a whole chunk of the stored file when known
+        """
+        return getattr(self._stream, 'chunk_size', STREAM_DATA_CHUNK_SIZE)
+
     def stream_data(self):
-        while True:
-            chunk = self._stream.read(1024)
-            if len(chunk) == 0:
-                break
-            yield chunk
+        try:
+            while True:
+                chunk = self._stream.read(self.chunk_size)
+                if len(chunk) == 0:
+                    break
+                yield chunk
+        finally:
+            self.close()
+
+    def stream_data_in_range(self, first_byte, last_byte):
+        """
+        Yields the bytes of the stream from first_byte to last_byte, inclusive,
+        reading only the chunks of the stored file they are in
+        """
+        try:
+            self._stream.seek(first_byte)
+            remaining = last_byte - first_byte + 1
+            while remaining > 0:
+                chunk = self._stream.read(min(self.chunk_size, remaining))
+                if len(chunk) == 0:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            self.close()
 
     def close(self):
         self._stream.close()
@@ -154,7 +191,8 @@ class StaticContentStream(StaticContent):
         self._stream.seek(0)
         content = StaticContent(self.location, self.name, self.content_type, self._stream.read(),
                                 last_modified_at=self.last_modified_at, thumbnail_location=self.thumbnail_location,
-                                import_path=self.import_path, length=self.length, locked=self.locked)
+                                import_path=self.import_path, length=self.length, locked=self.locked,
+                                content_digest=self.content_digest)
         return content
 
 
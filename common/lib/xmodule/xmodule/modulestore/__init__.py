@@ -36,6 +36,52 @@ INVALID_HTML_CHARS = re.compile(r"[^\w-]")
 
 _LocationBase = namedtuple('LocationBase', 'tag org course category name revision')
 
+# The number of parsed and validated locations kept by Location
+LOCATION_INTERN_SIZE = 50000
+
+
+class InternTable(object):
+    """
+    A bounded table of recently used values, approximating an LRU cache with
+    plain dicts: entries live in a "hot" generation, and when it is full it
+    becomes the "cold" one, dropping the previous cold generation. Entries
+    found in the cold generation move back to the hot one, so every entry used
+    within the last `size` / 2 insertions is kept.
+
+    Safe to share between threads: at worst, concurrent inserts lose an entry.
+    """
+    def __init__(self, size):
+        self.generation_size = max(size // 2, 1)
+        self.hot = {}
+        self.cold = {}
+
+    def get(self, key):
+        """
+        Returns the value of key, or None
+        """
+        value = self.hot.get(key)
+        if value is None:
+            value = self.cold.get(key)
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def set(self, key, value):
+        """
+        Store value for key
+        """
+        if len(self.hot) >= self.generation_size:
+            self.cold = self.hot
+            self.hot = {}
+        self.hot[key] = value
+
+    def clear(self):
+        """
+        Forget every entry
+        """
+        self.hot = {}
+        self.cold = {}
+
 
 class Location(_LocationBase):
     '''
@@ -46,8 +92,13 @@ class Location(_LocationBase):
 
     However, they can also be represented as dictionaries (specifying each component),
     tuples or lists (specified in order), or as strings of the url
+
+    Locations are interned: creating one from a url or components that were
+    recently parsed and validated returns the same Location again. Their url()
+    and html_id() are computed once.
     '''
-    __slots__ = ()
+    # url string or tuple of components -> Location (only for Location itself, not subclasses)
+    _intern_table = InternTable(LOCATION_INTERN_SIZE)
 
     @staticmethod
     def _clean(value, invalid):
@@ -148,6 +199,39 @@ class Location(_LocationBase):
         else:
             location = (loc_or_tag, org, course, category, name, revision)
 
+        if isinstance(location, Location):
+            return location
+
+        if _cls is not Location:
+            return _cls._parse(location)
+
+        # strings are their own keys; lists, tuples and dicts are keyed by their components
+        if isinstance(location, basestring):
+            key = location
+        elif isinstance(location, (list, tuple)) and len(location) in (5, 6):
+            key = tuple(location)
+        elif isinstance(location, dict):
+            key = tuple(location.get(field) for field in _LocationBase._fields)
+        else:
+            return _cls._parse(location)
+
+        try:
+            interned = _cls._intern_table.get(key)
+        except TypeError:
+            # unhashable components are invalid anyway
+            return _cls._parse(location)
+        if interned is None:
+            interned = _cls._parse(location)
+            _cls._intern_table.set(key, interned)
+        return interned
+
+    @classmethod
+    def _parse(cls, location):
+        """
+        Create a new Location from any of the forms that Location() accepts,
+        checking that its components are valid.
+        """
+        _cls = cls
         if location is None:
             return _LocationBase.__new__(_cls, *([None] * 6))
 
@@ -200,10 +284,36 @@ class Location(_LocationBase):
         else:
             raise InvalidLocationError(location)
 
+    @classmethod
+    def from_trusted(cls, location):
+        """
+        Create a Location from the components of a location known to be valid,
+        such as the `_id` of an item read from the modulestore, without
+        checking them.
+
+        location: a dict of the components (revision may be omitted), or a
+            list or tuple of all 6 of them
+        """
+        if isinstance(location, dict):
+            return _LocationBase.__new__(
+                cls, location['tag'], location['org'], location['course'],
+                location['category'], location['name'], location.get('revision')
+            )
+        return _LocationBase.__new__(cls, *location)
+
     def url(self):
         """
         Return a string containing the URL for this location
         """
+        url = getattr(self, '_url', None)
+        if url is None:
+            url = self._url = self._build_url()
+        return url
+
+    def _build_url(self):
+        """
+        Compute url()
+        """
         url = "{0.tag}://{0.org}/{0.course}/{0.category}/{0.name}".format(self)
         if self.revision:
             url += "@" + self.revision
@@ -214,6 +324,15 @@ class Location(_LocationBase):
         Return a string with a version of the location that is safe for use in
         html id attributes
         """
+        html_id = getattr(self, '_html_id', None)
+        if html_id is None:
+            html_id = self._html_id = self._build_html_id()
+        return html_id
+
+    def _build_html_id(self):
+        """
+        Compute html_id()
+        """
         s = "-".join(str(v) for v in self.list()
                      if v is not None)
         return Location.clean_for_html(s)
@@ -392,6 +511,36 @@ class ModuleStore(object):
         """
         raise NotImplementedError
 
+    def get_course_version(self, course_id):
+        """
+        Returns an opaque token that changes whenever the content of the course
+        changes, for use in cache keys of data derived from the course. Returns
+        None if the course doesn't change for the lifetime of this modulestore.
+        """
+        raise NotImplementedError
+
+    def get_course_cache(self, course_id):
+        """
+        Returns the cache, shared between processes, in which data derived from
+        the course can be kept (stamped with get_course_version()), or None.
+        """
+        raise NotImplementedError
+
+    def heartbeat(self):
+        """
+        Checks, as cheaply as possible, that the storage backing this modulestore
+        can be reached. Raises an exception if it can't.
+        """
+        raise NotImplementedError
+
+    def prefetch(self, course_id, xblock, depth=1):
+        """
+        A hint that the descendants of xblock, down to depth (None for all of
+        them), are about to be loaded, so that modulestores which load items
+        lazily can fetch them in bulk.
+        """
+        raise NotImplementedError
+
 
 class ModuleStoreBase(ModuleStore):
     '''
@@ -442,6 +591,34 @@ class ModuleStoreBase(ModuleStore):
         """
         return {}
 
+    def get_course_version(self, course_id):
+        """
+        Returns None: unless a subclass says otherwise, courses don't change
+        once they have been loaded.
+        """
+        return None
+
+    def get_course_cache(self, course_id):
+        """
+        Returns the metadata inheritance cache, which is shared by every course
+        of this modulestore.
+        """
+        return self.metadata_inheritance_cache_subsystem
+
+    def heartbeat(self):
+        """
+        Does nothing: unless a subclass says otherwise, there is no storage
+        to check once the modulestore has been loaded.
+        """
+        pass
+
+    def prefetch(self, course_id, xblock, depth=1):
+        """
+        Does nothing: unless a subclass says otherwise, loading items one at a
+        time is as cheap as loading them in bulk.
+        """
+        pass
+
     def get_course(self, course_id):
         """Default impl--linear search through course list"""
         for c in self.get_courses():
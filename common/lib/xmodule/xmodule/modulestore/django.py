@@ -110,6 +110,30 @@ def clear_existing_modulestores():
     _MODULESTORES.clear()
 
 
+def close_connections():
+    """
+    Close the sockets the existing modulestores hold to MongoDB and to their
+    metadata inheritance cache. They reconnect on first use.
+
+    A process forked from one that used the modulestores (e.g. a worker of a
+    multiprocessing.Pool) calls this before using them, so that both processes
+    don't talk over the same sockets.
+    """
+    stores = _MODULESTORES.values()
+    while stores:
+        store = stores.pop()
+        # MixedModuleStore
+        stores.extend(getattr(store, 'modulestores', {}).values())
+
+        if getattr(store, 'collection', None) is not None:
+            store.collection.database.connection.disconnect()
+        if getattr(store, 'db', None) is not None:
+            store.db.connection.disconnect()
+        cache = getattr(store, 'metadata_inheritance_cache_subsystem', None)
+        if hasattr(cache, 'close'):
+            cache.close()
+
+
 def editable_modulestore(name='default'):
     """
     Retrieve a modulestore that we can modify.
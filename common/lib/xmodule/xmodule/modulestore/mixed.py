@@ -139,6 +139,31 @@ class MixedModuleStore(ModuleStoreBase):
         """
         return self._get_modulestore_for_courseid(course_id).get_modulestore_type(course_id)
 
+    def get_course_version(self, course_id):
+        """
+        Returns the version token of course_id from the modulestore servicing it
+        """
+        return self._get_modulestore_for_courseid(course_id).get_course_version(course_id)
+
+    def get_course_cache(self, course_id):
+        """
+        Returns the cache of the modulestore servicing course_id
+        """
+        return self._get_modulestore_for_courseid(course_id).get_course_cache(course_id)
+
+    def prefetch(self, course_id, xblock, depth=1):
+        """
+        Passes the prefetch hint on to the modulestore servicing course_id
+        """
+        self._get_modulestore_for_courseid(course_id).prefetch(course_id, xblock, depth)
+
+    def heartbeat(self):
+        """
+        Checks every underlying modulestore
+        """
+        for store in self.modulestores.values():
+            store.heartbeat()
+
     def get_errored_courses(self):
         """
         Return a dictionary of course_dir -> [(msg, exception_str)], for each
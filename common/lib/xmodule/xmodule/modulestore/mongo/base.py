@@ -16,12 +16,18 @@ import pymongo
 import sys
 import logging
 import copy
+import time
+import zlib
+import cPickle as pickle
 
 from bson.son import SON
+from collections import defaultdict
+from contextlib import contextmanager
 from fs.osfs import OSFS
 from itertools import repeat
 from path import path
 from operator import attrgetter
+from uuid import uuid4
 
 from importlib import import_module
 from xmodule.errortracker import null_error_tracker, exc_info_to_str
@@ -35,6 +41,7 @@ from xblock.fields import Scope, ScopeIds
 from xmodule.modulestore import ModuleStoreBase, Location, MONGO_MODULESTORE_TYPE
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.modulestore.inheritance import own_metadata, InheritanceMixin, inherit_metadata, InheritanceKeyValueStore
+from xmodule.modulestore.mongo.item_cache import get_item_cache
 
 log = logging.getLogger(__name__)
 
@@ -248,6 +255,116 @@ def location_to_query(location, wildcard=True):
 
 metadata_cache_key = attrgetter('org', 'course')
 
+# The categories of the modules whose metadata is inherited by their children
+# note this is a bit ugly as when we add new categories of containers, we have to add them here
+INHERITANCE_CONTAINER_CATEGORIES = [
+    'course', 'chapter', 'sequential', 'vertical', 'videosequence',
+    'wrapper', 'problemset', 'conditional', 'randomize'
+]
+
+
+def _inherit_down(tree, url, url_metadata):
+    """
+    Record, in tree, the metadata inherited by the subtree of the container at
+    url, whose own (merged) metadata is url_metadata
+    """
+    # go through all the children and recurse, but only if they are containers
+    for child in tree['children'].get(url, []):
+        tree['parents'][child] = url
+        if child in tree['own']:
+            new_child_metadata = copy.deepcopy(url_metadata)
+            new_child_metadata.update(tree['own'][child])
+            tree['metadata'][child] = new_child_metadata
+            _inherit_down(tree, child, new_child_metadata)
+        else:
+            # this is likely a leaf node, so let's record what metadata we need to inherit
+            tree['metadata'][child] = url_metadata
+
+
+def _merged_metadata(tree, url):
+    """
+    The metadata that the children of the container at url inherit
+    """
+    if url == tree['root']:
+        return tree['own'][url]
+    return tree['metadata'][url]
+
+
+def _reinherit(tree, url):
+    """
+    Recompute the metadata inherited by the container at url, and its subtree
+    """
+    if url == tree['root']:
+        url_metadata = tree['own'][url]
+    elif url in tree['parents']:
+        url_metadata = copy.deepcopy(_merged_metadata(tree, tree['parents'][url]))
+        url_metadata.update(tree['own'][url])
+        tree['metadata'][url] = url_metadata
+    else:
+        # not (yet) part of the course, so there is nobody to inherit from it
+        return
+    _inherit_down(tree, url, url_metadata)
+
+
+def _drop_inherited(tree, url):
+    """
+    Forget the metadata inherited by url and its subtree, which are no longer part of the course
+    """
+    tree['metadata'].pop(url, None)
+    tree['parents'].pop(url, None)
+    for child in tree['children'].get(url, []):
+        if tree['parents'].get(child) == url:
+            _drop_inherited(tree, child)
+
+
+def _remove_container(tree, url):
+    """
+    Remove the deleted container at url from tree. If its parent still lists
+    it, it gets treated as a leaf, as compute_metadata_inheritance_tree would.
+    """
+    for child in tree['children'].pop(url, []):
+        if tree['parents'].get(child) == url:
+            _drop_inherited(tree, child)
+    tree['own'].pop(url, None)
+    if url == tree['root']:
+        tree['root'] = None
+    if url in tree['parents']:
+        tree['metadata'][url] = _merged_metadata(tree, tree['parents'][url])
+
+
+# How long a write to a course may hold the lock on its cached inheritance tree,
+# and so how long other writes wait for it (see _inheritance_tree_lock)
+INHERITANCE_TREE_LOCK_TIMEOUT = 10
+
+# The cached inheritance tree (and parent map) is stored compressed, split in
+# chunks of at most this many bytes: memcached refuses items over 1MB, which the
+# trees of large courses can reach
+INHERITANCE_TREE_CHUNK_SIZE = 900 * 1024
+
+
+def inheritance_tree_cache_key(org, course, suffix):
+    """
+    Key of a cache entry that belongs with the inheritance tree of an org/course
+    combination (its lock or its chunks)
+    """
+    return u'metadata_inheritance/{0}/{1}/{2}'.format(org, course, suffix)
+
+
+def course_version_cache_key(org, course):
+    """
+    Key of the course version token of an org/course combination
+    """
+    return u'course_version/{0}/{1}'.format(org, course)
+
+
+def course_parents_cache_key(org, course, suffix=None):
+    """
+    Key of the parent map of an org/course combination, or of one of its chunks
+    if suffix
+    """
+    key = u'course_parents/{0}/{1}'.format(org, course)
+    return key if suffix is None else u'{0}/{1}'.format(key, suffix)
+
 
 class MongoModuleStore(ModuleStoreBase):
     """
@@ -258,7 +375,12 @@ class MongoModuleStore(ModuleStoreBase):
     def __init__(self, host, db, collection, fs_root, render_template,
                  port=27017, default_class=None,
                  error_tracker=null_error_tracker,
-                 user=None, password=None, mongo_options=None, **kwargs):
+                 user=None, password=None, mongo_options=None,
+                 item_cache_size=0, **kwargs):
+        """
+        item_cache_size: if not 0, the number of bytes of items read from the
+            collection that this process keeps in memory (see mongo.item_cache)
+        """
 
         super(MongoModuleStore, self).__init__(**kwargs)
 
@@ -294,8 +416,27 @@ class MongoModuleStore(ModuleStoreBase):
         self.render_template = render_template
         self.ignore_write_events_on_courses = []
 
+        self.item_cache = None
+        if item_cache_size:
+            self.item_cache = get_item_cache(
+                u'{0}:{1}/{2}/{3}'.format(host, port, db, collection), item_cache_size
+            )
+            if self.modulestore_update_signal is not None:
+                self.modulestore_update_signal.connect(self._drop_cached_items, weak=False)
+
     def compute_metadata_inheritance_tree(self, location):
         '''
+        Computes the metadata inheritance tree of the org/course combination of location.
+
+        The tree is a dict of:
+          'metadata': location url -> the metadata that module inherits (for containers,
+              merged with their own inheritable metadata, which their children inherit)
+          'own': container url -> its own inheritable metadata
+          'children': container url -> its children's urls
+          'parents': location url -> the url of the container it inherits from
+          'root': the url of the course
+        which is enough to update it after a write without computing it all again.
+
         TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
         '''
 
@@ -303,8 +444,7 @@ class MongoModuleStore(ModuleStoreBase):
         # note this is a bit ugly as when we add new categories of containers, we have to add it here
         query = {'_id.org': location.org,
                  '_id.course': location.course,
-                 '_id.category': {'$in': ['course', 'chapter', 'sequential', 'vertical', 'videosequence',
-                                          'wrapper', 'problemset', 'conditional', 'randomize']}
+                 '_id.category': {'$in': INHERITANCE_CONTAINER_CATEGORIES}
                  }
         # we just want the Location, children, and inheritable metadata
         record_filter = {'_id': 1, 'definition.children': 1}
@@ -317,86 +457,189 @@ class MongoModuleStore(ModuleStoreBase):
         # call out to the DB
         resultset = self.collection.find(query, record_filter)
 
-        results_by_url = {}
-        root = None
+        tree = {'metadata': {}, 'own': {}, 'children': {}, 'parents': {}, 'root': None}
 
         # now go through the results and order them by the location url
         for result in resultset:
-            location = Location(result['_id'])
+            location = Location.from_trusted(result['_id'])
             # We need to collate between draft and non-draft
             # i.e. draft verticals will have draft children but will have non-draft parents currently
             location = location.replace(revision=None)
             location_url = location.url()
-            if location_url in results_by_url:
-                existing_children = results_by_url[location_url].get('definition', {}).get('children', [])
-                additional_children = result.get('definition', {}).get('children', [])
-                total_children = existing_children + additional_children
-                results_by_url[location_url].setdefault('definition', {})['children'] = total_children
-            results_by_url[location.url()] = result
-            if location.category == 'course':
-                root = location.url()
-
-        # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
-
-        def _compute_inherited_metadata(url):
-            """
-            Helper method for computing inherited metadata for a specific location url
-            """
             # check for presence of metadata key. Note that a given module may not yet be fully formed.
             # example: update_item -> update_children -> update_metadata sequence on new item create
             # if we get called here without update_metadata called first then 'metadata' hasn't been set
-            # as we're not fully transactional at the DB layer. Same comment applies to below key name
-            # check
-            my_metadata = results_by_url[url].get('metadata', {})
-
-            # go through all the children and recurse, but only if we have
-            # in the result set. Remember results will not contain leaf nodes
-            for child in results_by_url[url].get('definition', {}).get('children', []):
-                if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
-                    _compute_inherited_metadata(child)
-                else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata
+            # as we're not fully transactional at the DB layer. Same comment applies to the children
+            tree['own'][location_url] = result.get('metadata', {})
+            tree['children'][location_url] = result.get('definition', {}).get('children', [])
+            if location.category == 'course':
+                tree['root'] = location_url
 
-        if root is not None:
-            _compute_inherited_metadata(root)
+        # now traverse the tree and compute down the inherited metadata
+        if tree['root'] is not None:
+            _inherit_down(tree, tree['root'], tree['own'][tree['root']])
 
-        return metadata_to_inherit
+        return tree
 
-    def get_cached_metadata_inheritance_tree(self, location, force_refresh=False):
-        '''
-        TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
-        '''
+    def _get_cached_inheritance_tree(self, location, force_refresh=False, use_request_cache=True):
+        """
+        Returns the metadata inheritance tree (see compute_metadata_inheritance_tree)
+        of the org/course combination of location, computing it if it isn't cached
+
+        Writes must hold the _inheritance_tree_lock for a force_refresh, and read
+        the tree without the request cache, which may hold a tree other processes
+        have updated since.
+        """
         key = metadata_cache_key(location)
-        tree = {}
+        tree = None
 
         if not force_refresh:
             # see if we are first in the request cache (if present)
-            if self.request_cache is not None and key in self.request_cache.data.get('metadata_inheritance', {}):
+            if use_request_cache and self.request_cache is not None and \
+                    key in self.request_cache.data.get('metadata_inheritance', {}):
                 return self.request_cache.data['metadata_inheritance'][key]
 
             # then look in any caching subsystem (e.g. memcached)
             if self.metadata_inheritance_cache_subsystem is not None:
-                tree = self.metadata_inheritance_cache_subsystem.get(key, {})
+                tree = self._read_cached_inheritance_tree(location)
             else:
                 logging.warning('Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is OK in localdev and testing environment. Not OK in production.')
 
-        if not tree:
+        if tree is None:
             # if not in subsystem, or we are on force refresh, then we have to compute
             tree = self.compute_metadata_inheritance_tree(location)
+            tree['version'] = uuid4().hex
 
-            # now write out computed tree to caching subsystem (e.g. memcached), if available
+            # now write out computed tree to caching subsystem (e.g. memcached), if available.
+            # A tree computed on a miss may predate a write whose update is stored
+            # meanwhile, so it never replaces a cached tree.
             if self.metadata_inheritance_cache_subsystem is not None:
-                self.metadata_inheritance_cache_subsystem.set(key, tree)
+                self._write_cached_inheritance_tree(location, tree, replace=force_refresh)
+
+        self._set_request_cached_inheritance_tree(key, tree)
+        return tree
+
+    def _read_cached_inheritance_tree(self, location):
+        """
+        Returns the inheritance tree of the org/course combination of location
+        from the caching subsystem, or None if it (or any of its chunks) isn't there
+        """
+        _, tree = self._read_cached_chunks(
+            metadata_cache_key(location),
+            lambda version, index: inheritance_tree_cache_key(
+                location.org, location.course, '{0}/{1}'.format(version, index)
+            ),
+        )
+        return tree
+
+    def _write_cached_inheritance_tree(self, location, tree, replace=True):
+        """
+        Store tree in the caching subsystem (see _write_cached_chunks).
 
-        # now populate a request_cache, if available. NOTE, we are outside of the
-        # scope of the above if: statement so that after a memcache hit, it'll get
-        # put into the request_cache
+        If not replace, the tree is only stored if there is none. Returns whether
+        it was stored.
+        """
+        return self._write_cached_chunks(
+            metadata_cache_key(location),
+            lambda version, index: inheritance_tree_cache_key(
+                location.org, location.course, '{0}/{1}'.format(version, index)
+            ),
+            tree['version'],
+            tree,
+            replace=replace,
+        )
+
+    def _read_cached_chunks(self, head_key, chunk_key):
+        """
+        Returns the head stored under head_key by _write_cached_chunks and the
+        value it heads, or None for the value if any of its chunks isn't there
+        (and for both if the head isn't there)
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+        head = cache.get(head_key)
+        # ignore values cached in an older format
+        if not isinstance(head, dict) or 'chunks' not in head:
+            return None, None
+        chunk_keys = [chunk_key(head['version'], index) for index in range(head['chunks'])]
+        chunks = cache.get_many(chunk_keys)
+        if not chunk_keys or len(chunks) != len(chunk_keys):
+            return head, None
+        return head, pickle.loads(zlib.decompress(''.join(chunks[key] for key in chunk_keys)))
+
+    def _write_cached_chunks(self, head_key, chunk_key, version, value, replace=True):
+        """
+        Store value in the caching subsystem, compressed and split in chunks that
+        fit in memcached items, under chunk_key(version, index): so a reader never
+        combines the chunks of different versions. Then store its head, the
+        version and number of chunks, under head_key.
+
+        If not replace, the value is only stored if there is none. Returns whether
+        it was stored.
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+        data = zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+        chunks = [
+            data[start:start + INHERITANCE_TREE_CHUNK_SIZE]
+            for start in range(0, len(data), INHERITANCE_TREE_CHUNK_SIZE)
+        ]
+        cache.set_many(dict(
+            (chunk_key(version, index), chunk)
+            for index, chunk in enumerate(chunks)
+        ))
+        head = {'version': version, 'chunks': len(chunks)}
+        if replace:
+            cache.set(head_key, head)
+            return True
+        return bool(cache.add(head_key, head))
+
+    @contextmanager
+    def _inheritance_tree_lock(self, location):
+        """
+        Serialize, across processes, the writes that update the cached inheritance
+        tree of the org/course combination of location: they read, modify and
+        store it, so concurrent ones would lose each other's updates.
+
+        Yields True once the lock is held, or False if it couldn't be taken within
+        INHERITANCE_TREE_LOCK_TIMEOUT seconds (e.g. the cache is down); the writer
+        then has to drop the cached tree rather than update it.
+        """
+        cache = self.metadata_inheritance_cache_subsystem
+        if cache is None:
+            # the tree only lives in this request
+            yield True
+            return
+
+        lock_key = inheritance_tree_cache_key(location.org, location.course, 'lock')
+        token = uuid4().hex
+        deadline = time.time() + INHERITANCE_TREE_LOCK_TIMEOUT
+        # the lock expires, so that a crashed writer can't keep it forever
+        while not cache.add(lock_key, token, INHERITANCE_TREE_LOCK_TIMEOUT):
+            if time.time() > deadline:
+                log.warning("Couldn't lock the inheritance tree of %s/%s", location.org, location.course)
+                yield False
+                return
+            time.sleep(0.01)
+        try:
+            yield True
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    def _drop_cached_inheritance_tree(self, location):
+        """
+        Forget the cached inheritance tree of the org/course combination of
+        location, which the next read computes again
+        """
+        if self.metadata_inheritance_cache_subsystem is not None:
+            self.metadata_inheritance_cache_subsystem.delete(metadata_cache_key(location))
+        if self.request_cache is not None:
+            self.request_cache.data.get('metadata_inheritance', {}).pop(metadata_cache_key(location), None)
+        self._bump_course_version(location)
+
+    def _set_request_cached_inheritance_tree(self, key, tree):
+        """
+        Put tree in the request_cache, if available
+        """
         if self.request_cache is not None:
             # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
             # defined
@@ -404,7 +647,14 @@ class MongoModuleStore(ModuleStoreBase):
                 self.request_cache.data['metadata_inheritance'] = {}
             self.request_cache.data['metadata_inheritance'][key] = tree
 
-        return tree
+    def get_cached_metadata_inheritance_tree(self, location, force_refresh=False):
+        '''
+        Returns a dict of location url -> the metadata that module inherits, for
+        every module of the org/course combination of location
+
+        TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
+        '''
+        return self._get_cached_inheritance_tree(location, force_refresh)['metadata']
 
     def refresh_cached_metadata_inheritance_tree(self, location):
         """
@@ -413,7 +663,133 @@ class MongoModuleStore(ModuleStoreBase):
         """
         pseudo_course_id = '/'.join([location.org, location.course])
         if pseudo_course_id not in self.ignore_write_events_on_courses:
-            self.get_cached_metadata_inheritance_tree(location, force_refresh=True)
+            with self._inheritance_tree_lock(location) as locked:
+                if locked:
+                    self._refresh_cached_inheritance_tree(location)
+                else:
+                    self._drop_cached_inheritance_tree(location)
+
+    def _refresh_cached_inheritance_tree(self, location):
+        """
+        Compute and cache the inheritance tree of the org/course combination of
+        location again, with the _inheritance_tree_lock held
+        """
+        tree = self._get_cached_inheritance_tree(location, force_refresh=True)
+        self._bump_course_version(location, tree['version'])
+
+    def update_cached_metadata_inheritance_tree(self, location, metadata=None, children=None, deleted=False):
+        """
+        Update the cached metadata inheritance tree after a write to location, which
+        set its own metadata and/or children, or deleted it.
+
+        Only the subtree of location is recomputed. Writes to leaves, whose metadata
+        nobody inherits, leave the tree alone. The whole tree is computed again when
+        the write can't be applied to it (drafts, which are collated with their
+        published versions, or containers the tree doesn't know about yet).
+
+        The tree is read, updated and stored with the _inheritance_tree_lock held,
+        so that concurrent writes to the course don't lose each other's updates.
+        """
+        location = Location(location)
+        pseudo_course_id = '/'.join([location.org, location.course])
+        if pseudo_course_id in self.ignore_write_events_on_courses:
+            return
+
+        if location.category not in INHERITANCE_CONTAINER_CATEGORIES:
+            self._bump_course_version(location)
+            return
+
+        with self._inheritance_tree_lock(location) as locked:
+            if not locked:
+                self._drop_cached_inheritance_tree(location)
+            elif location.revision is not None:
+                self._refresh_cached_inheritance_tree(location)
+            else:
+                self._update_cached_inheritance_tree(location, metadata, children, deleted)
+
+    def _update_cached_inheritance_tree(self, location, metadata, children, deleted):
+        """
+        Apply a write to the cached inheritance tree (see
+        update_cached_metadata_inheritance_tree), with the _inheritance_tree_lock held
+        """
+        tree = self._get_cached_inheritance_tree(
+            location, use_request_cache=self.metadata_inheritance_cache_subsystem is None
+        )
+        url = location.url()
+        if deleted:
+            _remove_container(tree, url)
+        else:
+            if url not in tree['own'] and (metadata is None or children is None):
+                # a container we haven't seen whole yet
+                self._refresh_cached_inheritance_tree(location)
+                return
+            if metadata is not None:
+                tree['own'][url] = dict(
+                    (name, value) for name, value in metadata.items() if name in InheritanceMixin.fields
+                )
+            if children is not None:
+                new_children = set(children)
+                if any(
+                    Location(child).category in INHERITANCE_CONTAINER_CATEGORIES and child not in tree['own']
+                    for child in new_children
+                ):
+                    # a container was moved here that we know nothing about
+                    self._refresh_cached_inheritance_tree(location)
+                    return
+                for child in tree['children'].get(url, []):
+                    if child not in new_children and tree['parents'].get(child) == url:
+                        _drop_inherited(tree, child)
+                tree['children'][url] = list(children)
+            if location.category == 'course':
+                tree['root'] = url
+            _reinherit(tree, url)
+
+        tree['version'] = uuid4().hex
+        if self.metadata_inheritance_cache_subsystem is not None:
+            self._write_cached_inheritance_tree(location, tree)
+        self._set_request_cached_inheritance_tree(metadata_cache_key(location), tree)
+        self._bump_course_version(location, tree['version'])
+
+    def get_course_version(self, course_id):
+        """
+        Returns a token that changes whenever any item of the org/course combination
+        of course_id is written, or None if there is no caching subsystem to keep it in.
+
+        The token lives next to the metadata inheritance tree, so that every process
+        sharing that cache sees writes made by the others.
+        """
+        if self.metadata_inheritance_cache_subsystem is None:
+            return None
+
+        org, course, _ = course_id.split('/')
+        return self._get_course_version(org, course)
+
+    def _get_course_version(self, org, course):
+        """
+        Returns the version token of an org/course combination, creating it if needed
+        """
+        key = course_version_cache_key(org, course)
+        version = self.metadata_inheritance_cache_subsystem.get(key)
+        if version is None:
+            # use whichever token got stored first if another process races us
+            self.metadata_inheritance_cache_subsystem.add(key, uuid4().hex)
+            version = self.metadata_inheritance_cache_subsystem.get(key)
+        return version
+
+    def _bump_course_version(self, location, version=None):
+        """
+        Record that the org/course combination of location has been written,
+        giving it the new version token `version` (by default, a new one)
+        """
+        if self.metadata_inheritance_cache_subsystem is not None:
+            self.metadata_inheritance_cache_subsystem.set(
+                course_version_cache_key(location.org, location.course), version or uuid4().hex
+            )
+        # the parent map of this request is stale now
+        if self.request_cache is not None:
+            self.request_cache.data.get('course_parents', {}).pop(
+                course_parents_cache_key(location.org, location.course), None
+            )
 
     def _clean_item_data(self, item):
         """
@@ -422,13 +798,71 @@ class MongoModuleStore(ModuleStoreBase):
         item['location'] = item['_id']
         del item['_id']
 
-    def _query_children_for_cache_children(self, items):
-        # first get non-draft in a round-trip
+    def _drop_cached_items(self, sender, course_id=None, **kwargs):
+        """
+        Receiver of the modulestore_update_signal: drops the items of the
+        written course from the item cache
+        """
+        org, course = course_id.split('/')
+        self.item_cache.invalidate((org, course))
+
+    def _item_cache_version(self, location):
+        """
+        Returns the version the items of the org/course combination of location
+        are cached at, or None if they can't be cached
+        """
+        if self.item_cache is None or self.metadata_inheritance_cache_subsystem is None:
+            return None
+        # writes made while importing a course don't change its version
+        if get_course_id_no_run(location) in self.ignore_write_events_on_courses:
+            return None
+        return self._get_course_version(location.org, location.course)
+
+    def _find_cached(self, locations, find):
+        """
+        Returns the items at `locations` (fully specified Locations) which exist.
+        Those in the item cache are copied from it, and `find(locations)` is called
+        to read the others from the collection.
+        """
+        if self.item_cache is None:
+            return find(locations)
+
+        by_course = defaultdict(list)
+        for location in locations:
+            by_course[(location.org, location.course)].append(location)
+
+        items = []
+        for course_key, course_locations in by_course.iteritems():
+            version = self._item_cache_version(course_locations[0])
+            if version is None:
+                items.extend(find(course_locations))
+                continue
+
+            cached = self.item_cache.get_many(course_key, version, [location.url() for location in course_locations])
+            to_find = [location for location in course_locations if location.url() not in cached]
+            if to_find:
+                # remember which of them don't exist, too
+                found = dict((location.url(), None) for location in to_find)
+                for item in find(to_find):
+                    found[Location.from_trusted(item['_id']).url()] = item
+                self.item_cache.set_many(course_key, version, found)
+                cached.update(found)
+            items.extend(item for item in cached.itervalues() if item is not None)
+        return items
+
+    def _find_by_ids(self, locations):
+        """
+        Reads the items at `locations` from the collection in a round-trip
+        """
         query = {
-            '_id': {'$in': [namedtuple_to_son(Location(item)) for item in items]}
+            '_id': {'$in': [namedtuple_to_son(location) for location in locations]}
         }
         return list(self.collection.find(query))
 
+    def _query_children_for_cache_children(self, items):
+        # first get non-draft in a round-trip
+        return self._find_cached([Location(item) for item in items], self._find_by_ids)
+
     def _cache_children(self, items, depth=0):
         """
         Returns a dictionary mapping Location -> item data, populated with json data
@@ -445,7 +879,7 @@ class MongoModuleStore(ModuleStoreBase):
             for item in to_process:
                 self._clean_item_data(item)
                 children.extend(item.get('definition', {}).get('children', []))
-                data[Location(item['location'])] = item
+                data[Location.from_trusted(item['location'])] = item
 
             if depth == 0:
                 break
@@ -526,13 +960,18 @@ class MongoModuleStore(ModuleStoreBase):
         specified, returns the latest.  If the item is not present, raise
         ItemNotFoundError.
         '''
-        item = self.collection.find_one(
-            location_to_query(location, wildcard=False),
-            sort=[('revision', pymongo.ASCENDING)],
-        )
-        if item is None:
+        def find(locations):
+            """Read the item from the collection"""
+            item = self.collection.find_one(
+                location_to_query(locations[0], wildcard=False),
+                sort=[('revision', pymongo.ASCENDING)],
+            )
+            return [item] if item is not None else []
+
+        items = self._find_cached([Location(location)], find)
+        if not items:
             raise ItemNotFoundError(location)
-        return item
+        return items[0]
 
     def has_item(self, course_id, location):
         """
@@ -640,16 +1079,18 @@ class MongoModuleStore(ModuleStoreBase):
         """
         # Save any changes to the xmodule to the MongoKeyValueStore
         xmodule.save()
+        metadata = own_metadata(xmodule)
+        children = xmodule.children if xmodule.has_children else []
         self.collection.save({
                 '_id': xmodule.location.dict(),
-                'metadata': own_metadata(xmodule),
+                'metadata': metadata,
                 'definition': {
                     'data': xmodule.get_explicitly_set_fields_by_scope(Scope.content),
-                    'children': xmodule.children if xmodule.has_children else []
+                    'children': children
                 }
             })
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(xmodule.location)
+        # update the metadata inheritance tree which is cached
+        self.update_cached_metadata_inheritance_tree(xmodule.location, metadata=metadata, children=children)
         self.fire_updated_modulestore_signal(get_course_id_no_run(xmodule.location), xmodule.location)
 
     def create_and_save_xmodule(self, location, definition_data=None, metadata=None, system=None):
@@ -755,6 +1196,10 @@ class MongoModuleStore(ModuleStoreBase):
         except ItemNotFoundError:
             if not allow_not_found:
                 raise
+        else:
+            location = Location(location)
+            if get_course_id_no_run(location) not in self.ignore_write_events_on_courses:
+                self._bump_course_version(location)
 
     def update_children(self, location, children):
         """
@@ -766,8 +1211,8 @@ class MongoModuleStore(ModuleStoreBase):
         """
 
         self._update_single_item(location, {'definition.children': children})
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(Location(location))
+        # update the metadata inheritance tree which is cached
+        self.update_cached_metadata_inheritance_tree(Location(location), children=children)
         # fire signal that we've written to DB
         self.fire_updated_modulestore_signal(get_course_id_no_run(Location(location)), Location(location))
 
@@ -796,8 +1241,8 @@ class MongoModuleStore(ModuleStoreBase):
             self.update_metadata(course.location, own_metadata(course))
 
         self._update_single_item(location, {'metadata': metadata})
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(loc)
+        # update the metadata inheritance tree which is cached
+        self.update_cached_metadata_inheritance_tree(loc, metadata=metadata)
         self.fire_updated_modulestore_signal(get_course_id_no_run(Location(location)), Location(location))
 
     def delete_item(self, location, delete_all_versions=False):
@@ -822,8 +1267,8 @@ class MongoModuleStore(ModuleStoreBase):
         # Must include this to avoid the django debug toolbar (which defines the deprecated "safe=False")
         # from overriding our default value set in the init method.
         self.collection.remove({'_id': Location(location).dict()}, safe=self.collection.safe)
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(Location(location))
+        # update the metadata inheritance tree which is cached
+        self.update_cached_metadata_inheritance_tree(Location(location), deleted=True)
         self.fire_updated_modulestore_signal(get_course_id_no_run(Location(location)), Location(location))
 
     def get_parent_locations(self, location, course_id):
@@ -831,10 +1276,76 @@ class MongoModuleStore(ModuleStoreBase):
         course.  Needed for path_to_location().
         '''
         location = Location.ensure_fully_specified(location)
+        parent_map = self._get_cached_parent_map(location)
+        if parent_map is not None:
+            return list(parent_map.get(location.url(), []))
+
         items = self.collection.find({'definition.children': location.url()},
                                      {'_id': True})
         return [i['_id'] for i in items]
 
+    def compute_parent_map(self, location):
+        """
+        Returns a dict of location url -> the `_id`s of all the items that have
+        it as a child, for the org/course combination of location
+        """
+        items = self.collection.find(
+            {
+                '_id.org': location.org,
+                '_id.course': location.course,
+                'definition.children': {'$exists': True, '$ne': []},
+            },
+            {'_id': True, 'definition.children': True}
+        )
+        parent_map = {}
+        for item in items:
+            for child in item['definition']['children']:
+                parent_map.setdefault(child, []).append(item['_id'])
+        return parent_map
+
+    def _get_cached_parent_map(self, location):
+        """
+        Returns the parent map (see compute_parent_map) of the org/course
+        combination of location, which is cached for as long as the course
+        version doesn't change, or None if it can't be cached: the parents of
+        each location are then queried on their own.
+        """
+        pseudo_course_id = '/'.join([location.org, location.course])
+        if self.metadata_inheritance_cache_subsystem is None or pseudo_course_id in self.ignore_write_events_on_courses:
+            return None
+
+        key = course_parents_cache_key(location.org, location.course)
+        # writes through this modulestore drop the request cached map (see _bump_course_version)
+        if self.request_cache is not None and key in self.request_cache.data.get('course_parents', {}):
+            return self.request_cache.data['course_parents'][key]
+
+        version = self._get_course_version(location.org, location.course)
+        if version is None:
+            # the caching subsystem is down
+            return None
+
+        def chunk_key(map_version, index):
+            """Key of a chunk of the parent map of the course"""
+            return course_parents_cache_key(location.org, location.course, '{0}/{1}'.format(map_version, index))
+
+        head, parent_map = self._read_cached_chunks(key, chunk_key)
+        if head is not None and head['version'] == version and not head['chunks']:
+            # the map couldn't be stored for this version of the course
+            return None
+        if parent_map is None or head['version'] != version:
+            parent_map = self.compute_parent_map(location)
+            self._write_cached_chunks(key, chunk_key, version, parent_map)
+            # check it was stored: if not, query the parents of each location
+            # rather than scan the course again on each request
+            stored_head, stored_map = self._read_cached_chunks(key, chunk_key)
+            if stored_map is None or stored_head['version'] != version:
+                log.warning("Couldn't cache the parent map of %s", pseudo_course_id)
+                self.metadata_inheritance_cache_subsystem.set(key, {'version': version, 'chunks': 0})
+
+        if self.request_cache is not None:
+            self.request_cache.data.setdefault('course_parents', {})[key] = parent_map
+        return parent_map
+
     def get_modulestore_type(self, course_id):
         """
         Returns a type which identifies which modulestore is servicing the given
@@ -842,6 +1353,12 @@ class MongoModuleStore(ModuleStoreBase):
         """
         return MONGO_MODULESTORE_TYPE
 
+    def heartbeat(self):
+        """
+        Pings the Mongo server, raising pymongo's errors if it can't be reached.
+        """
+        self.collection.database.command('ping')
+
     def _create_new_field_data(self, category, location, definition_data, metadata):
         """
         To instantiate a new xmodule which will be saved latter, set up the dbModel and kvs
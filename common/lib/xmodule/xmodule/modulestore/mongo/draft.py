@@ -12,7 +12,7 @@ from xmodule.exceptions import InvalidVersionError
 from xmodule.modulestore import Location
 from xmodule.modulestore.exceptions import ItemNotFoundError, DuplicateItemError
 from xmodule.modulestore.inheritance import own_metadata
-from xmodule.modulestore.mongo.base import location_to_query, namedtuple_to_son, get_course_id_no_run, MongoModuleStore
+from xmodule.modulestore.mongo.base import location_to_query, get_course_id_no_run, MongoModuleStore
 import pymongo
 from pytz import UTC
 from xblock.fields import Scope
@@ -274,10 +274,7 @@ class DraftModuleStore(MongoModuleStore):
             to_process_dict[Location(non_draft["_id"])] = non_draft
 
         # now query all draft content in another round-trip
-        query = {
-            '_id': {'$in': [namedtuple_to_son(as_draft(Location(item))) for item in items]}
-        }
-        to_process_drafts = list(self.collection.find(query))
+        to_process_drafts = self._find_cached([as_draft(Location(item)) for item in items], self._find_by_ids)
 
         # now we have to go through all drafts and replace the non-draft
         # with the draft. This is because the semantics of the DraftStore is to
@@ -0,0 +1,138 @@
+"""
+A process-wide cache of the documents read by Mongo modulestores.
+
+Every get_item() of a MongoModuleStore queries Mongo for the item, then once
+per level of descendents it loads, so the same course is read again on every
+request. A MongoModuleStore configured with a non-zero `item_cache_size` keeps
+the documents it reads in an ItemCache, shared by all the modulestores of the
+process reading the same collection, and only queries Mongo for the others.
+
+The documents of a course are cached at the version of the course they were
+read at (see MongoModuleStore.get_course_version), which every write bumps,
+so writes made by any process are seen. Writes made by this process also drop
+the cached documents of their course straight away, through the
+modulestore_update_signal.
+
+Documents are kept pickled: each read returns a new copy, which the caller is
+free to modify, and the size of the cache is bounded by the size of the
+pickles. When the cache is full, the courses used least recently are dropped.
+"""
+
+import cPickle as pickle
+import threading
+from collections import OrderedDict
+
+_ITEM_CACHES = {}
+_ITEM_CACHES_LOCK = threading.Lock()
+
+
+def get_item_cache(name, max_size):
+    """
+    Returns the ItemCache of this process called `name`, creating it with
+    `max_size` if it doesn't exist yet.
+    """
+    with _ITEM_CACHES_LOCK:
+        if name not in _ITEM_CACHES:
+            _ITEM_CACHES[name] = ItemCache(max_size)
+        return _ITEM_CACHES[name]
+
+
+def _entry_size(url, data):
+    """Approximate memory used by an entry"""
+    return len(url) + (len(data) if data is not None else 0)
+
+
+class ItemCache(object):
+    """
+    A bounded, thread-safe cache of Mongo documents, by course and location url.
+
+    A cached document of None records that there is no item at its location.
+    """
+    def __init__(self, max_size):
+        """
+        max_size: the number of bytes of pickled documents to keep
+        """
+        self.max_size = max_size
+        self.size = 0
+
+        # Number of documents found, or not, in the cache
+        self.hits = 0
+        self.misses = 0
+
+        # course key -> {'version', 'items': {url: pickled document or None}, 'size'},
+        # from the least to the most recently used course
+        self._courses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, course_key, version, urls):
+        """
+        Returns a dict of url -> document of the urls of `urls` that are cached
+        for `course_key` at `version`.
+        """
+        with self._lock:
+            course = self._courses.pop(course_key, None)
+            if course is None:
+                found = {}
+            else:
+                self._courses[course_key] = course
+                if course['version'] != version:
+                    found = {}
+                else:
+                    found = dict((url, course['items'][url]) for url in urls if url in course['items'])
+            self.hits += len(found)
+            self.misses += len(urls) - len(found)
+
+        return dict(
+            (url, pickle.loads(data) if data is not None else None)
+            for url, data in found.iteritems()
+        )
+
+    def set_many(self, course_key, version, documents):
+        """
+        Cache the documents of `documents` (a dict of url -> document) for
+        `course_key`, as read at `version`. The documents of the course read
+        at any other version are dropped.
+        """
+        pickled = dict(
+            (url, pickle.dumps(document, pickle.HIGHEST_PROTOCOL) if document is not None else None)
+            for url, document in documents.iteritems()
+        )
+        with self._lock:
+            course = self._courses.pop(course_key, None)
+            if course is not None and course['version'] != version:
+                self.size -= course['size']
+                course = None
+            if course is None:
+                course = {'version': version, 'items': {}, 'size': 0}
+            self._courses[course_key] = course
+
+            for url, data in pickled.iteritems():
+                if url in course['items']:
+                    previous = _entry_size(url, course['items'][url])
+                    course['size'] -= previous
+                    self.size -= previous
+                course['items'][url] = data
+                course['size'] += _entry_size(url, data)
+                self.size += _entry_size(url, data)
+
+            # drop the least recently used courses, but not the one just written
+            while self.size > self.max_size and len(self._courses) > 1:
+                _, dropped = self._courses.popitem(last=False)
+                self.size -= dropped['size']
+
+    def invalidate(self, course_key):
+        """
+        Drop the documents of `course_key`
+        """
+        with self._lock:
+            course = self._courses.pop(course_key, None)
+            if course is not None:
+                self.size -= course['size']
+
+    def clear(self):
+        """
+        Drop every document
+        """
+        with self._lock:
+            self._courses.clear()
+            self.size = 0
@@ -29,6 +29,36 @@ def path_to_location(modulestore, course_id, location):
     If the section is a sequential or vertical, position will be the position
     of this location in that sequence.  Otherwise, position will
     be None. TODO (vshnayder): Not true yet.
+
+    Paths are cached in the modulestore's cache for the course for as long as
+    the version of the course doesn't change.
+    '''
+    location = Location(location)
+    cache = modulestore.get_course_cache(course_id)
+    version = modulestore.get_course_version(course_id) if cache is not None else None
+    if version is None:
+        return _path_to_location(modulestore, course_id, location)
+
+    key = path_cache_key(course_id, location)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    path = _path_to_location(modulestore, course_id, location)
+    cache.set(key, (version, path))
+    return path
+
+
+def path_cache_key(course_id, location):
+    """
+    Key of the cached path to location in course_id
+    """
+    return u'path_to_location/{0}/{1}'.format(course_id, location.url())
+
+
+def _path_to_location(modulestore, course_id, location):
+    '''
+    Computes path_to_location(modulestore, course_id, location)
     '''
 
     def flatten(xs):
@@ -108,7 +138,8 @@ def path_to_location(modulestore, course_id, location):
             category = path[path_index].category
             if category == 'sequential' or category == 'videosequence':
                 section_desc = modulestore.get_instance(course_id, path[path_index])
-                child_locs = [c.location for c in section_desc.get_children()]
+                # no need to load the children to find out where this one is
+                child_locs = [Location(child) for child in section_desc.children]
                 # positions are 1-indexed, and should be strings to be consistent with
                 # url parsing.
                 position_list.append(str(child_locs.index(path[path_index + 1]) + 1))
@@ -1,3 +1,5 @@
+import copy
+
 from xmodule.modulestore.locator import DefinitionLocator
 
 
@@ -8,19 +10,33 @@ class DefinitionLazyLoader(object):
     object doesn't force access during init but waits until client wants the
     definition. Only works if the modulestore is a split mongo store.
     """
-    def __init__(self, modulestore, definition_id):
+    def __init__(self, modulestore, definition_id, system=None, usage_id=None):
         """
         Simple placeholder for yet-to-be-fetched data
         :param modulestore: the pymongo db connection with the definitions
         :param definition_locator: the id of the record in the above to fetch
+        :param system: the CachingDescriptorSystem whose module_data holds the block
+            of this definition, if its definition can be fetched with those of the
+            rest of its subtree
+        :param usage_id: the usage_id of that block
         """
         self.modulestore = modulestore
         self.definition_locator = DefinitionLocator(definition_id)
+        self.system = system
+        self.usage_id = usage_id
+        # set when the definition is fetched along with others (see SplitMongoModuleStore.fetch_definitions)
+        self.fetched = False
+        self.definition = None
 
     def fetch(self):
         """
         Fetch the definition. Note, the caller should replace this lazy
         loader pointer with the result so as not to fetch more than once
         """
+        if not self.fetched and self.system is not None:
+            self.modulestore.fetch_definitions(self.system, [self.usage_id])
+        if self.fetched:
+            # callers may modify what they get
+            return copy.deepcopy(self.definition)
         return self.modulestore.definitions.find_one(
             {'_id': self.definition_locator.definition_id})
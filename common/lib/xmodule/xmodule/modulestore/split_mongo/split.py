@@ -18,10 +18,14 @@ from xmodule.modulestore import inheritance, ModuleStoreBase, Location
 from ..exceptions import ItemNotFoundError
 from .definition_lazy_loader import DefinitionLazyLoader
 from .caching_descriptor_system import CachingDescriptorSystem
+from .structure_cache import StructureCache
 from xblock.fields import Scope
 from xblock.runtime import Mixologist
 
 log = logging.getLogger(__name__)
+
+# The number of course versions whose descriptor systems each thread keeps
+COURSE_CACHE_SIZE = 10
 #==============================================================================
 # Documentation is at
 # https://edx-wiki.atlassian.net/wiki/display/ENG/Mongostore+Data+Structure
@@ -55,7 +59,20 @@ class SplitMongoModuleStore(ModuleStoreBase):
                  user=None, password=None,
                  mongo_options=None,
                  loc_mapper=None,
+                 course_cache_size=COURSE_CACHE_SIZE,
+                 structure_cache_size=0,
+                 structure_cache_timeout=None,
                  **kwargs):
+        """
+        course_cache_size: the number of course versions whose descriptor
+            systems each thread keeps
+        structure_cache_size: if not 0, the number of bytes of structures
+            that the threads of the process share (see structure_cache). Their
+            generations are kept in the metadata_inheritance_cache_subsystem.
+        structure_cache_timeout: if not None, structures are also kept that
+            many seconds in the metadata_inheritance_cache_subsystem, to
+            share them with other processes
+        """
 
         super(SplitMongoModuleStore, self).__init__(**kwargs)
         self.loc_mapper = loc_mapper
@@ -73,9 +90,18 @@ class SplitMongoModuleStore(ModuleStoreBase):
         self.structures = self.db[collection + '.structures']
         self.definitions = self.db[collection + '.definitions']
 
-        # Code review question: How should I expire entries?
-        # _add_cache could use a lru mechanism to control the cache size?
+        # descriptor systems are per thread: see CachingDescriptorSystem._load_item
         self.thread_cache = threading.local()
+        self.course_cache_size = course_cache_size
+
+        self.structure_cache = None
+        if structure_cache_size or structure_cache_timeout is not None:
+            self.structure_cache = StructureCache(
+                structure_cache_size,
+                shared_cache=self.metadata_inheritance_cache_subsystem,
+                shared_timeout=structure_cache_timeout,
+                share_structures=structure_cache_timeout is not None,
+            )
 
         if user is not None and password is not None:
             self.db.authenticate(user, password)
@@ -122,8 +148,9 @@ class SplitMongoModuleStore(ModuleStoreBase):
             )
 
         if lazy:
-            for block in new_module_data.itervalues():
-                block['definition'] = DefinitionLazyLoader(self, block['definition'])
+            for usage_id, block in new_module_data.iteritems():
+                if not isinstance(block['definition'], DefinitionLazyLoader):
+                    block['definition'] = DefinitionLazyLoader(self, block['definition'], system, usage_id)
         else:
             # Load all descendants by id
             descendent_definitions = self.definitions.find({
@@ -140,6 +167,45 @@ class SplitMongoModuleStore(ModuleStoreBase):
         system.module_data.update(new_module_data)
         return system.module_data
 
+    def fetch_definitions(self, system, usage_ids, depth=None):
+        """
+        Fetch, in a single query, the definitions of the blocks of usage_ids and
+        of their descendants (down to depth) which system loaded lazily and which
+        have not been fetched yet.
+        :param system: a CachingDescriptorSystem
+        :param usage_ids: list of usage_ids whose subtrees to fetch
+        :param depth: how deep below these to fetch; None for the whole subtrees
+        """
+        blocks = {}
+        for usage_id in usage_ids:
+            blocks = self.descendants(system.module_data, usage_id, depth, blocks)
+        loaders = [
+            block['definition'] for block in blocks.itervalues()
+            if isinstance(block['definition'], DefinitionLazyLoader) and not block['definition'].fetched
+        ]
+        if not loaders:
+            return
+
+        definitions = self.definitions.find({
+            '_id': {'$in': list(set(loader.definition_locator.definition_id for loader in loaders))}
+        })
+        definitions = {definition['_id']: definition for definition in definitions}
+        for loader in loaders:
+            loader.definition = definitions.get(loader.definition_locator.definition_id)
+            loader.fetched = True
+
+    def prefetch(self, course_id, xblock, depth=1):
+        """
+        Load the descendants of xblock down to depth into its runtime's cache,
+        and fetch all their definitions in one query.
+        """
+        system = xblock.runtime
+        if not isinstance(system, CachingDescriptorSystem) or not system.lazy:
+            return
+        usage_id = xblock.location.usage_id
+        self.cache_items(system, [usage_id], depth, lazy=True)
+        self.fetch_definitions(system, [usage_id], depth)
+
     def _load_items(self, course_entry, usage_ids, depth=0, lazy=True):
         '''
         Load & cache the given blocks from the course. Prefetch down to the
@@ -163,25 +229,36 @@ class SplitMongoModuleStore(ModuleStoreBase):
             self.cache_items(system, usage_ids, depth, lazy)
         return [system.load_item(usage_id, course_entry) for usage_id in usage_ids]
 
+    def _course_cache(self):
+        """
+        The descriptor systems of this thread, from the least to the most recently used
+        """
+        if not hasattr(self.thread_cache, 'course_cache'):
+            self.thread_cache.course_cache = collections.OrderedDict()
+        return self.thread_cache.course_cache
+
     def _get_cache(self, course_version_guid):
         """
         Find the descriptor cache for this course if it exists
         :param course_version_guid:
         """
-        if not hasattr(self.thread_cache, 'course_cache'):
-            self.thread_cache.course_cache = {}
-        system = self.thread_cache.course_cache
-        return system.get(course_version_guid)
+        course_cache = self._course_cache()
+        system = course_cache.pop(course_version_guid, None)
+        if system is not None:
+            course_cache[course_version_guid] = system
+        return system
 
     def _add_cache(self, course_version_guid, system):
         """
-        Save this cache for subsequent access
+        Save this cache for subsequent access, dropping the least recently used
+        ones beyond course_cache_size
         :param course_version_guid:
         :param system:
         """
-        if not hasattr(self.thread_cache, 'course_cache'):
-            self.thread_cache.course_cache = {}
-        self.thread_cache.course_cache[course_version_guid] = system
+        course_cache = self._course_cache()
+        course_cache[course_version_guid] = system
+        while len(course_cache) > self.course_cache_size:
+            course_cache.popitem(last=False)
         return system
 
     def _clear_cache(self, course_version_guid=None):
@@ -190,9 +267,30 @@ class SplitMongoModuleStore(ModuleStoreBase):
         :param course_version_guid: if provided, clear only this entry
         """
         if course_version_guid:
-            del self.thread_cache.course_cache[course_version_guid]
+            self._course_cache().pop(course_version_guid, None)
+            if self.structure_cache is not None:
+                self.structure_cache.invalidate(course_version_guid)
         else:
-            self.thread_cache.course_cache = {}
+            self.thread_cache.course_cache = collections.OrderedDict()
+            if self.structure_cache is not None:
+                self.structure_cache.clear()
+
+    def _get_structures(self, version_guids):
+        """
+        Returns the structures of version_guids which exist, taking those the
+        structure cache has from it
+        :param version_guids: a list of structure _ids
+        """
+        if self.structure_cache is None:
+            return list(self.structures.find({'_id': {'$in': version_guids}}))
+
+        structures = self.structure_cache.get_many(version_guids)
+        missing = [version_guid for version_guid in version_guids if version_guid not in structures]
+        if missing:
+            for structure in self.structures.find({'_id': {'$in': missing}}):
+                self.structure_cache.set(structure)
+                structures[structure['_id']] = structure
+        return structures.values()
 
     def _lookup_course(self, course_locator):
         '''
@@ -207,8 +305,8 @@ class SplitMongoModuleStore(ModuleStoreBase):
 
         :param course_locator: any subclass of CourseLocator
         '''
-        # NOTE: if and when this uses cache, the update if changed logic will break if the cache
-        # holds the same objects as the descriptors!
+        # NOTE: the structure cache returns a new copy of the structure on each lookup: the update
+        # if changed logic would break if the cache held the same objects as the descriptors!
         if not course_locator.is_fully_specified():
             raise InsufficientSpecificationError('Not fully specified: %s' % course_locator)
 
@@ -229,7 +327,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
 
         # cast string to ObjectId if necessary
         version_guid = course_locator.as_object_id(version_guid)
-        entry = self.structures.find_one({'_id': version_guid})
+        entry = next(iter(self._get_structures([version_guid])), None)
 
         # b/c more than one course can use same structure, the 'course_id' and 'branch' are not intrinsic to structure
         # and the one assoc'd w/ it by another fetch may not be the one relevant to this fetch; so,
@@ -241,6 +339,12 @@ class SplitMongoModuleStore(ModuleStoreBase):
         }
         return envelope
 
+    def heartbeat(self):
+        """
+        Pings the Mongo server, raising pymongo's errors if it can't be reached.
+        """
+        self.db.command('ping')
+
     def get_courses(self, branch='published', qualifiers=None):
         '''
         Returns a list of course descriptors matching any given qualifiers.
@@ -267,7 +371,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
             version_guids.append(version_guid)
             id_version_map[version_guid] = structure['_id']
 
-        course_entries = self.structures.find({'_id': {'$in': version_guids}})
+        course_entries = self._get_structures(version_guids)
 
         # get the block for the course element (s/b the root)
         result = []
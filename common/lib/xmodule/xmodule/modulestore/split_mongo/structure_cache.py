@@ -0,0 +1,185 @@
+"""
+A cache of split modulestore structures, shared by the threads of a process.
+
+A structure is never modified once a course's index points at it (edits create
+a new version of the structure), so a structure read by one thread can be
+handed to any other. Each read returns a new copy, as callers modify the
+structures they get (inheritance is computed into them, and new versions are
+made from them).
+
+Structures are kept pickled, from the least to the most recently used, up to
+a number of bytes. Optionally, they are also kept in a cache shared between
+processes (such as a django cache), which is looked up before querying Mongo.
+
+A few low level operations do update a structure in place, though (see
+SplitMongoModuleStore.internal_clean_children). When there is a shared cache,
+each structure has a generation in it, which an in-place update replaces, and
+structures kept in memory are stamped with the generation they were read at:
+so the copies other processes keep in memory stop being used too. Without a
+shared cache, only the process making the update can know of it.
+"""
+
+import cPickle as pickle
+import threading
+from collections import OrderedDict
+from uuid import uuid4
+
+
+def structure_cache_key(structure_id):
+    """
+    Key of the structure `structure_id` in the shared cache
+    """
+    return u'split_structure/{0}'.format(structure_id)
+
+
+def structure_generation_key(structure_id):
+    """
+    Key of the generation of the structure `structure_id` in the shared cache
+    """
+    return u'split_structure_generation/{0}'.format(structure_id)
+
+
+class StructureCache(object):
+    """
+    A bounded, thread-safe LRU cache of structures by _id.
+    """
+    def __init__(self, max_size, shared_cache=None, shared_timeout=None, share_structures=True):
+        """
+        max_size: the number of bytes of pickled structures to keep in memory
+        shared_cache: a cache shared between processes, with the interface
+            of django's caches, to keep the generations of structures in, and
+            to also keep structures in if share_structures
+        shared_timeout: how long structures are kept in shared_cache
+        """
+        self.max_size = max_size
+        self.size = 0
+        self.shared_cache = shared_cache
+        self.shared_timeout = shared_timeout
+        self.share_structures = share_structures
+
+        # Structures found in memory, found in the shared cache, or not found;
+        # and structures dropped to make room for others
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # _id -> (generation, pickled structure), from the least to the most recently used
+        self._structures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stats(self):
+        """
+        Returns the metrics of the cache, as a dict
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': self.size,
+                'count': len(self._structures),
+            }
+
+    def get_many(self, structure_ids):
+        """
+        Returns a dict of _id -> structure of the structures of `structure_ids`
+        that are cached
+        """
+        generations = self._generations(structure_ids)
+        found = {}
+        with self._lock:
+            for structure_id in structure_ids:
+                entry = self._structures.pop(structure_id, None)
+                if entry is None:
+                    continue
+                if entry[0] != generations.get(structure_id):
+                    # updated in place since it was read
+                    self.size -= len(entry[1])
+                    continue
+                self._structures[structure_id] = entry
+                found[structure_id] = entry[1]
+            self.hits += len(found)
+
+        missing = [structure_id for structure_id in structure_ids if structure_id not in found]
+        shared_hits = 0
+        if missing and self.shared_cache is not None and self.share_structures:
+            keys = dict((structure_cache_key(structure_id), structure_id) for structure_id in missing)
+            for key, data in self.shared_cache.get_many(keys.keys()).iteritems():
+                found[keys[key]] = data
+                self._add(keys[key], generations.get(keys[key]), data)
+                shared_hits += 1
+        with self._lock:
+            self.shared_hits += shared_hits
+            self.misses += len(structure_ids) - len(found)
+
+        return dict((structure_id, pickle.loads(data)) for structure_id, data in found.iteritems())
+
+    def set(self, structure):
+        """
+        Cache `structure`, as read from Mongo
+        """
+        data = pickle.dumps(structure, pickle.HIGHEST_PROTOCOL)
+        generation = self._generations([structure['_id']]).get(structure['_id'])
+        self._add(structure['_id'], generation, data)
+        if self.shared_cache is not None and self.share_structures:
+            self.shared_cache.set(structure_cache_key(structure['_id']), data, self.shared_timeout)
+
+    def _generations(self, structure_ids):
+        """
+        Returns a dict of _id -> the generation in the shared cache of each of
+        the structures of `structure_ids`, giving one to those which have none,
+        or {} if there is no shared cache
+        """
+        if self.shared_cache is None:
+            return {}
+        keys = dict((structure_generation_key(structure_id), structure_id) for structure_id in structure_ids)
+        generations = dict(
+            (keys[key], generation) for key, generation in self.shared_cache.get_many(keys.keys()).iteritems()
+        )
+        for key, structure_id in keys.iteritems():
+            if structure_id not in generations:
+                # use whichever generation got stored first if another process races us
+                self.shared_cache.add(key, uuid4().hex)
+                generations[structure_id] = self.shared_cache.get(key)
+        return generations
+
+    def _add(self, structure_id, generation, data):
+        """
+        Keep the pickled structure, read at `generation`, in memory, dropping
+        the least recently used ones if there isn't room for it
+        """
+        if len(data) > self.max_size:
+            return
+        with self._lock:
+            previous = self._structures.pop(structure_id, None)
+            if previous is not None:
+                self.size -= len(previous[1])
+            self._structures[structure_id] = (generation, data)
+            self.size += len(data)
+            while self.size > self.max_size:
+                _, (_, dropped) = self._structures.popitem(last=False)
+                self.size -= len(dropped)
+                self.evictions += 1
+
+    def invalidate(self, structure_id):
+        """
+        Forget the structure `structure_id`, which was modified in place, here
+        and, through a new generation, in the other processes sharing the cache
+        """
+        with self._lock:
+            entry = self._structures.pop(structure_id, None)
+            if entry is not None:
+                self.size -= len(entry[1])
+        if self.shared_cache is not None:
+            self.shared_cache.set(structure_generation_key(structure_id), uuid4().hex)
+            self.shared_cache.delete(structure_cache_key(structure_id))
+
+    def clear(self):
+        """
+        Forget every structure kept in memory
+        """
+        with self._lock:
+            self._structures.clear()
+            self.size = 0
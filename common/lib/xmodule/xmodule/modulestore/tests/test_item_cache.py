@@ -0,0 +1,60 @@
+"""
+Tests for xmodule.modulestore.mongo.item_cache.
+"""
+from unittest import TestCase
+
+from xmodule.modulestore.mongo.item_cache import ItemCache, get_item_cache
+
+URL = 'i4x://org/course/problem/p'
+ITEM = {'_id': {'name': 'p'}, 'metadata': {'display_name': 'P'}}
+
+
+class ItemCacheTest(TestCase):
+    """
+    Tests of ItemCache.
+    """
+
+    def setUp(self):
+        self.cache = ItemCache(10000)
+
+    def test_get_copies(self):
+        self.cache.set_many(('org', 'course'), 'v1', {URL: ITEM, URL + '2': None})
+        cached = self.cache.get_many(('org', 'course'), 'v1', [URL, URL + '2', URL + '3'])
+        self.assertEqual(cached, {URL: ITEM, URL + '2': None})
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+        cached[URL]['metadata']['display_name'] = 'changed'
+        self.assertEqual(self.cache.get_many(('org', 'course'), 'v1', [URL]), {URL: ITEM})
+
+    def test_versions(self):
+        self.cache.set_many(('org', 'course'), 'v1', {URL: ITEM})
+        self.assertEqual(self.cache.get_many(('org', 'course'), 'v2', [URL]), {})
+
+        # items read at another version replace the course's items
+        self.cache.set_many(('org', 'course'), 'v2', {URL + '2': ITEM})
+        self.assertEqual(self.cache.get_many(('org', 'course'), 'v2', [URL, URL + '2']), {URL + '2': ITEM})
+
+    def test_invalidate(self):
+        self.cache.set_many(('org', 'course'), 'v1', {URL: ITEM})
+        self.cache.set_many(('org', 'other'), 'v1', {URL: ITEM})
+        self.cache.invalidate(('org', 'course'))
+        self.assertEqual(self.cache.get_many(('org', 'course'), 'v1', [URL]), {})
+        self.assertEqual(self.cache.get_many(('org', 'other'), 'v1', [URL]), {URL: ITEM})
+
+        self.cache.clear()
+        self.assertEqual(self.cache.size, 0)
+
+    def test_least_recently_used_dropped(self):
+        self.cache.set_many(('org', 'a'), 'v1', {URL: ITEM})
+        self.cache.max_size = self.cache.size * 2
+        self.cache.set_many(('org', 'b'), 'v1', {URL: ITEM})
+        self.cache.get_many(('org', 'a'), 'v1', [URL])
+        self.cache.set_many(('org', 'c'), 'v1', {URL: ITEM})
+
+        self.assertEqual(self.cache.get_many(('org', 'a'), 'v1', [URL]), {URL: ITEM})
+        self.assertEqual(self.cache.get_many(('org', 'b'), 'v1', [URL]), {})
+        self.assertEqual(self.cache.get_many(('org', 'c'), 'v1', [URL]), {URL: ITEM})
+        self.assertEqual(self.cache.size, self.cache.max_size)
+
+    def test_shared(self):
+        self.assertIs(get_item_cache('test_shared', 100), get_item_cache('test_shared', 200))
@@ -1,5 +1,5 @@
-from nose.tools import assert_equals, assert_raises, assert_not_equals  # pylint: disable=E0611
-from xmodule.modulestore import Location
+from nose.tools import assert_equals, assert_raises, assert_not_equals, assert_is, assert_is_none  # pylint: disable=E0611
+from xmodule.modulestore import Location, InternTable
 from xmodule.modulestore.exceptions import InvalidLocationError
 
 
@@ -168,3 +168,49 @@ def test_course_id():
     loc = Location('i4x', 'mitX', '103', '_not_a_course', 'test2')
     with assert_raises(InvalidLocationError):
         loc.course_id
+
+
+def test_interned():
+    fields = ['tag', 'org', 'course', 'category', 'interned']
+    loc = Location("tag://org/course/category/interned")
+    assert_is(loc, Location("tag://org/course/category/interned"))
+    assert_is(Location(fields), Location(tuple(fields)))
+    assert_is(Location(dict(zip(Location._fields, fields))), Location(dict(zip(Location._fields, fields))))
+    assert_equals(loc, Location(fields))
+
+
+def test_interned_invalid():
+    # invalid locations are never remembered
+    for _ in range(2):
+        assert_raises(InvalidLocationError, Location, "tag://org/course/category/name with spaces")
+        assert_raises(InvalidLocationError, Location, ["foo", "bar", "baz", "blat/blat", "foo"])
+
+
+def test_url_cached():
+    loc = Location("tag://org/course/cat/name:more_name@rev")
+    assert_is(loc.url(), loc.url())
+    assert_is(loc.html_id(), loc.html_id())
+    assert_equals(loc.url(), "tag://org/course/cat/name:more_name@rev")
+
+
+def test_from_trusted():
+    son = {'tag': 'tag', 'org': 'org', 'course': 'course', 'category': 'category', 'name': 'name'}
+    assert_equals(Location.from_trusted(son), Location(input_str))
+    loc = Location.from_trusted(['tag', 'org', 'course', 'category', 'name', 'revision'])
+    assert_equals(loc, Location(input_str_rev))
+    assert_equals(type(loc), Location)
+
+
+def test_intern_table():
+    table = InternTable(4)
+    for key in range(4):
+        table.set(key, str(key))
+    # 0 and 1 are in the previous generation
+    assert_equals(table.get(0), '0')
+    for key in range(4, 6):
+        table.set(key, str(key))
+    # 0 was used recently enough to be kept; 1 was not
+    assert_equals(table.get(0), '0')
+    assert_is_none(table.get(1))
+    table.clear()
+    assert_is_none(table.get(5))
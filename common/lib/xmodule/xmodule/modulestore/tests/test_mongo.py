@@ -116,6 +116,10 @@ class TestMongoModuleStore(object):
         store = MongoModuleStore(HOST, DB, COLLECTION, FS_ROOT, RENDER_TEMPLATE, default_class=DEFAULT_CLASS)
         assert_equals(store.get_modulestore_type('foo/bar/baz'), 'mongo')
 
+    def test_heartbeat(self):
+        # Doesn't raise while the server is up
+        self.store.heartbeat()
+
     def test_get_courses(self):
         '''Make sure the course objects loaded properly'''
         courses = self.store.get_courses()
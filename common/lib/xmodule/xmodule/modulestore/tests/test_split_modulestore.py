@@ -20,6 +20,10 @@ from pytz import UTC
 from path import path
 import re
 import random
+import threading
+
+from mock import patch
+from xmodule.modulestore.split_mongo.structure_cache import StructureCache
 
 
 class SplitModuleTest(unittest.TestCase):
@@ -1097,6 +1101,79 @@ class TestInheritance(SplitModuleTest):
     # TODO test inheritance after set and delete of attrs
 
 
+class TestStructureCache(SplitModuleTest):
+    """
+    Test the sharing of structures between threads.
+    """
+    def tearDown(self):
+        modulestore().structure_cache = None
+        modulestore()._clear_cache()
+        super(TestStructureCache, self).tearDown()
+
+    def test_shared_between_threads(self):
+        store = modulestore()
+        store.structure_cache = StructureCache(10 ** 7)
+        store._clear_cache()
+        locator = CourseLocator(course_id='GreekHero', branch='draft')
+        course = store.get_course(locator)
+
+        # a thread with no descriptor systems of its own doesn't read the structure again
+        results = []
+        with patch.object(store.structures, 'find', wraps=store.structures.find) as mock_find:
+            thread = threading.Thread(target=lambda: results.append(store.get_course(locator)))
+            thread.start()
+            thread.join()
+            self.assertFalse(mock_find.called)
+        self.assertEqual(results[0].location, course.location)
+        self.assertEqual(results[0].display_name, course.display_name)
+        self.assertEqual(store.structure_cache.stats()['hits'], 1)
+
+    def test_descriptor_systems_bounded(self):
+        store = modulestore()
+        store._clear_cache()
+        with patch.object(store, 'course_cache_size', 1):
+            store.get_course(CourseLocator(course_id='GreekHero', branch='draft'))
+            store.get_course(CourseLocator(course_id='wonderful', branch='draft'))
+            self.assertEqual(len(store.thread_cache.course_cache), 1)
+
+
+class TestDefinitionPrefetch(SplitModuleTest):
+    """
+    Test that lazily loaded definitions are fetched in bulk.
+    """
+    def setUp(self):
+        super(TestDefinitionPrefetch, self).setUp()
+        modulestore()._clear_cache()
+
+    def load_content(self, xblock):
+        """Read the content fields of xblock and of its descendants"""
+        for field in xblock.fields.values():
+            if field.scope == Scope.content and field.name != 'location':
+                getattr(xblock, field.name)
+        for child in xblock.get_children():
+            self.load_content(child)
+
+    def test_subtree_fetched_together(self):
+        store = modulestore()
+        locator = BlockUsageLocator(course_id="GreekHero", usage_id="head12345", branch='draft')
+        with patch.object(store.definitions, 'find', wraps=store.definitions.find) as mock_find:
+            with patch.object(store.definitions, 'find_one', wraps=store.definitions.find_one) as mock_find_one:
+                self.load_content(store.get_item(locator, depth=None))
+                self.assertEqual(mock_find.call_count, 1)
+                self.assertFalse(mock_find_one.called)
+
+    def test_prefetch(self):
+        store = modulestore()
+        locator = BlockUsageLocator(course_id="GreekHero", usage_id="head12345", branch='draft')
+        course = store.get_item(locator)
+        with patch.object(store.definitions, 'find', wraps=store.definitions.find) as mock_find:
+            with patch.object(store.definitions, 'find_one', wraps=store.definitions.find_one) as mock_find_one:
+                store.prefetch(locator.course_id, course, depth=None)
+                self.load_content(course)
+                self.assertEqual(mock_find.call_count, 1)
+                self.assertFalse(mock_find_one.called)
+
+
 #===========================================
 # This mocks the django.modulestore() function and is intended purely to disentangle
 # the tests from django
@@ -0,0 +1,97 @@
+"""
+Tests for xmodule.modulestore.split_mongo.structure_cache.
+"""
+from unittest import TestCase
+
+from xmodule.modulestore.split_mongo.structure_cache import StructureCache, structure_cache_key
+
+
+class DictCache(object):
+    """
+    The part of the interface of django's caches used by StructureCache
+    """
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def get_many(self, keys):
+        return dict((key, self.data[key]) for key in keys if key in self.data)
+
+    def add(self, key, value, timeout=None):
+        self.data.setdefault(key, value)
+
+    def set(self, key, value, timeout=None):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+def structure(structure_id):
+    """A structure document"""
+    return {'_id': structure_id, 'root': 'course', 'blocks': {'course': {'fields': {}}}}
+
+
+class StructureCacheTest(TestCase):
+    """
+    Tests of StructureCache.
+    """
+
+    def test_get_copies(self):
+        cache = StructureCache(10000)
+        cache.set(structure('a'))
+        found = cache.get_many(['a', 'b'])
+        self.assertEqual(found, {'a': structure('a')})
+
+        found['a']['blocks']['course']['fields']['changed'] = True
+        self.assertEqual(cache.get_many(['a']), {'a': structure('a')})
+        self.assertEqual(cache.stats()['hits'], 2)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_least_recently_used_evicted(self):
+        cache = StructureCache(10000)
+        cache.set(structure('a'))
+        cache.max_size = cache.size * 2
+        cache.set(structure('b'))
+        cache.get_many(['a'])
+        cache.set(structure('c'))
+
+        self.assertEqual(sorted(cache.get_many(['a', 'b', 'c'])), ['a', 'c'])
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertEqual(cache.stats()['count'], 2)
+
+    def test_shared_cache(self):
+        shared = DictCache()
+        StructureCache(10000, shared).set(structure('a'))
+
+        # another process finds it in the shared cache, then keeps it in memory
+        cache = StructureCache(10000, shared)
+        self.assertEqual(cache.get_many(['a']), {'a': structure('a')})
+        del shared.data[structure_cache_key('a')]
+        self.assertEqual(cache.get_many(['a']), {'a': structure('a')})
+        self.assertEqual((cache.shared_hits, cache.hits), (1, 1))
+
+    def test_invalidate(self):
+        shared = DictCache()
+        cache = StructureCache(10000, shared)
+        cache.set(structure('a'))
+        cache.invalidate('a')
+        self.assertEqual(cache.get_many(['a']), {})
+        self.assertNotIn(structure_cache_key('a'), shared.data)
+        self.assertEqual(cache.size, 0)
+
+    def test_invalidate_in_other_process(self):
+        shared = DictCache()
+        cache = StructureCache(10000, shared, share_structures=False)
+        cache.set(structure('a'))
+        self.assertNotIn(structure_cache_key('a'), shared.data)
+        self.assertEqual(cache.get_many(['a']), {'a': structure('a')})
+
+        # another process updates it in place: the copy kept in memory here is stale
+        StructureCache(10000, shared, share_structures=False).invalidate('a')
+        self.assertEqual(cache.get_many(['a']), {})
+        self.assertEqual(cache.stats()['count'], 0)
+        self.assertEqual(cache.size, 0)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
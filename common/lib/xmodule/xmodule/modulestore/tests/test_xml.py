@@ -1,9 +1,11 @@
 import os.path
+import shutil
+import tempfile
 
 from nose.tools import assert_raises, assert_equals  # pylint: disable=E0611
 
 from xmodule.course_module import CourseDescriptor
-from xmodule.modulestore.xml import XMLModuleStore
+from xmodule.modulestore.xml import XMLModuleStore, course_content_hash
 from xmodule.modulestore import XML_MODULESTORE_TYPE
 
 from .test_modulestore import check_path_to_location
@@ -42,3 +44,39 @@ class TestXMLModuleStore(object):
         location = CourseDescriptor.id_to_location("edX/toy/2012_Fall")
         errors = modulestore.get_item_errors(location)
         assert errors == []
+
+    def test_snapshot(self):
+        """Courses are restored from their snapshots until their files change"""
+        snapshot_dir = tempfile.mkdtemp()
+        data_dir = tempfile.mkdtemp()
+        try:
+            for course_dir in ('toy', 'simple'):
+                shutil.copytree(os.path.join(DATA_DIR, course_dir), os.path.join(data_dir, course_dir))
+            parsed = XMLModuleStore(data_dir, course_dirs=['toy', 'simple'], snapshot_dir=snapshot_dir)
+            assert_equals(len(os.listdir(snapshot_dir)), 2)
+
+            restored = XMLModuleStore(data_dir, course_dirs=['toy', 'simple'], snapshot_dir=snapshot_dir)
+            course_id = 'edX/toy/2012_Fall'
+            assert_equals(sorted(restored.modules[course_id]), sorted(parsed.modules[course_id]))
+            for location, descriptor in parsed.modules[course_id].iteritems():
+                assert_equals(restored.modules[course_id][location].display_name, descriptor.display_name)
+                assert_equals(restored.get_parent_locations(location, course_id),
+                              parsed.get_parent_locations(location, course_id))
+            check_path_to_location(restored)
+
+            # changing a file of the course makes a new snapshot
+            content_hash = course_content_hash(os.path.join(data_dir, 'toy'))
+            with open(os.path.join(data_dir, 'toy', 'about', 'end_date.html'), 'a') as about:
+                about.write('more')
+            assert course_content_hash(os.path.join(data_dir, 'toy')) != content_hash
+            XMLModuleStore(data_dir, course_dirs=['toy'], snapshot_dir=snapshot_dir)
+            assert_equals(len(os.listdir(snapshot_dir)), 3)
+        finally:
+            shutil.rmtree(snapshot_dir)
+            shutil.rmtree(data_dir)
+
+    def test_load_processes(self):
+        """Courses loaded in subprocesses are the same as those loaded in process"""
+        store = XMLModuleStore(DATA_DIR, course_dirs=['toy', 'simple'], load_processes=2)
+        assert_equals(sorted(store.courses), ['simple', 'toy'])
+        check_path_to_location(store)
@@ -1,6 +1,8 @@
+import cPickle as pickle
 import hashlib
 import json
 import logging
+import multiprocessing
 import os
 import re
 import sys
@@ -23,11 +25,12 @@ from xmodule.html_module import HtmlDescriptor
 from xblock.core import XBlock
 from xblock.fields import ScopeIds
 from xblock.field_data import DictFieldData
+from xblock.runtime import DbModel
 
 from . import ModuleStoreBase, Location, XML_MODULESTORE_TYPE
 
 from .exceptions import ItemNotFoundError
-from .inheritance import compute_inherited_metadata
+from .inheritance import compute_inherited_metadata, InheritanceKeyValueStore
 
 edx_xml_parser = etree.XMLParser(dtd_validation=False, load_dtd=False,
                                  remove_comments=True, remove_blank_text=True)
@@ -36,6 +39,9 @@ etree.set_default_parser(edx_xml_parser)
 
 log = logging.getLogger(__name__)
 
+# Bump when the format of course snapshots changes
+SNAPSHOT_FORMAT = 1
+
 
 # VS[compat]
 # TODO (cpennington): Remove this once all fall 2012 courses have been imported
@@ -292,11 +298,66 @@ class ParentTracker(object):
         return list(self._parents[child])
 
 
+def course_content_hash(course_path):
+    """
+    Returns a hash of the files of the course directory course_path. The
+    contents of the files under static/ aren't read, only their names and
+    sizes: they are served as is, not parsed.
+    """
+    sha = hashlib.sha1()
+    for root, dirs, files in os.walk(course_path):
+        dirs[:] = sorted(d for d in dirs if d != '.git')
+        in_static = os.path.relpath(root, course_path).split(os.sep)[0] == 'static'
+        for name in sorted(files):
+            filepath = os.path.join(root, name)
+            sha.update(os.path.relpath(filepath, course_path))
+            if in_static:
+                sha.update(str(os.path.getsize(filepath)))
+            else:
+                with open(filepath, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1 << 16), ''):
+                        sha.update(chunk)
+    return sha.hexdigest()
+
+
+_CODE_VERSION = None
+
+
+def _code_version():
+    """
+    Returns a hash of the names, sizes and modification times of the xmodule
+    sources, so that snapshots are invalidated when the code parsing courses changes
+    """
+    global _CODE_VERSION  # pylint: disable=global-statement
+    if _CODE_VERSION is None:
+        sha = hashlib.sha1()
+        xmodule_dir = path(__file__).abspath().dirname().dirname()
+        for source in sorted(xmodule_dir.walkfiles('*.py')):
+            sha.update('{0} {1} {2}'.format(xmodule_dir.relpathto(source), source.size, source.mtime))
+        _CODE_VERSION = sha.hexdigest()
+    return _CODE_VERSION
+
+
+def _snapshot_course_in_subprocess(args):
+    """
+    Loads a course in a store of its own and returns its snapshot, or None.
+    Runs in the processes of a multiprocessing.Pool.
+    """
+    data_dir, course_dir, options = args
+    try:
+        store = XMLModuleStore(data_dir, course_dirs=[course_dir], **options)
+        return store.snapshot_course(course_dir)
+    except Exception:  # pylint: disable=broad-except
+        log.exception("Failed to load course %s in a subprocess", course_dir)
+        return None
+
+
 class XMLModuleStore(ModuleStoreBase):
     """
     An XML backed ModuleStore
     """
-    def __init__(self, data_dir, default_class=None, course_dirs=None, load_error_modules=True, **kwargs):
+    def __init__(self, data_dir, default_class=None, course_dirs=None, load_error_modules=True,
+                 load_processes=1, snapshot_dir=None, **kwargs):
         """
         Initialize an XMLModuleStore from data_dir
 
@@ -307,6 +368,12 @@ class XMLModuleStore(ModuleStoreBase):
 
         course_dirs: If specified, the list of course_dirs to load. Otherwise,
             load all course dirs
+
+        load_processes: the number of processes loading the courses in parallel
+
+        snapshot_dir: if set, the directory where the loaded courses are saved,
+            so that they are restored instead of parsed again until their files
+            (or the xmodule code) change
         """
         super(XMLModuleStore, self).__init__(**kwargs)
 
@@ -317,6 +384,7 @@ class XMLModuleStore(ModuleStoreBase):
 
         self.load_error_modules = load_error_modules
 
+        self.default_class_name = default_class
         if default_class is None:
             self.default_class = None
         else:
@@ -326,6 +394,8 @@ class XMLModuleStore(ModuleStoreBase):
 
         self.parent_trackers = defaultdict(ParentTracker)
 
+        self.snapshot_dir = path(snapshot_dir) if snapshot_dir else None
+
         # If we are specifically asked for missing courses, that should
         # be an error.  If we are asked for "all" courses, find the ones
         # that have a course.xml. We sort the dirs in alpha order so we always
@@ -334,8 +404,50 @@ class XMLModuleStore(ModuleStoreBase):
         if course_dirs is None:
             course_dirs = sorted([d for d in os.listdir(self.data_dir) if
                                   os.path.exists(self.data_dir / d / "course.xml")])
+        self.load_courses(course_dirs, load_processes)
+
+    def load_courses(self, course_dirs, load_processes=1):
+        """
+        Load the courses of course_dirs, in that order: restoring those that have a
+        snapshot, and parsing the others, in load_processes processes if more than 1.
+        """
+        snapshot_paths = {}
+        snapshots = {}
+        if self.snapshot_dir is not None:
+            for course_dir in course_dirs:
+                snapshot_paths[course_dir] = self._snapshot_path(course_dir)
+                snapshots[course_dir] = self._read_snapshot(snapshot_paths[course_dir])
+
+        to_parse = [course_dir for course_dir in course_dirs if snapshots.get(course_dir) is None]
+        if load_processes > 1 and len(to_parse) > 1:
+            options = {
+                'default_class': self.default_class_name,
+                'load_error_modules': self.load_error_modules,
+                'xblock_mixins': self.xblock_mixins,
+            }
+            pool = multiprocessing.Pool(min(load_processes, len(to_parse)))
+            try:
+                parsed = pool.map(
+                    _snapshot_course_in_subprocess,
+                    [(self.data_dir, course_dir, options) for course_dir in to_parse]
+                )
+            finally:
+                pool.close()
+                pool.join()
+            snapshots.update(zip(to_parse, parsed))
+
         for course_dir in course_dirs:
+            snapshot = snapshots.get(course_dir)
+            if snapshot is not None and self.restore_course(snapshot):
+                if course_dir in to_parse and course_dir in snapshot_paths:
+                    self._write_snapshot(snapshot_paths[course_dir], snapshot)
+                continue
+
             self.try_load_course(course_dir)
+            if course_dir in snapshot_paths:
+                snapshot = self.snapshot_course(course_dir)
+                if snapshot is not None:
+                    self._write_snapshot(snapshot_paths[course_dir], snapshot)
 
     def try_load_course(self, course_dir):
         '''
@@ -363,6 +475,162 @@ class XMLModuleStore(ModuleStoreBase):
             # Didn't load course.  Instead, save the errors elsewhere.
             self.errored_courses[course_dir] = errorlog
 
+    def _snapshot_path(self, course_dir):
+        """
+        The file of the snapshot of course_dir at the current content of its files
+        """
+        key = hashlib.sha1(repr((
+            SNAPSHOT_FORMAT,
+            _code_version(),
+            course_content_hash(self.data_dir / course_dir),
+            self.default_class_name,
+            self.load_error_modules,
+            [mixin.__module__ + '.' + mixin.__name__ for mixin in self.xblock_mixins],
+        ))).hexdigest()
+        return self.snapshot_dir / u'{0}-{1}.pickle'.format(course_dir, key)
+
+    def _read_snapshot(self, snapshot_path):
+        """
+        Returns the snapshot stored at snapshot_path, or None
+        """
+        if not snapshot_path.exists():
+            return None
+        try:
+            with open(snapshot_path, 'rb') as snapshot_file:
+                return pickle.load(snapshot_file)
+        except Exception:  # pylint: disable=broad-except
+            log.warning("Failed to read course snapshot %s", snapshot_path, exc_info=True)
+            return None
+
+    def _write_snapshot(self, snapshot_path, snapshot):
+        """
+        Store snapshot at snapshot_path, replacing any previous file atomically
+        """
+        try:
+            if not self.snapshot_dir.isdir():
+                self.snapshot_dir.makedirs_p()
+            temp_path = snapshot_path + '.{0}.tmp'.format(os.getpid())
+            with open(temp_path, 'wb') as snapshot_file:
+                pickle.dump(snapshot, snapshot_file, pickle.HIGHEST_PROTOCOL)
+            os.rename(temp_path, snapshot_path)
+        except Exception:  # pylint: disable=broad-except
+            log.warning("Failed to write course snapshot %s", snapshot_path, exc_info=True)
+
+    def snapshot_course(self, course_dir):
+        """
+        Returns a picklable snapshot of the loaded course of course_dir: the
+        classes and field data of its descriptors and its parent pointers.
+        Returns None if the course failed to load, or can't be snapshot.
+        """
+        course = self.courses.get(course_dir)
+        if course is None:
+            return None
+
+        descriptors = []
+        for location, descriptor in self.modules[course.id].iteritems():
+            field_data = descriptor._field_data  # pylint: disable=protected-access
+            if isinstance(field_data, DbModel) and isinstance(field_data._kvs, InheritanceKeyValueStore):  # pylint: disable=protected-access
+                kvs = field_data._kvs  # pylint: disable=protected-access
+                fields, inherited_settings = kvs._fields, kvs.inherited_settings  # pylint: disable=protected-access
+            elif isinstance(field_data, DictFieldData):
+                fields, inherited_settings = field_data._data, None  # pylint: disable=protected-access
+            else:
+                log.info("Not taking a snapshot of %s: %s has no snapshot of its field data", course_dir, location)
+                return None
+            descriptors.append({
+                'class': getattr(type(descriptor), 'unmixed_class', type(descriptor)),
+                'scope_ids': descriptor.scope_ids,
+                'fields': fields,
+                'inherited_settings': inherited_settings,
+                'data_dir': getattr(descriptor, 'data_dir', None),
+            })
+
+        snapshot = {
+            'course_dir': course_dir,
+            'course_id': course.id,
+            'course_location': course.location,
+            'policy': course.system.policy,
+            'descriptors': descriptors,
+            'parents': self.parent_trackers[course.id]._parents,  # pylint: disable=protected-access
+            'errors': self._location_errors[course.location].errors,
+        }
+        try:
+            # check it now, rather than fail to store it
+            pickle.dumps(snapshot, pickle.HIGHEST_PROTOCOL)
+        except Exception:  # pylint: disable=broad-except
+            log.info("Not taking a snapshot of %s: it can't be pickled", course_dir, exc_info=True)
+            return None
+        return snapshot
+
+    def restore_course(self, snapshot):
+        """
+        Load a course from a snapshot made by snapshot_course(). Returns False,
+        loading nothing, if the snapshot can't be restored.
+        """
+        course_dir = snapshot['course_dir']
+        course_id = snapshot['course_id']
+        errorlog = make_error_tracker()
+        errorlog.errors.extend(snapshot['errors'])
+        parent_tracker = ParentTracker()
+        parent_tracker._parents.update(snapshot['parents'])  # pylint: disable=protected-access
+        system = ImportSystem(
+            xmlstore=self,
+            course_id=course_id,
+            course_dir=course_dir,
+            error_tracker=errorlog.tracker,
+            parent_tracker=parent_tracker,
+            load_error_modules=self.load_error_modules,
+            policy=snapshot['policy'],
+            mixins=self.xblock_mixins,
+        )
+
+        # children first, as some descriptors look at their children when they are created
+        by_location = dict((entry['scope_ids'].usage_id, entry) for entry in snapshot['descriptors'])
+        ordered = []
+        visited = set()
+
+        def visit(location):
+            """Add the entry of location after those of its descendants"""
+            if location in visited or location not in by_location:
+                return
+            visited.add(location)
+            for child in by_location[location]['fields'].get('children', []):
+                visit(Location(child))
+            ordered.append(by_location[location])
+
+        visit(snapshot['course_location'])
+        for location in by_location:
+            visit(location)
+
+        modules = {}
+        previous_modules = self.modules.get(course_id)
+        self.modules[course_id] = modules
+        try:
+            for entry in ordered:
+                if entry['inherited_settings'] is None:
+                    field_data = DictFieldData(entry['fields'])
+                else:
+                    field_data = DbModel(InheritanceKeyValueStore(
+                        initial_values=entry['fields'], inherited_settings=entry['inherited_settings']
+                    ))
+                descriptor = system.construct_xblock_from_class(entry['class'], entry['scope_ids'], field_data)
+                if entry['data_dir'] is not None:
+                    descriptor.data_dir = entry['data_dir']
+                modules[descriptor.location] = descriptor
+            course_descriptor = modules[snapshot['course_location']]
+        except Exception:  # pylint: disable=broad-except
+            log.warning("Failed to restore the snapshot of %s", course_dir, exc_info=True)
+            if previous_modules is None:
+                del self.modules[course_id]
+            else:
+                self.modules[course_id] = previous_modules
+            return False
+
+        self.courses[course_dir] = course_descriptor
+        self._location_errors[course_descriptor.location] = errorlog
+        self.parent_trackers[course_id] = parent_tracker
+        return True
+
     def __unicode__(self):
         '''
         String representation - for debugging
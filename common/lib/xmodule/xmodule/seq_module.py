@@ -67,8 +67,55 @@ class SequenceModule(SequenceFields, XModule):
         if dispatch == 'goto_position':
             self.position = int(data['position'])
             return json.dumps({'success': True})
+        if dispatch == 'render_item':
+            # Go to position and return the content of the item there, which
+            # wasn't rendered with the page (see render_lazily)
+            child = self.get_item_at(data['position'])
+            self.position = int(data['position'])
+            progress = child.get_progress()
+            return json.dumps({
+                'success': True,
+                'content': self.runtime.render_child(child, None, 'student_view').content,
+                'progress_status': Progress.to_js_status_str(progress),
+                'progress_detail': Progress.to_js_detail_str(progress),
+            })
         raise NotFoundError('Unexpected dispatch type')
 
+    @property
+    def render_lazily(self):
+        """
+        If True, only the item at the current position is rendered with the
+        sequence; the others are fetched with the 'render_item' dispatch when
+        the student switches to them.
+        """
+        return bool(getattr(self.system, 'lazy_sequence_rendering', False))
+
+    def get_item_at(self, position):
+        """
+        Returns the display item at `position` (1-indexed, possibly as a
+        string). Raises NotFoundError if there is none.
+        """
+        try:
+            position = int(position)
+        except (TypeError, ValueError):
+            raise NotFoundError('Invalid position {0}'.format(position))
+        display_items = self.get_display_items()
+        if not 1 <= position <= len(display_items):
+            raise NotFoundError('Invalid position {0}'.format(position))
+        return display_items[position - 1]
+
+    def get_active_item(self):
+        """
+        Returns the display item at the current position (the first one if the
+        position is unset or out of range), or None if there are no items
+        """
+        display_items = self.get_display_items()
+        if not display_items:
+            return None
+        if self.position is not None and 1 <= self.position <= len(display_items):
+            return display_items[self.position - 1]
+        return display_items[0]
+
     def render(self):
         # If we're rendering this sequence, but no position is set yet,
         # default the position to the first element
@@ -77,9 +124,26 @@ class SequenceModule(SequenceFields, XModule):
 
         if self.rendered:
             return
+
+        if self.render_lazily and not 1 <= self.position <= len(self.get_display_items()):
+            # Out of range positions would leave nothing rendered
+            self.position = 1
+
+        stored_scores = {}
+        if self.render_lazily:
+            stored_scores = self._stored_scores([
+                child.descriptor
+                for position, child in enumerate(self.get_display_items(), start=1)
+                if position != self.position
+            ])
+
         ## Returns a set of all types of all sub-children
         contents = []
-        for child in self.get_display_items():
+        for position, child in enumerate(self.get_display_items(), start=1):
+            if self.render_lazily and position != self.position:
+                contents.append(self._lazy_child_info(child, stored_scores))
+                continue
+
             progress = child.get_progress()
             childinfo = {
                 'content': self.runtime.render_child(child, None, 'student_view').content,
@@ -107,6 +171,52 @@ class SequenceModule(SequenceFields, XModule):
         self.content = self.system.render_template('seq_module.html', params)
         self.rendered = True
 
+    def _stored_scores(self, descriptors):
+        """
+        Returns the stored scores of the scored descendants of `descriptors`,
+        from the runtime's get_stored_scores (see _lazy_child_info), or {} if
+        the runtime has none.
+        """
+        get_stored_scores = getattr(self.system, 'get_stored_scores', None)
+        if get_stored_scores is None:
+            return {}
+        can_load = getattr(self.system, 'can_load', None)
+        return get_stored_scores([
+            scored
+            for descriptor in descriptors
+            for scored in _scored_descendants(descriptor, can_load)
+        ])
+
+    def _lazy_child_info(self, child, stored_scores):
+        """
+        The tab information of an item that isn't rendered yet, computed from
+        descriptors so that none of the item's children are instantiated.
+
+        Its progress is computed from `stored_scores`, a dict of location url ->
+        (grade, max_grade) of the student's scored modules, as the modules
+        would compute it from the same grades.
+
+        As with child.get_children(), only the descendants the runtime's
+        can_load accepts count. Without can_load, the title is the child's own.
+        """
+        can_load = getattr(self.system, 'can_load', None)
+        title = None
+        if can_load is not None:
+            title = "\n".join(
+                grand_child.display_name
+                for grand_child in child.descriptor.get_children()
+                if grand_child.display_name is not None and can_load(grand_child)
+            )
+        progress = stored_progress(child.descriptor, stored_scores, can_load)
+        return {
+            'content': None,
+            'title': title or child.display_name_with_default,
+            'progress_status': Progress.to_js_status_str(progress),
+            'progress_detail': Progress.to_js_detail_str(progress),
+            'type': descriptor_icon_class(child.descriptor),
+            'id': child.id,
+        }
+
     def get_icon_class(self):
         child_classes = set(child.get_icon_class()
                             for child in self.get_children())
@@ -117,6 +227,64 @@ class SequenceModule(SequenceFields, XModule):
         return new_class
 
 
+def _scored_descendants(descriptor, can_load=None):
+    """
+    Yields `descriptor` and its descendants that have a score, leaving out the
+    children (and their descendants) `can_load` doesn't accept, if given
+    """
+    if descriptor.has_score:
+        yield descriptor
+    if descriptor.has_children:
+        for child in descriptor.get_children():
+            if can_load is not None and not can_load(child):
+                continue
+            for scored in _scored_descendants(child, can_load):
+                yield scored
+
+
+def stored_progress(descriptor, stored_scores, can_load=None):
+    """
+    Approximates the get_progress() of the module of `descriptor` without
+    instantiating any modules, given `stored_scores`, a dict of location url ->
+    (grade, max_grade): the progress of every scored descendant (that
+    `can_load` accepts, if given), re-weighted as problems do, added up.
+    Scored modules never graded count as 0 out of their static max score, if
+    they have one.
+    """
+    progress = None
+    for scored in _scored_descendants(descriptor, can_load):
+        grade, max_grade = stored_scores.get(scored.location.url(), (None, None))
+        total = max_grade if max_grade is not None else scored.static_max_score()
+        if not total > 0:
+            continue
+        score = grade or 0
+        weight = getattr(scored, 'weight', None)
+        if weight is not None:
+            score = score * weight / total
+            total = weight
+        try:
+            progress = Progress.add_counts(progress, Progress(score, total))
+        except (TypeError, ValueError):
+            log.exception("Got bad progress")
+    return progress
+
+
+def descriptor_icon_class(descriptor):
+    """
+    Approximates the get_icon_class() of the module of `descriptor` without
+    instantiating any modules: containers take the highest priority icon class
+    of their children.
+    """
+    if not descriptor.has_children:
+        return getattr(getattr(descriptor, 'module_class', None), 'icon_class', 'other')
+    child_classes = set(descriptor_icon_class(child) for child in descriptor.get_children())
+    new_class = 'other'
+    for c in class_priority:
+        if c in child_classes:
+            new_class = c
+    return new_class
+
+
 class SequenceDescriptor(SequenceFields, MakoModuleDescriptor, XmlDescriptor):
     mako_template = 'widgets/sequence-edit.html'
     module_class = SequenceModule
@@ -12,6 +12,7 @@ from mock import Mock, patch
 import unittest
 import random
 import json
+import textwrap
 
 import xmodule
 from capa.responsetypes import (StudentInputError, LoncapaProblemError,
@@ -1110,6 +1111,32 @@ class CapaModuleTest(unittest.TestCase):
         # Expect that the module has created a new dummy problem with the error
         self.assertNotEqual(original_problem, module.lcp)
 
+    def test_get_problem_html_script_error(self):
+        """
+        In production, a problem whose scripts fail is shown as reset,
+        with the student's answers, rather than failing the page.
+        """
+        xml = textwrap.dedent("""
+            <problem>
+                <script type="loncapa/python">
+                raise Exception("Bad script")
+                </script>
+                <stringresponse answer="1">
+                    <textline/>
+                </stringresponse>
+            </problem>
+        """)
+        module = CapaFactory.create(problem_state={'data': xml, 'student_answers': {'answer_id': 'my answer'}})
+        module.system.DEBUG = False
+
+        html = module.get_problem_html()
+
+        self.assertTrue(html is not None)
+        render_args, _ = module.system.render_template.call_args
+        context = render_args[1]
+        self.assertIn("The problem has been reset", context['problem']['html'])
+        self.assertIn("my answer", context['problem']['html'])
+
     def test_get_problem_html_error_w_debug(self):
         """
         Test the html response when an error occurs with DEBUG on
@@ -1257,6 +1284,25 @@ class CapaModuleTest(unittest.TestCase):
             mock_log.exception.assert_called_once_with('Got bad progress')
             mock_log.reset_mock()
 
+    def test_score_without_problem(self):
+        """
+        Check that the score is found from the stored state, without running the problem.
+        """
+        with patch('xmodule.capa_module.LoncapaProblem') as mock_problem:
+            module = CapaFactory.create()
+            del module.get_score
+            self.assertEqual(module.get_score(), {'score': 0, 'total': 1})
+
+            answer_key = CapaFactory.answer_key()
+            module.student_answers = {answer_key: '3.14'}
+            module.correct_map = {answer_key: {'correctness': 'correct', 'npoints': None}}
+            self.assertEqual(module.get_score(), {'score': 1, 'total': 1})
+            self.assertEqual(module.max_score(), 1)
+            self.assertFalse(mock_problem.called)
+
+        # the same score as the problem's
+        self.assertEqual(module.lcp.get_score(), {'score': 1, 'total': 1})
+
     @patch('xmodule.capa_module.Progress')
     def test_get_progress_calculate_progress_fraction(self, mock_progress):
         """
@@ -518,6 +518,14 @@ class XModuleDescriptor(XModuleMixin, HTMLSnippet, ResourceTemplates, XBlock):
         """
         return False
 
+    def static_max_score(self):
+        """
+        Returns the maximum score of the module for this descriptor, if it is
+        the same for every student and can be found without creating the
+        module. Returns None otherwise.
+        """
+        return None
+
     @classmethod
     def _translate(cls, key):
         'VS[compat]'
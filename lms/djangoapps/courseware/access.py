@@ -6,7 +6,10 @@ from datetime import datetime, timedelta
 from functools import partial
 
 from django.conf import settings
-from django.contrib.auth.models import Group
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, pre_delete
+from django.dispatch import receiver
 
 from xmodule.course_module import CourseDescriptor
 from xmodule.error_module import ErrorDescriptor
@@ -17,10 +20,17 @@ from student.models import CourseEnrollmentAllowed
 from external_auth.models import ExternalAuthMap
 from courseware.masquerade import is_masquerading_as_student
 from django.utils.timezone import UTC
+from request_cache.middleware import RequestCache
 from student.models import CourseEnrollment
 
 DEBUG_ACCESS = False
 
+# Key, in the request cache, of the dict of user id -> names of the user's groups
+GROUP_NAMES_REQUEST_CACHE_KEY = 'courseware.access.group_names'
+
+# How long group names are kept in the django cache, if MITX_FEATURES['CACHE_ACCESS_GROUP_NAMES'] is set
+GROUP_NAMES_CACHE_TIMEOUT = 60 * 60
+
 log = logging.getLogger(__name__)
 
 
@@ -91,6 +101,35 @@ def has_access(user, obj, action, course_context=None):
                     .format(type(obj)))
 
 
+def batch_has_access(user, objs, action, course_context=None):
+    """
+    Check whether a user has the access to do action on each of objs, e.g. all
+    the children of a module.
+
+    Takes the same arguments as has_access(), with an iterable of objects, and
+    returns a list of bools in the same order.  The user's groups are loaded
+    only once for the whole batch.
+    """
+    if user is not None and user.is_authenticated():
+        user_group_names(user)
+    return [has_access(user, obj, action, course_context) for obj in objs]
+
+
+def has_access_to_summary(user, summary, action, course_context=None):
+    """
+    Check whether a user has access to do action on the module described by
+    summary, without loading its descriptor.
+
+    summary: anything with the `location` (a Location), `start` and
+        `days_early_for_beta` of a descriptor that has no custom access policy
+        (e.g. a chapter or a sequential), such as the entries of a cached
+        table of contents.
+
+    Valid actions are those of descriptors ('load', 'staff').
+    """
+    return _has_access_descriptor(user, summary, action, course_context)
+
+
 def get_access_group_name(obj, action):
     '''
     Returns group name for user group which has "action" access to the given object.
@@ -493,6 +532,123 @@ def course_beta_test_group_name(location):
 course_beta_test_group_name.__test__ = False
 
 
+# (role, course_id, course) -> names of the groups giving role, see _candidate_group_names
+_candidate_group_names_cache = {}
+# Number of entries after which _candidate_group_names_cache is emptied
+CANDIDATE_GROUP_NAMES_CACHE_SIZE = 1000
+
+
+def _candidate_group_names(role, location, course_context=None):
+    """
+    Returns the names of all the groups that give `role` ('staff' or
+    'instructor') on the course of `location`: the course run group, the legacy
+    per-course group and the org-wide group.
+
+    These only depend on the course, so they are kept per process, for at most
+    CANDIDATE_GROUP_NAMES_CACHE_SIZE courses at a time.
+    """
+    if location.category == 'course':
+        course_id = location.course_id
+    else:
+        if course_context is None:
+            raise CourseContextRequired()
+        course_id = course_context
+
+    key = (role, course_id, location.course)
+    names = _candidate_group_names_cache.get(key)
+    if names is None:
+        names = group_names_for(role, location, course_id) + ['{0}_{1}'.format(role, course_id.split('/')[0])]
+        if len(_candidate_group_names_cache) >= CANDIDATE_GROUP_NAMES_CACHE_SIZE:
+            _candidate_group_names_cache.clear()
+        _candidate_group_names_cache[key] = names
+    return names
+
+
+def _group_names_cache_key(user_id):
+    """Django cache key of the group names of a user"""
+    return u'courseware.access.group_names.{0}'.format(user_id)
+
+
+def _request_group_names():
+    """
+    Returns the request-scoped dict of user id -> group names, or None outside
+    of requests: nothing would clear it between tasks or commands.
+    """
+    if RequestCache.get_current_request() is None:
+        return None
+    request_cache = RequestCache.get_request_cache()
+    if not hasattr(request_cache, 'data'):
+        # threads other than the one that imported the middleware start without it
+        request_cache.data = {}
+    return request_cache.data.setdefault(GROUP_NAMES_REQUEST_CACHE_KEY, {})
+
+
+def user_group_names(user):
+    """
+    Returns the frozenset of the names of the groups `user` belongs to.
+
+    The names are loaded at most once per request.  If
+    MITX_FEATURES['CACHE_ACCESS_GROUP_NAMES'] is set, they are also kept in the
+    django cache across requests (and outside of requests); either way they are
+    dropped whenever the user's groups change.
+    """
+    request_group_names = _request_group_names()
+    if request_group_names is not None:
+        names = request_group_names.get(user.id)
+        if names is not None:
+            return names
+
+    use_cache = settings.MITX_FEATURES.get('CACHE_ACCESS_GROUP_NAMES', False) and user.id is not None
+    if use_cache:
+        names = cache.get(_group_names_cache_key(user.id))
+    if names is None:
+        names = frozenset(g.name for g in user.groups.all())
+        if use_cache:
+            cache.set(_group_names_cache_key(user.id), names, GROUP_NAMES_CACHE_TIMEOUT)
+
+    if request_group_names is not None:
+        request_group_names[user.id] = names
+    return names
+
+
+def invalidate_group_names(user_ids):
+    """
+    Forget the cached group names of the users with ids in `user_ids`
+    """
+    request_group_names = _request_group_names()
+    if request_group_names is not None:
+        for user_id in user_ids:
+            request_group_names.pop(user_id, None)
+    cache.delete_many([_group_names_cache_key(user_id) for user_id in user_ids])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def _user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop the cached group names of users added to or removed from groups.
+
+    The change can come from either side of the relation: user.groups.add(group)
+    (instance is the user) or group.user_set.add(user) (instance is the group).
+    """
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        user_ids = [instance.pk]
+    elif action == 'pre_clear':
+        user_ids = list(instance.user_set.values_list('pk', flat=True))
+    else:
+        user_ids = list(pk_set)
+    invalidate_group_names(user_ids)
+
+
+@receiver(pre_delete, sender=Group)
+def _group_deleted(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drop the cached group names of the members of a deleted group.
+    """
+    invalidate_group_names(list(instance.user_set.values_list('pk', flat=True)))
+
+
 
 def _has_global_staff_access(user):
     if user.is_staff:
@@ -530,10 +686,8 @@ def _adjust_start_date_for_beta_testers(user, descriptor):
         # bail early if no beta testing is set up
         return descriptor.start
 
-    user_groups = [g.name for g in user.groups.all()]
-
     beta_group = course_beta_test_group_name(descriptor.location)
-    if beta_group in user_groups:
+    if beta_group in user_group_names(user):
         debug("Adjust start time: user in group %s", beta_group)
         delta = timedelta(descriptor.days_early_for_beta)
         effective = descriptor.start - delta
@@ -577,11 +731,10 @@ def _has_access_to_location(user, location, access_level, course_context):
         return True
 
     # If not global staff, is the user in the Auth group for this class?
-    user_groups = [g.name for g in user.groups.all()]
+    user_groups = user_group_names(user)
 
     if access_level == 'staff':
-        staff_groups = group_names_for_staff(location, course_context) + \
-                       [_course_org_staff_group_name(location, course_context)]
+        staff_groups = _candidate_group_names('staff', location, course_context)
         for staff_group in staff_groups:
             if staff_group in user_groups:
                 debug("Allow: user in group %s", staff_group)
@@ -589,8 +742,7 @@ def _has_access_to_location(user, location, access_level, course_context):
         debug("Deny: user not in groups %s", staff_groups)
 
     if access_level == 'instructor' or access_level == 'staff':  # instructors get staff privileges
-        instructor_groups = group_names_for_instructor(location, course_context) + \
-                            [_course_org_instructor_group_name(location, course_context)]
+        instructor_groups = _candidate_group_names('instructor', location, course_context)
         for instructor_group in instructor_groups:
             if instructor_group in user_groups:
                 debug("Allow: user in group %s", instructor_group)
@@ -0,0 +1,259 @@
+"""
+Grade every student in a course in one batch.
+
+grades.grade() is built for a single student: it creates a FieldDataCache for
+that student and instantiates an XModule for every scored module it can't
+score from StudentModule alone.  Grading a whole course that way costs a set
+of queries and a pile of XModules per student.
+
+iterate_grades_for() instead reads the course's grading skeleton (see
+courseware.grading_skeleton) once, reads the StudentModule rows for a chunk of
+students in a single ordered query, and scores problems straight from their
+stored grade/max_grade.  Descriptors and XModules are only loaded when a
+module genuinely needs it:
+
+  - sections containing modules that are always recalculated (e.g. foldit) or
+    whose children depend on the student (randomize, abtest) are graded by
+    grades.section_scores(), exactly as grades.grade() would;
+  - a problem without a static max score that no student has been graded on
+    yet is instantiated once to learn its max_score(), which is then reused
+    for every other student.
+"""
+# Compute grades using real division, with no integer truncation
+from __future__ import division
+
+from collections import defaultdict
+from itertools import islice
+import logging
+
+from django.conf import settings
+from django.db.models import Max
+
+from courseware import grades
+from courseware.grading_skeleton import grading_skeleton
+from courseware.model_data import FieldDataCache
+from courseware.models import StudentModule
+from courseware.module_render import get_module_for_descriptor
+from xmodule import graders
+from xmodule.graders import Score
+from xmodule.modulestore import Location
+from xmodule.modulestore.django import modulestore
+
+log = logging.getLogger(__name__)
+
+# Number of students whose StudentModule rows are read in one query
+STUDENT_CHUNK_SIZE = 500
+
+
+def iterate_grades_for(course, students, request, keep_raw_scores=False):
+    """
+    Yield (student, grade_summary) for every User in `students`, in order.
+
+    Each grade_summary has the same format as the return value of
+    grades.grade(student, request, course, keep_raw_scores=keep_raw_scores).
+
+    `request` is only used when an XModule has to be instantiated.
+    """
+    if settings.GENERATE_PROFILE_SCORES:
+        # Random debugging scores can only come from the per-student path
+        for student in students:
+            yield student, grades.grade(student, request, course, keep_raw_scores=keep_raw_scores)
+        return
+
+    grader = _CourseGrader(course, request, keep_raw_scores)
+    students = iter(students)
+    while True:
+        chunk = list(islice(students, STUDENT_CHUNK_SIZE))
+        if not chunk:
+            break
+        for student, grade_summary in grader.grade_students(chunk):
+            yield student, grade_summary
+
+
+def grade_student(student, course, request, keep_raw_scores=False):
+    """
+    Return the grade summary of `student`, in the format of grades.grade(),
+    computed from the course's grading skeleton.
+    """
+    grader = _CourseGrader(course, request, keep_raw_scores, read_stored_max_scores=False)
+    for _, grade_summary in grader.grade_students([student]):
+        return grade_summary
+
+
+class _CourseGrader(object):
+    """
+    The grading skeleton of one course, plus what is known about its problems'
+    max scores, shared by all of the students being graded.
+    """
+
+    def __init__(self, course, request, keep_raw_scores, read_stored_max_scores=True):
+        """
+        If `read_stored_max_scores`, the highest max_grade stored for each
+        problem of the course is read up front. That saves instantiating
+        problems when grading many students, but isn't worth a query over the
+        whole course for a single one.
+        """
+        self.course = course
+        self.request = request
+        self.keep_raw_scores = keep_raw_scores
+
+        skeleton = grading_skeleton(course)
+        self.sections_by_format = skeleton['sections'].items()
+
+        # section location -> set of location urls whose state marks the section as seen
+        self.state_keys = {}
+        self.scored_locations = set()
+        # Problems' max_score is the same for every student, so either a static
+        # max score or any stored max_grade will do.
+        self.max_scores = {}
+        for _, sections in self.sections_by_format:
+            for section in sections:
+                self.state_keys[section['location']] = frozenset(section['state_keys'])
+                self.scored_locations.update(section['state_keys'])
+                for problem in section['problems']:
+                    if problem['max_score'] is not None:
+                        self.max_scores[problem['location']] = problem['max_score']
+
+        if read_stored_max_scores:
+            stored_max_scores = StudentModule.objects.filter(
+                course_id=course.id,
+                max_grade__isnull=False,
+            ).values_list('module_state_key').annotate(Max('max_grade'))
+            for location, max_grade in stored_max_scores:
+                self.max_scores.setdefault(location, max_grade)
+
+        # location url -> descriptor, for the few that have to be loaded
+        self.descriptors = {}
+
+    def get_descriptor(self, location, depth=0):
+        """
+        Load (once) the descriptor at `location`
+        """
+        if location not in self.descriptors:
+            self.descriptors[location] = modulestore().get_instance(self.course.id, Location(location), depth=depth)
+        return self.descriptors[location]
+
+    def grade_students(self, students):
+        """
+        Yield (student, grade_summary) for each of `students`, reading all of
+        their StudentModule rows with a single query.
+        """
+        rows_by_student = defaultdict(dict)
+        student_modules = StudentModule.objects.filter(
+            course_id=self.course.id,
+            student__in=[student.id for student in students],
+        ).order_by('student').values_list('student_id', 'module_state_key', 'grade', 'max_grade')
+
+        for student_id, module_state_key, grade, max_grade in student_modules.iterator():
+            if module_state_key in self.scored_locations:
+                rows_by_student[student_id][module_state_key] = (grade, max_grade)
+
+        for student in students:
+            yield student, self.grade_student(student, rows_by_student.get(student.id, {}))
+
+    def grade_student(self, student, rows):
+        """
+        Compute the grade summary of `student`, given `rows`, a dict of
+        location url -> (grade, max_grade) from their StudentModules.
+        """
+        totaled_scores = {}
+        raw_scores = []
+        for section_format, sections in self.sections_by_format:
+            format_scores = []
+            for section in sections:
+                section_name = section['display_name']
+
+                # If we haven't seen a single problem in the section, we don't have to grade it at all! We can assume 0%
+                if section['always_recalculate'] or not self.state_keys[section['location']].isdisjoint(rows):
+                    if section['needs_modules']:
+                        section_descriptor = self.get_descriptor(section['location'], depth=None)
+                        field_data_cache = FieldDataCache(
+                            list(grades.yield_descriptor_descendents(section_descriptor)), self.course.id, student
+                        )
+                        scores = grades.section_scores(
+                            student, self.request, self.course, section_descriptor, field_data_cache
+                        )
+                    else:
+                        scores = self.section_scores(student, section, rows)
+
+                    _, graded_total = graders.aggregate_scores(scores, section_name)
+                    if self.keep_raw_scores:
+                        raw_scores += scores
+                else:
+                    graded_total = Score(0.0, 1.0, True, section_name)
+
+                if graded_total.possible > 0:
+                    format_scores.append(graded_total)
+                else:
+                    log.error("Unable to grade a section with a total possible score of zero. %s",
+                              section['location'])
+
+            totaled_scores[section_format] = format_scores
+
+        return grades.summarize_grades(self.course, totaled_scores, raw_scores if self.keep_raw_scores else None)
+
+    def section_scores(self, student, section, rows):
+        """
+        Score every problem of a static section from the student's stored grades.
+        """
+        scores = []
+        for problem in section['problems']:
+            (correct, total) = self.get_score(student, problem, rows)
+            if correct is None and total is None:
+                continue
+
+            graded = problem['graded']
+            if not total > 0:
+                #We simply cannot grade a problem that is 12/0, because we might need it as a percentage
+                graded = False
+
+            scores.append(Score(correct, total, graded, problem['display_name']))
+        return scores
+
+    def get_score(self, student, problem, rows):
+        """
+        Return (correct, total) for `problem` (from the grading skeleton), as
+        grades.get_score() would.
+        """
+        location = problem['location']
+        grade, max_grade = rows.get(location, (None, None))
+
+        if max_grade is not None:
+            correct = grade if grade is not None else 0
+            total = max_grade
+        else:
+            total = self.max_score(student, location)
+            if total is None:
+                return (None, None)
+            correct = 0.0
+
+        # Now we re-weight the problem, if specified
+        weight = problem['weight']
+        if weight is not None:
+            if total == 0:
+                log.error("Cannot reweight a problem with zero total points. Problem: %s", location)
+                return (correct, total)
+            correct = correct * weight / total
+            total = weight
+
+        return (correct, total)
+
+    def max_score(self, student, location):
+        """
+        Return the max score of the problem at `location`, instantiating it
+        for `student` the first time no max score is known.
+        """
+        if location not in self.max_scores:
+            descriptor = self.get_descriptor(location)
+            field_data_cache = FieldDataCache([descriptor], self.course.id, student)
+            problem = get_module_for_descriptor(student, self.request, descriptor, field_data_cache, self.course.id)
+            if problem is None:
+                return None
+
+            # Problem may be an error module (if something in the problem builder failed)
+            # In which case total might be None
+            total = problem.max_score()
+            if total is None:
+                return None
+            self.max_scores[location] = total
+        return self.max_scores[location]
@@ -15,7 +15,7 @@ from xmodule.contentstore.content import StaticContent
 from xmodule.modulestore.exceptions import ItemNotFoundError, InvalidLocationError
 from courseware.model_data import FieldDataCache
 from static_replace import replace_static_urls
-from courseware.access import has_access
+from courseware.access import has_access, batch_has_access
 import branding
 
 log = logging.getLogger(__name__)
@@ -277,7 +277,7 @@ def get_courses(user, domain=None):
     Returns a list of courses available, sorted by course.number
     '''
     courses = branding.get_visible_courses(domain)
-    courses = [c for c in courses if has_access(user, c, 'see_exists')]
+    courses = [c for c, can_see in zip(courses, batch_has_access(user, courses, 'see_exists')) if can_see]
 
     courses = sorted(courses, key=lambda course: course.number)
 
@@ -0,0 +1,209 @@
+"""
+Persistent, versioned cache of the per-section totals computed by
+courseware.grades.grade().
+
+Each graded section a student has worked on gets a StudentSectionGrade row
+holding the weighted (earned, possible) total for that section.  Rows are
+stamped with a digest of the section's graded structure, so edits to the
+course (new problems, changed weights, regraded sections) make stale rows
+invisible without having to find and delete them.
+
+Rows are invalidated one section at a time: when module_render's publish()
+records a new grade for a problem (or a StudentModule is deleted), only the
+row for the section containing that problem is dropped.  The mapping from
+problem to section is kept in the django cache; if it is not available, all
+of the student's rows for the course are dropped instead.
+
+A total is computed from the StudentModules read before grading, so a grade
+published meanwhile would be overwritten by a stale total written after its
+invalidation.  Rows therefore also hold a digest of the stored scores they
+were computed from, which is checked against the database once written.
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from courseware.models import StudentModule, StudentSectionGrade
+
+log = logging.getLogger(__name__)
+
+# How long the problem -> section mapping of a course is kept in the django cache
+SECTION_MAP_TIMEOUT = 60 * 60 * 24
+
+
+def grade_cache_enabled():
+    """
+    Returns True if grades.grade() should read and write cached section totals.
+    """
+    if settings.GENERATE_PROFILE_SCORES:
+        # Random scores must never be persisted
+        return False
+    return settings.MITX_FEATURES.get('ENABLE_PERSISTENT_GRADE_CACHE', False)
+
+
+def section_version(section):
+    """
+    Return a digest of everything about a graded section (as found in
+    `course.grading_context['graded_sections']`) that its cached total
+    depends on: the scored descendants, their weights, whether they are graded,
+    their max scores and their content.
+    """
+    digest = hashlib.sha1(section['section_descriptor'].location.url())
+    for descriptor in section['xmoduledescriptors']:
+        digest.update(u'|{0}:{1}:{2}:{3}'.format(
+            descriptor.location.url(),
+            getattr(descriptor, 'weight', None),
+            descriptor.graded,
+            descriptor.static_max_score(),
+        ).encode('utf-8'))
+        data = getattr(descriptor, 'data', None)
+        if isinstance(data, basestring):
+            # e.g. a problem gaining a response changes its max score
+            digest.update(hashlib.sha1(data.encode('utf-8')).digest())
+    return digest.hexdigest()
+
+
+def state_version(rows):
+    """
+    Return a digest of a student's stored scores in a section, given `rows`,
+    (module_state_key, grade, max_grade) tuples of their StudentModules.
+
+    Ungraded StudentModules score like missing ones, so are left out.
+    """
+    scores = sorted(
+        (module_state_key, grade, max_grade)
+        for module_state_key, grade, max_grade in rows
+        if grade is not None or max_grade is not None
+    )
+    return hashlib.sha1(repr(scores)).hexdigest()
+
+
+def stored_state_version(student, course_id, section):
+    """
+    Return the state_version() of the StudentModules of `student` in `section`,
+    as now stored in the database.
+
+    This is a locking read: inside a transaction (e.g. TransactionMiddleware's)
+    it sees the last committed rows rather than the transaction's snapshot, and
+    a concurrent publish() waits for the transaction to end before updating them.
+    """
+    rows = StudentModule.objects.select_for_update().filter(
+        student=student,
+        course_id=course_id,
+        module_state_key__in=[descriptor.location.url() for descriptor in section['xmoduledescriptors']],
+    ).values_list('module_state_key', 'grade', 'max_grade')
+    return state_version(rows)
+
+
+def section_is_cacheable(section):
+    """
+    Sections containing modules whose score changes independently of
+    interaction with the LMS (e.g. foldit) must always be recomputed.
+    """
+    return not any(descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors'])
+
+
+def _section_map_key(course_id):
+    """Django cache key of the problem -> section mapping for `course_id`"""
+    return u'courseware.grade_cache.section_map.{0}'.format(course_id)
+
+
+def remember_section_map(course, section_versions):
+    """
+    Store the mapping from scored module location to graded section location
+    for `course`, so that invalidate_module() can find the one section to drop.
+
+    `section_versions` maps each graded section's location url to its
+    section_version(); the stored mapping is only rebuilt when these change.
+    """
+    key = _section_map_key(course.id)
+    course_version = hashlib.sha1(repr(sorted(section_versions.items()))).hexdigest()
+    cached = cache.get(key)
+    if cached is not None and cached['version'] == course_version:
+        return
+
+    section_map = {}
+    for sections in course.grading_context['graded_sections'].itervalues():
+        for section in sections:
+            section_key = section['section_descriptor'].location.url()
+            for descriptor in section['xmoduledescriptors']:
+                section_map[descriptor.location.url()] = section_key
+    cache.set(key, {'version': course_version, 'sections': section_map}, SECTION_MAP_TIMEOUT)
+
+
+def get_section_grades(student, course_id):
+    """
+    Return a dict of section location url -> StudentSectionGrade for all
+    cached section totals of `student` in `course_id`.
+    """
+    return dict(
+        (row.section_key, row)
+        for row in StudentSectionGrade.objects.filter(student=student, course_id=course_id)
+    )
+
+
+def set_section_grade(student, course_id, section, version, read_state_version, earned, possible):
+    """
+    Create or update the cached total of one section, computed from the
+    StudentModules whose state_version() is `read_state_version`.
+
+    The row is dropped again if these StudentModules have changed since: their
+    new grade may have been published, and the row invalidated, before it was
+    written.
+    """
+    section_key = section['section_descriptor'].location.url()
+    rows = StudentSectionGrade.objects.filter(
+        student=student,
+        course_id=course_id,
+        section_key=section_key,
+    )
+    updated = rows.update(version=version, state_version=read_state_version, earned=earned, possible=possible)
+    if not updated:
+        try:
+            StudentSectionGrade.objects.create(
+                student=student,
+                course_id=course_id,
+                section_key=section_key,
+                version=version,
+                state_version=read_state_version,
+                earned=earned,
+                possible=possible,
+            )
+        except IntegrityError:
+            # A concurrent request stored this section first; its value is as good as ours.
+            log.debug("Section grade for %s in %s already cached", section_key, course_id)
+            return
+
+    if stored_state_version(student, course_id, section) != read_state_version:
+        log.debug("Scores in section %s of %s changed while grading", section_key, course_id)
+        rows.filter(state_version=read_state_version).delete()
+
+
+def invalidate_module(user_id, course_id, module_state_key):
+    """
+    Drop the cached total of the section containing `module_state_key`
+    (a location url) for the given user.
+    """
+    cached = cache.get(_section_map_key(course_id))
+    rows = StudentSectionGrade.objects.filter(student_id=user_id, course_id=course_id)
+    if cached is not None:
+        section_key = cached['sections'].get(module_state_key)
+        if section_key is None:
+            # Not part of any graded section, so can't affect a cached total
+            return
+        rows = rows.filter(section_key=section_key)
+    rows.delete()
+
+
+@receiver(post_delete, sender=StudentModule)
+def invalidate_deleted_module(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Resetting a student's attempts deletes their StudentModule, which changes
+    the score of the containing section.
+    """
+    invalidate_module(instance.student_id, instance.course_id, instance.module_state_key)
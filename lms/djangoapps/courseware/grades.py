@@ -1,13 +1,16 @@
 # Compute grades using real division, with no integer truncation
 from __future__ import division
 
+import json
 import random
+import re
 import logging
 
 from collections import defaultdict
 from django.conf import settings
 from django.contrib.auth.models import User
 
+from courseware import grade_cache
 from courseware.model_data import FieldDataCache, DjangoKeyValueStore
 from xblock.fields import Scope
 from .module_render import get_module, get_module_for_descriptor
@@ -18,6 +21,14 @@ from .models import StudentModule
 
 log = logging.getLogger("mitx.courseware")
 
+# Number of StudentModule rows read per query by answer_distributions()
+ANSWER_DISTRIBUTION_CHUNK_SIZE = 5000
+
+# Where the answers start in the json state of a capa problem. A key inside a json
+# string value would have escaped quotes, so it can't match.
+STUDENT_ANSWERS_RE = re.compile(r'"student_answers"\s*:\s*')
+STATE_DECODER = json.JSONDecoder()
+
 
 def yield_module_descendents(module):
     stack = module.get_display_items()
@@ -29,6 +40,18 @@ def yield_module_descendents(module):
         yield next_module
 
 
+def yield_descriptor_descendents(descriptor):
+    """
+    Yield `descriptor` and all of its static descendants, depth first.
+    """
+    stack = [descriptor]
+
+    while len(stack) > 0:
+        next_descriptor = stack.pop()
+        stack.extend(next_descriptor.get_children())
+        yield next_descriptor
+
+
 def yield_dynamic_descriptor_descendents(descriptor, module_creator):
     """
     This returns all of the descendants of a descriptor. If the descriptor
@@ -94,7 +117,63 @@ def yield_problems(request, course, student):
                 yield problem
 
 
-def answer_distributions(request, course):
+def _capa_descriptors(course):
+    """
+    Return a dict of location url -> descriptor for every capa problem in the
+    graded sections of `course`.
+    """
+    problems = {}
+    for sections in course.grading_context['graded_sections'].itervalues():
+        for section in sections:
+            for descriptor in yield_descriptor_descendents(section['section_descriptor']):
+                if issubclass(descriptor.module_class, CapaModule):
+                    problems[descriptor.location.url()] = descriptor
+    return problems
+
+
+def iter_student_module_states(course_id, module_state_keys, chunk_size=ANSWER_DISTRIBUTION_CHUNK_SIZE):
+    """
+    Yield (module_state_key, state) for the StudentModules of students enrolled
+    in `course_id` at any of `module_state_keys`.
+
+    Rows are read in primary key order, `chunk_size` at a time, so that memory
+    use doesn't depend on the number of rows (database drivers typically buffer
+    the whole result of a query on the client).
+    """
+    last_id = 0
+    while True:
+        rows = list(StudentModule.objects.filter(
+            id__gt=last_id,
+            course_id=course_id,
+            module_state_key__in=module_state_keys,
+            student__courseenrollment__course_id=course_id,
+        ).order_by('id').values_list('id', 'module_state_key', 'state')[:chunk_size])
+        if not rows:
+            return
+        for _, module_state_key, state in rows:
+            yield module_state_key, state
+        last_id = rows[-1][0]
+
+
+def decode_student_answers(state):
+    """
+    Return the 'student_answers' dict stored in the json `state` of a capa
+    StudentModule, without decoding the rest of the state.
+    """
+    if not state:
+        return {}
+    match = STUDENT_ANSWERS_RE.search(state)
+    if match is None:
+        return {}
+    try:
+        answers, _ = STATE_DECODER.raw_decode(state, match.end())
+    except ValueError:
+        log.warning("Unable to decode student_answers from state: %r", state[:100])
+        return {}
+    return answers if isinstance(answers, dict) else {}
+
+
+def answer_distributions(request, course):  # pylint: disable=unused-argument
     """
     Given a course_descriptor, compute frequencies of answers for each problem:
 
@@ -102,21 +181,20 @@ def answer_distributions(request, course):
 
     dict: (problem url_name, problem display_name, problem_id) -> (dict : answer ->  count)
 
-    TODO (vshnayder): this is currently doing a full linear pass through all
-    students and all problems.  This will be just a little slow.
+    Answers are read straight from the stored state of enrolled students'
+    problems; no problem is ever instantiated.
     """
-
+    problems = _capa_descriptors(course)
     counts = defaultdict(lambda: defaultdict(int))
 
-    enrolled_students = User.objects.filter(courseenrollment__course_id=course.id)
-
-    for student in enrolled_students:
-        for capa_module in yield_problems(request, course, student):
-            for problem_id in capa_module.lcp.student_answers:
-                # Answer can be a list or some other unhashable element.  Convert to string.
-                answer = str(capa_module.lcp.student_answers[problem_id])
-                key = (capa_module.url_name, capa_module.display_name_with_default, problem_id)
-                counts[key][answer] += 1
+    for module_state_key, state in iter_student_module_states(course.id, problems.keys()):
+        descriptor = problems[module_state_key]
+        for problem_id, answer in decode_student_answers(state).iteritems():
+            # Answer can be a list or some other unhashable element.  Convert to string.
+            if not isinstance(answer, unicode):
+                answer = str(answer)
+            key = (descriptor.location.name, descriptor.display_name_with_default, problem_id)
+            counts[key][answer] += 1
 
     return counts
 
@@ -137,14 +215,59 @@ def grade(student, request, course, field_data_cache=None, keep_raw_scores=False
         make up the final grade. (For display)
     - keep_raw_scores : if True, then value for key 'raw_scores' contains scores for every graded module
 
+    If MITX_FEATURES['ENABLE_PERSISTENT_GRADE_CACHE'] is set, section totals are
+    read from (and written to) courseware.grade_cache, and only sections without
+    an up-to-date cached total are graded from the module tree.
+
+    Unless `field_data_cache` already holds the student's state, or the grade
+    cache is in use, the student is graded from the course's grading skeleton
+    (see courseware.bulk_grades), without loading every descriptor of the course.
+
     More information on the format is in the docstring for CourseGrader.
     """
+    # Per-student raw scores can't be recovered from cached section totals
+    use_grade_cache = grade_cache.grade_cache_enabled() and not keep_raw_scores and student.is_authenticated()
+    if field_data_cache is None and not use_grade_cache and not settings.GENERATE_PROFILE_SCORES:
+        # bulk_grades builds on this module
+        from courseware.bulk_grades import grade_student
+        return grade_student(student, course, request, keep_raw_scores)
 
     grading_context = course.grading_context
     raw_scores = []
 
+    section_versions = {}
+    cached_sections = {}
+    if use_grade_cache:
+        for sections in grading_context['graded_sections'].itervalues():
+            for section in sections:
+                section_key = section['section_descriptor'].location.url()
+                section_versions[section_key] = grade_cache.section_version(section)
+        grade_cache.remember_section_map(course, section_versions)
+        cached_sections = grade_cache.get_section_grades(student, course.id)
+
+    def cached_total(section):
+        """
+        Returns the cached Score for `section`, or None if it has to be recomputed.
+        """
+        section_key = section['section_descriptor'].location.url()
+        cached = cached_sections.get(section_key)
+        if cached is None or cached.version != section_versions[section_key]:
+            return None
+        if not grade_cache.section_is_cacheable(section):
+            return None
+        return Score(cached.earned, cached.possible, True, section['section_descriptor'].display_name_with_default)
+
     if field_data_cache is None:
-        field_data_cache = FieldDataCache(grading_context['all_descriptors'], course.id, student)
+        if use_grade_cache:
+            # Only fetch student state for the sections we actually have to grade
+            descriptors = []
+            for sections in grading_context['graded_sections'].itervalues():
+                for section in sections:
+                    if cached_total(section) is None:
+                        descriptors.extend(yield_descriptor_descendents(section['section_descriptor']))
+        else:
+            descriptors = grading_context['all_descriptors']
+        field_data_cache = FieldDataCache(descriptors, course.id, student)
 
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
@@ -155,6 +278,11 @@ def grade(student, request, course, field_data_cache=None, keep_raw_scores=False
             section_descriptor = section['section_descriptor']
             section_name = section_descriptor.display_name_with_default
 
+            graded_total = cached_total(section) if use_grade_cache else None
+            if graded_total is not None:
+                format_scores.append(graded_total)
+                continue
+
             should_grade_section = False
             # If we haven't seen a single problem in the section, we don't have to grade it at all! We can assume 0%
             for moduledescriptor in section['xmoduledescriptors']:
@@ -177,36 +305,17 @@ def grade(student, request, course, field_data_cache=None, keep_raw_scores=False
                     break
 
             if should_grade_section:
-                scores = []
-
-                def create_module(descriptor):
-                    '''creates an XModule instance given a descriptor'''
-                    # TODO: We need the request to pass into here. If we could forego that, our arguments
-                    # would be simpler
-                    return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
-
-                for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
-
-                    (correct, total) = get_score(course.id, student, module_descriptor, create_module, field_data_cache)
-                    if correct is None and total is None:
-                        continue
-
-                    if settings.GENERATE_PROFILE_SCORES:  	# for debugging!
-                        if total > 1:
-                            correct = random.randrange(max(total - 2, 1), total + 1)
-                        else:
-                            correct = total
-
-                    graded = module_descriptor.graded
-                    if not total > 0:
-                        #We simply cannot grade a problem that is 12/0, because we might need it as a percentage
-                        graded = False
-
-                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
-
+                if use_grade_cache:
+                    read_state_version = section_state_version(student, section, field_data_cache)
+                scores = section_scores(student, request, course, section_descriptor, field_data_cache)
                 _, graded_total = graders.aggregate_scores(scores, section_name)
                 if keep_raw_scores:
                     raw_scores += scores
+                if use_grade_cache and graded_total.possible > 0 and grade_cache.section_is_cacheable(section):
+                    grade_cache.set_section_grade(
+                        student, course.id, section, section_versions[section_descriptor.location.url()],
+                        read_state_version, graded_total.earned, graded_total.possible
+                    )
             else:
                 graded_total = Score(0.0, 1.0, True, section_name)
 
@@ -219,6 +328,78 @@ def grade(student, request, course, field_data_cache=None, keep_raw_scores=False
 
         totaled_scores[section_format] = format_scores
 
+    return summarize_grades(course, totaled_scores, raw_scores if keep_raw_scores else None)
+
+
+def section_state_version(student, section, field_data_cache):
+    """
+    Return the grade_cache.state_version() of the StudentModules of `student`
+    in `section` (from `course.grading_context`) held by `field_data_cache`.
+    """
+    rows = []
+    for descriptor in section['xmoduledescriptors']:
+        key = DjangoKeyValueStore.Key(Scope.user_state, student.id, descriptor.location, None)
+        student_module = field_data_cache.find(key)
+        if student_module is not None:
+            rows.append((descriptor.location.url(), student_module.grade, student_module.max_grade))
+    return grade_cache.state_version(rows)
+
+
+def section_is_seen(student, section, field_data_cache):
+    """
+    Return whether `student` has a StudentModule in `section` (from
+    `course.grading_context`), that is whether grade() grades it rather than
+    assume 0%.
+    """
+    return any(
+        field_data_cache.find(DjangoKeyValueStore.Key(Scope.user_state, student.id, descriptor.location, None))
+        for descriptor in section['xmoduledescriptors']
+    )
+
+
+def section_scores(student, request, course, section_descriptor, field_data_cache):
+    """
+    Return the list of Scores for every scored module in the section described
+    by `section_descriptor`, creating XModules where the score can't be read
+    from `field_data_cache`.
+    """
+    scores = []
+
+    def create_module(descriptor):
+        '''creates an XModule instance given a descriptor'''
+        # TODO: We need the request to pass into here. If we could forego that, our arguments
+        # would be simpler
+        return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
+
+    for module_descriptor in yield_dynamic_descriptor_descendents(section_descriptor, create_module):
+
+        (correct, total) = get_score(course.id, student, module_descriptor, create_module, field_data_cache)
+        if correct is None and total is None:
+            continue
+
+        if settings.GENERATE_PROFILE_SCORES:  	# for debugging!
+            if total > 1:
+                correct = random.randrange(max(total - 2, 1), total + 1)
+            else:
+                correct = total
+
+        graded = module_descriptor.graded
+        if not total > 0:
+            #We simply cannot grade a problem that is 12/0, because we might need it as a percentage
+            graded = False
+
+        scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+
+    return scores
+
+
+def summarize_grades(course, totaled_scores, raw_scores=None):
+    """
+    Run the course grader over `totaled_scores` (a dict of section format ->
+    list of section total Scores) and return the grade summary described in grade().
+
+    If `raw_scores` is not None, it is included in the summary under 'raw_scores'.
+    """
     grade_summary = course.grader.grade(totaled_scores, generate_random_scores=settings.GENERATE_PROFILE_SCORES)
 
     # We round the grade here, to make sure that the grade is an whole percentage and
@@ -228,7 +409,7 @@ def grade(student, request, course, field_data_cache=None, keep_raw_scores=False
     letter_grade = grade_for_percentage(course.grade_cutoffs, grade_summary['percent'])
     grade_summary['grade'] = letter_grade
     grade_summary['totaled_scores'] = totaled_scores  	# make this available, eg for instructor download & debugging
-    if keep_raw_scores:
+    if raw_scores is not None:
         grade_summary['raw_scores'] = raw_scores        # way to get all RAW scores out to instructor
                                                         # so grader can be double-checked
     return grade_summary
@@ -279,6 +460,8 @@ def progress_summary(student, request, course, field_data_cache):
     If the student does not have access to load the course module, this function
     will return None.
 
+    If MITX_FEATURES['ENABLE_PERSISTENT_GRADE_CACHE'] is set, the totals of the
+    graded sections found here are written to courseware.grade_cache, for grade().
     """
 
     # TODO: We need the request to pass into here. If we could forego that, our arguments
@@ -288,6 +471,18 @@ def progress_summary(student, request, course, field_data_cache):
         # This student must not have access to the course.
         return None
 
+    use_grade_cache = grade_cache.grade_cache_enabled() and student.is_authenticated()
+    if use_grade_cache:
+        graded_sections = {}
+        section_versions = {}
+        for sections in course.grading_context['graded_sections'].itervalues():
+            for section in sections:
+                section_key = section['section_descriptor'].location.url()
+                graded_sections[section_key] = section
+                section_versions[section_key] = grade_cache.section_version(section)
+        grade_cache.remember_section_map(course, section_versions)
+        cached_sections = grade_cache.get_section_grades(student, course.id)
+
     chapters = []
     # Don't include chapters that aren't displayable (e.g. due to error)
     for chapter_module in course_module.get_display_items():
@@ -305,6 +500,17 @@ def progress_summary(student, request, course, field_data_cache):
             graded = section_module.graded
             scores = []
 
+            section_key = section_module.location.url()
+            graded_section = graded_sections.get(section_key) if use_grade_cache else None
+            if graded_section is not None:
+                cached = cached_sections.get(section_key)
+                if cached is not None and cached.version == section_versions[section_key]:
+                    graded_section = None
+                else:
+                    read_state_version = section_state_version(student, graded_section, field_data_cache)
+            # The scores as grade() counts them
+            graded_scores = []
+
             module_creator = section_module.system.get_module
 
             for module_descriptor in yield_dynamic_descriptor_descendents(section_module.descriptor, module_creator):
@@ -315,6 +521,17 @@ def progress_summary(student, request, course, field_data_cache):
                     continue
 
                 scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                graded_scores.append(Score(
+                    correct, total, module_descriptor.graded and total > 0, module_descriptor.display_name_with_default
+                ))
+
+            if graded_section is not None and section_is_seen(student, graded_section, field_data_cache):
+                _, graded_total = graders.aggregate_scores(graded_scores, section_module.display_name_with_default)
+                if graded_total.possible > 0 and grade_cache.section_is_cacheable(graded_section):
+                    grade_cache.set_section_grade(
+                        student, course.id, graded_section, section_versions[section_key],
+                        read_state_version, graded_total.earned, graded_total.possible
+                    )
 
             scores.reverse()
             section_total, _ = graders.aggregate_scores(
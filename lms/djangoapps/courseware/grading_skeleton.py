@@ -0,0 +1,121 @@
+"""
+A compact, descriptor-free description of how a course is graded.
+
+CourseDescriptor.grading_context needs the whole course tree materialized as
+descriptors. The grading skeleton keeps only what is needed to score students
+from their StudentModule rows, as plain (picklable) data:
+
+    {
+        'course_id': course id,
+        'sections': {
+            section format: [
+                {
+                    'location': location url of the section,
+                    'display_name': display name of the section,
+                    # location urls whose StudentModule means the section has been seen
+                    'state_keys': [url, ...],
+                    # the section's scored descendants, in the order grades.grade() visits them
+                    'problems': [
+                        {
+                            'location': url,
+                            'display_name': display name,
+                            'weight': weight or None,
+                            'graded': bool,
+                            # max score if it is the same for every student, else None
+                            'max_score': number or None,
+                        },
+                        ...
+                    ],
+                    # True if scores in the section can only be computed by creating
+                    # XModules (dynamic children, or always-recalculated modules)
+                    'needs_modules': bool,
+                    'always_recalculate': bool,
+                },
+                ...
+            ],
+        },
+    }
+
+The skeleton is built once per course version (see ModuleStore.get_course_version)
+and kept in the django cache. Courses that don't change while loaded (XML) keep
+it on the course descriptor instead.
+"""
+import logging
+
+from django.core.cache import cache
+
+from courseware.grades import yield_descriptor_descendents
+from xmodule.modulestore.django import modulestore
+
+log = logging.getLogger(__name__)
+
+# How long a skeleton is kept in the django cache
+SKELETON_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _skeleton_cache_key(course_id, version):
+    """Django cache key of the skeleton of course_id at version"""
+    return u'courseware.grading_skeleton.{0}.{1}'.format(course_id, version)
+
+
+def grading_skeleton(course):
+    """
+    Return the grading skeleton of `course`.
+
+    `course` only needs to be loaded with depth=0: on a cache miss, the full
+    course tree is loaded from the modulestore to build the skeleton.
+    """
+    version = modulestore().get_course_version(course.id)
+    if version is None:
+        skeleton = getattr(course, '_grading_skeleton', None)
+        if skeleton is None:
+            skeleton = course._grading_skeleton = build_grading_skeleton(course)  # pylint: disable=protected-access
+        return skeleton
+
+    key = _skeleton_cache_key(course.id, version)
+    skeleton = cache.get(key)
+    if skeleton is None:
+        log.debug("Building grading skeleton of %s at version %s", course.id, version)
+        full_course = modulestore().get_instance(course.id, course.location, depth=None)
+        skeleton = build_grading_skeleton(full_course)
+        cache.set(key, skeleton, SKELETON_CACHE_TIMEOUT)
+    return skeleton
+
+
+def build_grading_skeleton(course):
+    """
+    Compute the grading skeleton of `course` from its descriptors.
+    """
+    sections_by_format = {}
+    for section_format, sections in course.grading_context['graded_sections'].iteritems():
+        format_sections = sections_by_format.setdefault(section_format, [])
+        for section in sections:
+            section_descriptor = section['section_descriptor']
+            descendents = list(yield_descriptor_descendents(section_descriptor))
+            format_sections.append({
+                'location': section_descriptor.location.url(),
+                'display_name': section_descriptor.display_name_with_default,
+                'state_keys': [descriptor.location.url() for descriptor in section['xmoduledescriptors']],
+                'problems': [
+                    {
+                        'location': descriptor.location.url(),
+                        'display_name': descriptor.display_name_with_default,
+                        'weight': getattr(descriptor, 'weight', None),
+                        'graded': descriptor.graded,
+                        'max_score': descriptor.static_max_score(),
+                    }
+                    for descriptor in descendents if descriptor.has_score
+                ],
+                'needs_modules': any(
+                    descriptor.always_recalculate_grades or descriptor.has_dynamic_children()
+                    for descriptor in descendents
+                ),
+                'always_recalculate': any(
+                    descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
+                ),
+            })
+
+    return {
+        'course_id': course.id,
+        'sections': sections_by_format,
+    }
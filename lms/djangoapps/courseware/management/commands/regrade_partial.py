@@ -10,6 +10,7 @@ from optparse import make_option
 
 from django.core.management.base import BaseCommand
 
+from courseware import grade_cache
 from courseware.models import StudentModule
 from capa.correctmap import CorrectMap
 
@@ -101,6 +102,7 @@ class Command(BaseCommand):
                                                     student=module.student.username, course_id=module.course_id))
             module.grade = correct
             module.save()
+            grade_cache.invalidate_module(module.student_id, module.course_id, module.module_state_key)
             self.num_changed += 1
         else:
             # don't make the change, but log that the change would be made
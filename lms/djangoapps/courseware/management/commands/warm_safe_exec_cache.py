@@ -0,0 +1,186 @@
+"""
+Fill the safe_exec cache with the script contexts of the capa problems of a
+course, for every seed they can be given, before students open them.
+
+CapaModule.choose_new_seed caps the seeds of randomized problems to a few
+randomization bins, and safe_exec caches the execution of the problem scripts
+by code, globals and seed: so every script context students can get can be
+computed ahead of time, here in parallel processes. The time each problem
+takes is reported, to catch slow problems before release.
+
+The cache needs to be shared with the LMS processes (e.g. memcached) for this
+to be of use.
+"""
+
+import multiprocessing
+import time
+from optparse import make_option
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from capa.capa_problem import LoncapaProblem
+from mitxmako.shortcuts import render_to_string
+from util.sandboxing import can_execute_unsafe_code
+from xblock.field_data import DictFieldData
+from xmodule.capa_module import MAX_RANDOMIZATION_BINS, NUM_RANDOMIZATION_BINS
+from xmodule.modulestore import Location
+from xmodule.modulestore.django import close_connections, modulestore
+from xmodule.x_module import ModuleSystem
+
+# the problems to warm, set before forking the processes of the pool so they
+# don't need to be pickled
+_PROBLEMS = []
+
+
+def problem_seeds(descriptor, max_bins=None):
+    """
+    Returns the seeds CapaModule.choose_new_seed can give the problem of descriptor,
+    at most max_bins of them.
+    """
+    if descriptor.rerandomize == 'never':
+        seeds = [1]
+    elif descriptor.rerandomize == 'per_student':
+        seeds = range(NUM_RANDOMIZATION_BINS)
+    else:
+        seeds = range(MAX_RANDOMIZATION_BINS)
+    return seeds[:max_bins] if max_bins else seeds
+
+
+def warm_problem(descriptor, seed, course_id):
+    """
+    Runs the scripts of the problem of descriptor with seed, as CapaModule does,
+    so their result is cached. Returns the number of seconds it took.
+    """
+    system = ModuleSystem(
+        static_url=settings.STATIC_URL,
+        ajax_url=None,
+        track_function=None,
+        get_module=None,
+        render_template=render_to_string,
+        replace_urls=None,
+        xmodule_field_data=DictFieldData({}),
+        filestore=descriptor.runtime.resources_fs,
+        debug=settings.DEBUG,
+        cache=cache,
+        can_execute_unsafe_code=(lambda: can_execute_unsafe_code(course_id)),
+    )
+    start = time.time()
+    LoncapaProblem(descriptor.data, id=descriptor.location.html_id(), seed=seed, system=system)
+    return time.time() - start
+
+
+def _init_worker():
+    """
+    Open fresh connections to MongoDB and memcached in a worker of the pool, rather
+    than use the sockets inherited from the parent process.
+    """
+    close_connections()
+    cache.close()
+
+
+def _warm_problem_in_subprocess(args):
+    """
+    Warms the problem of _PROBLEMS at index with seed. Returns the index, the
+    seed, and the seconds it took or the error it failed with. Runs in the
+    processes of a multiprocessing.Pool.
+    """
+    index, seed, course_id = args
+    try:
+        return index, seed, warm_problem(_PROBLEMS[index], seed, course_id), None
+    except Exception as err:  # pylint: disable=broad-except
+        return index, seed, None, str(err)
+
+
+class Command(BaseCommand):
+    """
+    Pre-compute the script contexts of the capa problems of a course.
+    """
+    args = "<course_id>"
+    help = "Fills the safe_exec cache with the script contexts of the problems of a course, for each of their seeds."
+
+    option_list = BaseCommand.option_list + (
+        make_option('--processes',
+                    type='int',
+                    default=multiprocessing.cpu_count(),
+                    help='How many processes run problems in parallel.'),
+        make_option('--bins',
+                    type='int',
+                    default=None,
+                    help='Warm at most this many seeds of each problem.'),
+        make_option('--slow',
+                    type='float',
+                    default=1.0,
+                    help='Flag the problems taking more than this many seconds for a seed.'),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError("Usage: warm_safe_exec_cache {0}".format(self.args))
+        course_id = args[0]
+
+        store = modulestore()
+        course = store.get_course(course_id)
+        if course is None:
+            raise CommandError("No course {0}".format(course_id))
+        problems = store.get_items(
+            Location('i4x', course.location.org, course.location.course, 'problem', None),
+            course_id=course_id,
+        )
+
+        del _PROBLEMS[:]
+        _PROBLEMS.extend(problems)
+        jobs = [
+            (index, seed, course_id)
+            for index, problem in enumerate(problems)
+            for seed in problem_seeds(problem, options['bins'])
+        ]
+        self.stdout.write("Running {0} problems with {1} seeds in all\n".format(len(problems), len(jobs)))
+
+        times = [[] for _ in problems]
+        errors = [{} for _ in problems]
+        start = time.time()
+        if options['processes'] > 1:
+            # Forked workers must not share the parent's database connection
+            connection.close()
+            pool = multiprocessing.Pool(options['processes'], initializer=_init_worker)
+            try:
+                results = list(pool.imap_unordered(_warm_problem_in_subprocess, jobs, chunksize=10))
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [_warm_problem_in_subprocess(job) for job in jobs]
+        for index, seed, seconds, error in results:
+            if error is None:
+                times[index].append(seconds)
+            else:
+                errors[index][seed] = error
+
+        self.stdout.write("Done in {0:.1f}s\n\n".format(time.time() - start))
+        self.report(problems, times, errors, options['slow'])
+
+    def report(self, problems, times, errors, slow):
+        """
+        Writes the time each problem took per seed, the slowest first
+        """
+        self.stdout.write("{0:>8} {1:>8} {2:>8} {3:>6}  problem\n".format('mean', 'max', 'total', 'errors'))
+        by_max_time = sorted(range(len(problems)), key=lambda index: max(times[index] or [0]), reverse=True)
+        for index in by_max_time:
+            problem_times = times[index] or [0]
+            self.stdout.write("{0:8.3f} {1:8.3f} {2:8.3f} {3:6}  {4}{5}\n".format(
+                sum(problem_times) / len(problem_times),
+                max(problem_times),
+                sum(problem_times),
+                len(errors[index]),
+                problems[index].location.url(),
+                '  SLOW' if max(problem_times) > slow else '',
+            ))
+
+        for index, problem_errors in enumerate(errors):
+            for seed, error in sorted(problem_errors.items())[:1]:
+                self.stdout.write("\n{0} failed with {1} seeds, e.g. seed {2}: {3}\n".format(
+                    problems[index].location.url(), len(problem_errors), seed, error
+                ))
@@ -0,0 +1,62 @@
+"""Test the warm_safe_exec_cache management command."""
+
+import textwrap
+from mock import Mock, patch
+
+from django.test import TestCase
+
+import capa.capa_problem
+from courseware.management.commands.warm_safe_exec_cache import problem_seeds, warm_problem
+from xmodule.capa_module import MAX_RANDOMIZATION_BINS, NUM_RANDOMIZATION_BINS
+from xmodule.modulestore import Location
+
+
+class DictCache(object):
+    """A cache implementation over a simple dict, for testing."""
+
+    def __init__(self):
+        self.cache = {}
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache[key] = value
+
+
+class WarmSafeExecCacheTest(TestCase):
+    """
+    Tests of warming the safe_exec cache for problems.
+    """
+    def new_descriptor(self, rerandomize='always'):
+        """A problem descriptor, with a script"""
+        return Mock(
+            rerandomize=rerandomize,
+            location=Location('i4x', 'edX', 'toy', 'problem', 'warm'),
+            data=textwrap.dedent("""
+                <problem>
+                    <script type="loncapa/python">
+                    answer = random.randint(0, 100)
+                    </script>
+                    <stringresponse answer="$answer">
+                        <textline/>
+                    </stringresponse>
+                </problem>
+            """),
+        )
+
+    def test_problem_seeds(self):
+        self.assertEqual(problem_seeds(self.new_descriptor('never')), [1])
+        self.assertEqual(len(problem_seeds(self.new_descriptor('per_student'))), NUM_RANDOMIZATION_BINS)
+        self.assertEqual(len(problem_seeds(self.new_descriptor('always'))), MAX_RANDOMIZATION_BINS)
+        self.assertEqual(problem_seeds(self.new_descriptor('always'), max_bins=3), [0, 1, 2])
+
+    def test_warm_problem(self):
+        cache = DictCache()
+        descriptor = self.new_descriptor()
+        capa.capa_problem._compiled_problems.clear()  # pylint: disable=protected-access
+        with patch('courseware.management.commands.warm_safe_exec_cache.cache', cache):
+            for seed in range(3):
+                warm_problem(descriptor, seed, 'edX/toy/2012_Fall')
+        self.assertEqual(len(cache.cache), 3)
+        self.assertTrue(all(key.startswith('safe_exec.') for key in cache.cache))
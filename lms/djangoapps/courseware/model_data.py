@@ -18,6 +18,7 @@ from django.db import DatabaseError
 from xblock.runtime import KeyValueStore
 from xblock.exceptions import KeyValueMultiSaveError, InvalidScopeError
 from xblock.fields import Scope
+from xmodule.modulestore.django import modulestore
 
 log = logging.getLogger(__name__)
 
@@ -104,10 +105,25 @@ class FieldDataCache(object):
 
             return descriptors
 
+        # let the modulestore load the whole subtree at once
+        modulestore().prefetch(course_id, descriptor, depth)
         descriptors = get_child_descriptors(descriptor, depth, descriptor_filter)
 
         return FieldDataCache(descriptors, course_id, user, select_for_update)
 
+    def add_descriptor_descendents(self, descriptor, depth=None, descriptor_filter=lambda descriptor: True):
+        """
+        Add the data of `descriptor` and its descendants to this cache, as
+        cache_for_descriptor_descendents() would load it. Objects already in
+        the cache are kept, so that unsaved changes to them aren't lost.
+        """
+        other = self.cache_for_descriptor_descendents(
+            self.course_id, self.user, descriptor, depth, descriptor_filter, self.select_for_update
+        )
+        self.descriptors = list(self.descriptors) + other.descriptors
+        for key, field_object in other.cache.iteritems():
+            self.cache.setdefault(key, field_object)
+
     def _query(self, model_class, **kwargs):
         """
         Queries model_class with **kwargs, optionally adding select_for_update if
@@ -209,6 +209,9 @@ class OfflineComputedGrade(models.Model):
 
     gradeset = models.TextField(null=True, blank=True)		# grades, stored as JSON
 
+    # The sharded run (see OfflineComputedGradeLog) which computed these grades
+    run_id = models.CharField(max_length=32, null=True, blank=True, db_index=True)
+
     class Meta:
         unique_together = (('user', 'course_id'), )
 
@@ -220,6 +223,10 @@ class OfflineComputedGradeLog(models.Model):
     """
     Log of when offline grades are computed.
     Use this to be able to show instructor when the last computed grades were done.
+
+    A sharded run also logs one entry per completed shard of students (those
+    entries have first_user_id/last_user_id set). The OfflineComputedGrades of
+    the students it has graded have its run_id, to resume it if interrupted.
     """
     class Meta:
         ordering = ["-created"]
@@ -230,5 +237,54 @@ class OfflineComputedGradeLog(models.Model):
     seconds = models.IntegerField(default=0)  	# seconds elapsed for computation
     nstudents = models.IntegerField(default=0)
 
+    # Identifies the run a shard entry belongs to
+    run_id = models.CharField(max_length=32, null=True, blank=True, db_index=True)
+    # Range of user ids (inclusive) covered by a shard entry; null for whole-run entries
+    first_user_id = models.IntegerField(null=True, blank=True)
+    last_user_id = models.IntegerField(null=True, blank=True)
+
     def __unicode__(self):
+        if self.first_user_id is not None:
+            return "[OCGLog] %s: %s shard %s-%s" % (self.course_id, self.created, self.first_user_id, self.last_user_id)
         return "[OCGLog] %s: %s" % (self.course_id, self.created)
+
+
+class StudentSectionGrade(models.Model):
+    """
+    Cache of the weighted score a student has earned in a single graded
+    section of a course, so that grades.grade() does not have to re-derive it
+    from the module tree on every call.
+
+    `version` is a digest of the section's graded structure (see
+    courseware.grade_cache.section_version); rows whose version does not match
+    the current course content are ignored and recomputed. `state_version` is
+    a digest of the student's stored scores the total was computed from (see
+    courseware.grade_cache.state_version).
+    """
+    class Meta:
+        unique_together = (('student', 'course_id', 'section_key'),)
+
+    student = models.ForeignKey(User, db_index=True)
+    course_id = models.CharField(max_length=255, db_index=True)
+    # The location url of the graded section (sequential)
+    section_key = models.CharField(max_length=255, db_index=True)
+    version = models.CharField(max_length=40)
+    state_version = models.CharField(max_length=40, blank=True, default='')
+
+    earned = models.FloatField(default=0.0)
+    possible = models.FloatField(default=0.0)
+
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    modified = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __repr__(self):
+        return 'StudentSectionGrade<%r>' % ({
+            'course_id': self.course_id,
+            'student': self.student_id,
+            'section_key': self.section_key,
+            'earned': self.earned,
+            'possible': self.possible,
+        },)
+
+    def __unicode__(self):
+        return unicode(repr(self))
@@ -31,9 +31,11 @@ import static_replace
 from psychometrics.psychoanalyze import make_psychometrics_data_update_handler
 from student.models import unique_id_for_user
 
+from courseware import grade_cache, toc
 from courseware.access import has_access
 from courseware.masquerade import setup_masquerade
 from courseware.model_data import FieldDataCache, DjangoKeyValueStore
+from courseware.models import StudentModule
 from xblock.runtime import KeyValueStore
 from xblock.fields import Scope
 from util.sandboxing import can_execute_unsafe_code
@@ -89,7 +91,20 @@ def toc_for_course(user, request, course, active_chapter, active_section, field_
     None if this is not the case.
 
     field_data_cache must include data from the course module and 2 levels of its descendents
+
+    With MITX_FEATURES['ENABLE_CACHED_TOC'], the table of contents is built from
+    the course's cached TOC skeleton (see courseware.toc) without creating any
+    XModule, when the course has one.
     '''
+    if settings.MITX_FEATURES.get('ENABLE_CACHED_TOC'):
+        skeleton = toc.toc_skeleton(course)
+        if skeleton is not None:
+            # allow course staff to masquerade as student, as get_module_for_descriptor does
+            if has_access(user, course, 'staff', course.id):
+                setup_masquerade(request, True)
+            if not has_access(user, course, 'load', course.id):
+                return None
+            return toc.toc_for_user(user, course.id, skeleton, active_chapter, active_section)
 
     course_module = get_module_for_descriptor(user, request, course, field_data_cache, course.id)
     if course_module is None:
@@ -318,6 +333,10 @@ def get_module_for_descriptor_internal(user, descriptor, field_data_cache, cours
         # Save all changes to the underlying KeyValueStore
         student_module.save()
 
+        # Only the section containing this module needs to be regraded
+        if grade_cache.grade_cache_enabled():
+            grade_cache.invalidate_module(user.id, course_id, descriptor.location.url())
+
         # Bin score into range and increment stats
         score_bucket = get_score_bucket(student_module.grade, student_module.max_grade)
         org, course_num, run = course_id.split("/")
@@ -370,8 +389,10 @@ def get_module_for_descriptor_internal(user, descriptor, field_data_cache, cours
         reverse('jump_to_id', kwargs={'course_id': course_id, 'module_id': ''}),
     ))
 
+    user_is_staff = has_access(user, descriptor.location, 'staff', course_id)
+
     if settings.MITX_FEATURES.get('DISPLAY_HISTOGRAMS_TO_STAFF'):
-        if has_access(user, descriptor, 'staff', course_id):
+        if user_is_staff:
             block_wrappers.append(partial(add_histogram, user))
 
     system = ModuleSystem(
@@ -420,6 +441,12 @@ def get_module_for_descriptor_internal(user, descriptor, field_data_cache, cours
 
     # pass position specified in URL to module through ModuleSystem
     system.set('position', position)
+    # only render the current tab of sequences (see SequenceModule.render_lazily)
+    system.set('lazy_sequence_rendering', settings.MITX_FEATURES.get('ENABLE_LAZY_SEQUENCE_RENDERING', False))
+    # and show the progress of the other tabs from their stored scores
+    system.set('get_stored_scores', partial(get_stored_scores, user, course_id))
+    # which descendants of the lazy tabs the user sees, as get_module would
+    system.set('can_load', lambda child: has_access(user, child, 'load', course_id))
     if settings.MITX_FEATURES.get('ENABLE_PSYCHOMETRICS'):
         system.set(
             'psychometrics_handler',  # set callback for updating PsychometricsData
@@ -432,7 +459,7 @@ def get_module_for_descriptor_internal(user, descriptor, field_data_cache, cours
         log.exception("Error creating module from descriptor {0}".format(descriptor))
 
         # make an ErrorDescriptor -- assuming that the descriptor's system is ok
-        if has_access(user, descriptor.location, 'staff', course_id):
+        if user_is_staff:
             err_descriptor_class = ErrorDescriptor
         else:
             err_descriptor_class = NonStaffErrorDescriptor
@@ -445,10 +472,25 @@ def get_module_for_descriptor_internal(user, descriptor, field_data_cache, cours
         # Make an error module
         return err_descriptor.xmodule(system)
 
-    system.set('user_is_staff', has_access(user, descriptor.location, 'staff', course_id))
+    system.set('user_is_staff', user_is_staff)
     return module
 
 
+def get_stored_scores(user, course_id, descriptors):
+    """
+    Returns a dict of location url -> (grade, max_grade) of the StudentModules
+    of `user` for `descriptors`, read in a single query.
+    """
+    if not user.is_authenticated() or not descriptors:
+        return {}
+    student_modules = StudentModule.objects.filter(
+        student=user,
+        course_id=course_id,
+        module_state_key__in=[descriptor.location.url() for descriptor in descriptors],
+    ).values_list('module_state_key', 'grade', 'max_grade')
+    return dict((key, (grade, max_grade)) for key, grade, max_grade in student_modules)
+
+
 def find_target_student_module(request, user_id, course_id, mod_id):
     """
     Retrieve target StudentModule
@@ -555,10 +597,14 @@ def modx_dispatch(request, dispatch, location, course_id):
         )
         raise Http404
 
+    # Fetching one tab of a lazily rendered sequence only needs the state of
+    # the sequence, its items and the requested item's subtree
+    render_item = dispatch == 'render_item' and settings.MITX_FEATURES.get('ENABLE_LAZY_SEQUENCE_RENDERING', False)
     field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
         course_id,
         request.user,
-        descriptor
+        descriptor,
+        depth=1 if render_item else None,
     )
 
     instance = get_module(request.user, request, location, field_data_cache, course_id, grade_bucket_type='ajax')
@@ -570,6 +616,11 @@ def modx_dispatch(request, dispatch, location, course_id):
 
     # Let the module handle the AJAX
     try:
+        if render_item:
+            if getattr(instance, 'render_lazily', False):
+                field_data_cache.add_descriptor_descendents(instance.get_item_at(data.get('position')).descriptor)
+            else:
+                field_data_cache.add_descriptor_descendents(descriptor)
         ajax_return = instance.handle_ajax(dispatch, data)
         # Save any fields that have changed to the underlying KeyValueStore
         instance.save()
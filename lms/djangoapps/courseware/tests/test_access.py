@@ -1,10 +1,14 @@
-from mock import Mock
+from mock import Mock, patch
 
+from django.conf import settings
+from django.contrib.auth.models import Group
 from django.test import TestCase
 
 from xmodule.modulestore import Location
 import courseware.access as access
 from .factories import CourseEnrollmentAllowedFactory
+from request_cache.middleware import RequestCache
+from student.tests.factories import UserFactory
 import datetime
 from django.utils.timezone import UTC
 
@@ -106,3 +110,54 @@ class AccessTestCase(TestCase):
 
         # TODO:
         # Non-staff cannot enroll outside the open enrollment period if not specifically allowed
+
+
+class GroupNamesCacheTestCase(TestCase):
+    """
+    Check that group names are loaded once and dropped when groups change.
+    """
+    def setUp(self):
+        self.user = UserFactory.create()
+        self.location = Location('i4x://edX/toy/course/2012_Fall')
+        RequestCache().process_request(Mock())
+
+    def tearDown(self):
+        access.invalidate_group_names([self.user.id])
+        RequestCache().process_response(None, None)
+
+    def test_loaded_once(self):
+        with self.assertNumQueries(1):
+            results = access.batch_has_access(self.user, [self.location] * 5, 'staff')
+        self.assertEqual(results, [False] * 5)
+
+    def test_group_changes(self):
+        self.assertFalse(access._has_access_to_location(self.user, self.location, 'staff', None))
+
+        group = Group.objects.create(name='staff_edX/toy/2012_Fall')
+        group.user_set.add(self.user)
+        self.assertTrue(access._has_access_to_location(self.user, self.location, 'staff', None))
+
+        self.user.groups.remove(group)
+        self.assertFalse(access._has_access_to_location(self.user, self.location, 'staff', None))
+
+        self.user.groups.add(group)
+        group.delete()
+        self.assertFalse(access._has_access_to_location(self.user, self.location, 'staff', None))
+
+    @patch.dict(settings.MITX_FEATURES, {'CACHE_ACCESS_GROUP_NAMES': True})
+    def test_cached_across_requests(self):
+        group = Group.objects.create(name='staff_edX/toy/2012_Fall')
+        self.user.groups.add(group)
+        self.assertEqual(access.user_group_names(self.user), frozenset(['staff_edX/toy/2012_Fall']))
+
+        # A new request starts with an empty request cache
+        RequestCache().process_response(None, None)
+        RequestCache().process_request(Mock())
+        with self.assertNumQueries(0):
+            self.assertEqual(access.user_group_names(self.user), frozenset(['staff_edX/toy/2012_Fall']))
+
+    def test_not_kept_outside_requests(self):
+        RequestCache().process_response(None, None)
+        with self.assertNumQueries(2):
+            access.user_group_names(self.user)
+            access.user_group_names(self.user)
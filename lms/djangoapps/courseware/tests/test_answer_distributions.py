@@ -0,0 +1,98 @@
+"""
+Tests of courseware.grades.answer_distributions
+"""
+import json
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from mock import patch
+
+from capa.tests.response_xml_factory import StringResponseXMLFactory
+from courseware import grades
+from courseware.tests.factories import StudentModuleFactory
+from courseware.tests.modulestore_config import TEST_DATA_MIXED_MODULESTORE
+from student.tests.factories import UserFactory, CourseEnrollmentFactory
+from xmodule.modulestore import Location
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+
+class TestDecodeStudentAnswers(TestCase):
+    """
+    Check that student answers are found in stored capa state.
+    """
+
+    def test_decode(self):
+        state = json.dumps({
+            'correct_map': {'i4x-a-b-problem-p_2_1': {'msg': '"student_answers": 1'}},
+            'student_answers': {'i4x-a-b-problem-p_2_1': [u'caf\xe9', 'x']},
+            'seed': 1,
+        })
+        self.assertEqual(grades.decode_student_answers(state), {'i4x-a-b-problem-p_2_1': [u'caf\xe9', 'x']})
+
+    def test_missing(self):
+        self.assertEqual(grades.decode_student_answers(None), {})
+        self.assertEqual(grades.decode_student_answers('{}'), {})
+        self.assertEqual(grades.decode_student_answers('{"student_answers": [}'), {})
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestAnswerDistributions(ModuleStoreTestCase):
+    """
+    Check that answer distributions are computed from stored state alone.
+    """
+
+    def setUp(self):
+        course = CourseFactory.create()
+        chapter = ItemFactory.create(parent_location=course.location, category="chapter")
+        section = ItemFactory.create(
+            parent_location=chapter.location,
+            category="sequential",
+            metadata={'graded': True, 'format': 'Homework'}
+        )
+        self.problem = ItemFactory.create(
+            parent_location=section.location,
+            category="problem",
+            data=StringResponseXMLFactory().build_xml(answer='foo'),
+            display_name='Problem 1',
+        )
+        self.course = modulestore().get_instance(course.id, course.location)
+        self.answer_id = '{0}_2_1'.format(Location(self.problem.location).html_id())
+
+        answers = ['foo', 'foo', 'bar']
+        for answer in answers:
+            self.add_answer(answer)
+        # Not enrolled, so not counted
+        StudentModuleFactory.create(
+            student=UserFactory.create(),
+            course_id=course.id,
+            module_state_key=Location(self.problem.location).url(),
+            state=json.dumps({'student_answers': {self.answer_id: 'baz'}}),
+        )
+
+    def add_answer(self, answer):
+        """Store `answer` as the answer of a new enrolled student"""
+        user = UserFactory.create()
+        CourseEnrollmentFactory.create(user=user, course_id=self.course.id)
+        StudentModuleFactory.create(
+            student=user,
+            course_id=self.course.id,
+            module_state_key=Location(self.problem.location).url(),
+            state=json.dumps({'student_answers': {self.answer_id: answer}, 'seed': 1}),
+        )
+
+    def test_distribution(self):
+        with patch('courseware.grades.get_module') as mock_get_module:
+            dist = grades.answer_distributions(None, self.course)
+        self.assertFalse(mock_get_module.called)
+
+        key = (Location(self.problem.location).name, 'Problem 1', self.answer_id)
+        self.assertEqual(dist.keys(), [key])
+        self.assertEqual(dict(dist[key]), {'foo': 2, 'bar': 1})
+
+    def test_chunks(self):
+        states = list(grades.iter_student_module_states(
+            self.course.id, [Location(self.problem.location).url()], chunk_size=2
+        ))
+        self.assertEqual(len(states), 3)
@@ -0,0 +1,103 @@
+"""
+Tests of courseware.bulk_grades
+"""
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+from mock import patch
+
+from capa.tests.response_xml_factory import StringResponseXMLFactory
+from courseware import grades
+from courseware.bulk_grades import iterate_grades_for
+from courseware.model_data import FieldDataCache
+from courseware.tests.factories import StudentModuleFactory
+from courseware.tests.modulestore_config import TEST_DATA_MIXED_MODULESTORE
+from student.tests.factories import UserFactory, CourseEnrollmentFactory
+from xmodule.modulestore import Location
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+USER_COUNT = 5
+PROBLEM_COUNT = 4
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestIterateGradesFor(ModuleStoreTestCase):
+    """
+    Check that batch grading agrees with grading students one at a time.
+    """
+
+    def setUp(self):
+        course = CourseFactory.create()
+        chapter = ItemFactory.create(parent_location=course.location, category="chapter")
+        section = ItemFactory.create(
+            parent_location=chapter.location,
+            category="sequential",
+            metadata={'graded': True, 'format': 'Homework'}
+        )
+        self.users = [UserFactory.create() for _ in xrange(USER_COUNT)]
+        for user in self.users:
+            CourseEnrollmentFactory.create(user=user, course_id=course.id)
+
+        for i in xrange(PROBLEM_COUNT):
+            item = ItemFactory.create(
+                parent_location=section.location,
+                category="problem",
+                data=StringResponseXMLFactory().build_xml(answer='foo'),
+            )
+            # The last student hasn't looked at the section at all; the
+            # last problem hasn't been graded for anyone.
+            for j, user in enumerate(self.users[:-1]):
+                StudentModuleFactory.create(
+                    state='{}',
+                    grade=1 if i < j else 0,
+                    max_grade=1 if i < PROBLEM_COUNT - 1 else None,
+                    student=user,
+                    course_id=course.id,
+                    module_state_key=Location(item.location).url()
+                )
+
+        self.course = modulestore().get_instance(course.id, course.location)
+        self.request = RequestFactory().get('/')
+
+    def test_matches_single_student_grading(self):
+        for keep_raw_scores in (False, True):
+            bulk = list(iterate_grades_for(self.course, self.users, self.request, keep_raw_scores=keep_raw_scores))
+            self.assertEqual([student for student, _ in bulk], self.users)
+            for student, gradeset in bulk:
+                self.request.user = student
+                # Grade from the descriptors, with the student's state loaded up front
+                field_data_cache = FieldDataCache(
+                    self.course.grading_context['all_descriptors'], self.course.id, student
+                )
+                expected = grades.grade(
+                    student, self.request, self.course, field_data_cache, keep_raw_scores=keep_raw_scores
+                )
+                self.assertEqual(gradeset['percent'], expected['percent'])
+                self.assertEqual(gradeset['totaled_scores'], expected['totaled_scores'])
+                if keep_raw_scores:
+                    self.assertEqual(gradeset['raw_scores'], expected['raw_scores'])
+
+    @patch('courseware.bulk_grades.StudentModule.objects.filter')
+    def test_single_query_per_chunk(self, mock_filter):
+        mock_filter.return_value.values_list.return_value.annotate.return_value = []
+        mock_filter.return_value.order_by.return_value.values_list.return_value.iterator.return_value = []
+        with patch('courseware.bulk_grades.STUDENT_CHUNK_SIZE', 2):
+            list(iterate_grades_for(self.course, self.users, self.request))
+        # One query for the known max scores, then one per chunk of two students
+        self.assertEqual(mock_filter.call_count, 1 + 3)
+
+    def test_problem_instantiated_once(self):
+        with patch('courseware.bulk_grades.get_module_for_descriptor',
+                   wraps=grades.get_module_for_descriptor) as mock_get_module:
+            list(iterate_grades_for(self.course, self.users, self.request))
+        # Only the problem without any stored max_grade needs an XModule
+        self.assertEqual(mock_get_module.call_count, 1)
+
+    def test_grade_uses_skeleton(self):
+        self.request.user = self.users[1]
+        with patch('courseware.grades.FieldDataCache') as mock_field_data_cache:
+            gradeset = grades.grade(self.users[1], self.request, self.course)
+        self.assertFalse(mock_field_data_cache.called)
+        bulk = dict(iterate_grades_for(self.course, [self.users[1]], self.request))
+        self.assertEqual(gradeset['totaled_scores'], bulk[self.users[1]]['totaled_scores'])
@@ -0,0 +1,71 @@
+"""
+Tests of courseware.grading_skeleton
+"""
+from django.test.utils import override_settings
+from mock import patch
+
+from capa.tests.response_xml_factory import StringResponseXMLFactory
+from courseware.grading_skeleton import grading_skeleton, build_grading_skeleton
+from courseware.tests.modulestore_config import TEST_DATA_MIXED_MODULESTORE
+from xmodule.modulestore import Location
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestGradingSkeleton(ModuleStoreTestCase):
+    """
+    Check the contents and caching of course grading skeletons.
+    """
+
+    def setUp(self):
+        course = CourseFactory.create()
+        chapter = ItemFactory.create(parent_location=course.location, category="chapter")
+        self.section = ItemFactory.create(
+            parent_location=chapter.location,
+            category="sequential",
+            metadata={'graded': True, 'format': 'Homework'}
+        )
+        self.problem = ItemFactory.create(
+            parent_location=self.section.location,
+            category="problem",
+            data=StringResponseXMLFactory().build_xml(answer='foo'),
+            metadata={'weight': 2}
+        )
+        self.course = modulestore().get_instance(course.id, course.location)
+
+    def test_contents(self):
+        skeleton = grading_skeleton(self.course)
+        self.assertEqual(skeleton['course_id'], self.course.id)
+        self.assertEqual(skeleton['sections'].keys(), ['Homework'])
+
+        [section] = skeleton['sections']['Homework']
+        problem_url = Location(self.problem.location).url()
+        self.assertEqual(section['location'], Location(self.section.location).url())
+        self.assertEqual(section['state_keys'], [problem_url])
+        self.assertFalse(section['needs_modules'])
+        self.assertFalse(section['always_recalculate'])
+
+        [problem] = section['problems']
+        self.assertEqual(problem['location'], problem_url)
+        self.assertEqual(problem['weight'], 2)
+        self.assertTrue(problem['graded'])
+
+    def test_cached_until_course_changes(self):
+        with patch('courseware.grading_skeleton.build_grading_skeleton',
+                   wraps=build_grading_skeleton) as mock_build:
+            grading_skeleton(self.course)
+            grading_skeleton(self.course)
+            self.assertEqual(mock_build.call_count, 1)
+
+            ItemFactory.create(
+                parent_location=self.section.location,
+                category="problem",
+                data=StringResponseXMLFactory().build_xml(answer='bar'),
+            )
+            skeleton = grading_skeleton(self.course)
+            self.assertEqual(mock_build.call_count, 2)
+
+        [section] = skeleton['sections']['Homework']
+        self.assertEqual(len(section['problems']), 2)
@@ -1,6 +1,7 @@
 """
 Test for lms courseware app, module render unit
 """
+from datetime import datetime, timedelta
 from mock import MagicMock, patch, Mock
 import json
 
@@ -10,7 +11,9 @@ from django.conf import settings
 from django.test import TestCase
 from django.test.client import RequestFactory
 from django.test.utils import override_settings
+from django.utils.timezone import UTC
 
+from xmodule.exceptions import NotFoundError
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.tests.factories import ItemFactory, CourseFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
@@ -21,7 +24,8 @@ from courseware.model_data import FieldDataCache
 
 from courseware.courses import get_course_with_access, course_image_url, get_course_info_section
 
-from .factories import UserFactory
+from capa.tests.response_xml_factory import StringResponseXMLFactory
+from .factories import StudentModuleFactory, UserFactory
 
 
 @override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
@@ -261,6 +265,24 @@ class TestTOC(TestCase):
             self.assertIn(toc_section, actual)
 
 
+    def test_cached_toc(self):
+        request = RequestFactory().get('%s/%s/%s' % ('/courses', self.course_name, 'Overview'))
+        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
+            self.toy_course.id, self.portal_user, self.toy_course, depth=2)
+
+        for chapter, section in [('Overview', None), ('Overview', 'Welcome')]:
+            expected = render.toc_for_course(
+                self.portal_user, request, self.toy_course, chapter, section, field_data_cache
+            )
+            with patch.dict(settings.MITX_FEATURES, {'ENABLE_CACHED_TOC': True}):
+                with patch('courseware.module_render.get_module_for_descriptor') as mock_get_module:
+                    actual = render.toc_for_course(
+                        self.portal_user, request, self.toy_course, chapter, section, field_data_cache
+                    )
+            self.assertFalse(mock_get_module.called)
+            self.assertEqual(actual, expected)
+
+
 @override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
 class TestHtmlModifiers(ModuleStoreTestCase):
     """
@@ -414,3 +436,116 @@ class TestHtmlModifiers(ModuleStoreTestCase):
             'Staff Debug',
             result_fragment.content
         )
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestLazySequence(ModuleStoreTestCase):
+    """
+    Tests that lazy sequences only render their current tab, and serve the
+    others through the 'render_item' dispatch
+    """
+    def setUp(self):
+        self.user = UserFactory.create()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+        self.request.session = {}
+        self.course = CourseFactory.create()
+        self.sequence = ItemFactory.create(parent_location=self.course.location, category='sequential')
+        self.verticals = []
+        for i in xrange(3):
+            vertical = ItemFactory.create(parent_location=self.sequence.location, category='vertical')
+            self.verticals.append(vertical)
+            ItemFactory.create(
+                parent_location=vertical.location,
+                category='html',
+                display_name='Html {0}'.format(i),
+                data='<p>Content {0}</p>'.format(i),
+            )
+
+    def get_sequence(self, position=None):
+        """Returns the sequence module, as rendered at position"""
+        descriptor = modulestore().get_instance(self.course.id, self.sequence.location, depth=None)
+        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(self.course.id, self.user, descriptor)
+        return render.get_module_for_descriptor(
+            self.user, self.request, descriptor, field_data_cache, self.course.id, position=position
+        )
+
+    @patch.dict(settings.MITX_FEATURES, {'ENABLE_LAZY_SEQUENCE_RENDERING': True})
+    def test_only_current_tab_rendered(self):
+        module = self.get_sequence(position=2)
+        self.assertTrue(module.render_lazily)
+        content = module.runtime.render(module, None, 'student_view').content
+
+        self.assertIn('Content 1', content)
+        self.assertNotIn('Content 0', content)
+        self.assertNotIn('Content 2', content)
+        self.assertEqual(content.count('data-lazy="true"'), 2)
+        # Titles of the lazy tabs still come from their children
+        self.assertIn('Html 0', content)
+        self.assertIn('Html 2', content)
+
+    @patch.dict(settings.MITX_FEATURES, {'ENABLE_LAZY_SEQUENCE_RENDERING': True})
+    def test_lazy_tab_hides_unreleased(self):
+        ItemFactory.create(
+            parent_location=self.verticals[0].location,
+            category='html',
+            display_name='Unreleased',
+            metadata={'start': datetime.now(UTC()) + timedelta(days=1)},
+        )
+        module = self.get_sequence(position=2)
+        content = module.runtime.render(module, None, 'student_view').content
+        self.assertIn('Html 0', content)
+        self.assertNotIn('Unreleased', content)
+
+    @patch.dict(settings.MITX_FEATURES, {'ENABLE_LAZY_SEQUENCE_RENDERING': True})
+    def test_render_item(self):
+        module = self.get_sequence()
+        response = json.loads(module.handle_ajax('render_item', {'position': '3'}))
+
+        self.assertIn('Content 2', response['content'])
+        self.assertEqual(module.position, 3)
+        with self.assertRaises(NotFoundError):
+            module.handle_ajax('render_item', {'position': '4'})
+
+    @patch.dict(settings.MITX_FEATURES, {'ENABLE_LAZY_SEQUENCE_RENDERING': True})
+    def test_lazy_tab_progress(self):
+        for i in xrange(2):
+            problem = ItemFactory.create(
+                parent_location=self.verticals[0].location,
+                category='problem',
+                data=StringResponseXMLFactory().build_xml(answer='foo'),
+            )
+            StudentModuleFactory.create(
+                student=self.user,
+                course_id=self.course.id,
+                module_state_key=problem.location.url(),
+                state='{}',
+                grade=i,
+                max_grade=1,
+            )
+
+        module = self.get_sequence(position=2)
+        content = module.runtime.render(module, None, 'student_view').content
+        self.assertIn('progress-in_progress', content)
+
+    @patch.dict(settings.MITX_FEATURES, {'ENABLE_LAZY_SEQUENCE_RENDERING': True})
+    def test_render_item_dispatch(self):
+        request = RequestFactory().post('/', {'position': '3'})
+        request.user = self.user
+        request.session = {}
+        with patch.object(FieldDataCache, 'cache_for_descriptor_descendents',
+                          wraps=FieldDataCache.cache_for_descriptor_descendents) as mock_cache:
+            response = render.modx_dispatch(request, 'render_item', self.sequence.location.url(), self.course.id)
+
+        self.assertIn('Content 2', json.loads(response.content)['content'])
+        # The sequence and its items, then the subtree of the requested item only
+        self.assertEqual(mock_cache.call_args_list[0][1]['depth'], 1)
+        self.assertEqual(mock_cache.call_count, 2)
+        self.assertEqual(mock_cache.call_args_list[1][0][2].location, self.verticals[2].location)
+
+    def test_eager_by_default(self):
+        module = self.get_sequence()
+        self.assertFalse(module.render_lazily)
+        content = module.runtime.render(module, None, 'student_view').content
+        for i in xrange(3):
+            self.assertIn('Content {0}'.format(i), content)
@@ -4,14 +4,17 @@
 import json
 from textwrap import dedent
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.test.client import RequestFactory
 from django.core.urlresolvers import reverse
 from django.test.utils import override_settings
 
 # Need access to internal func to put users in the right group
-from courseware import grades
+from courseware import grade_cache, grades
 from courseware.model_data import FieldDataCache
+from courseware.models import StudentSectionGrade
+from mock import patch
 
 from xmodule.modulestore.django import modulestore, editable_modulestore
 
@@ -551,6 +554,102 @@ class TestCourseGrader(TestSubmittingProblems):
         self.assertEqual(self.score_for_hw('homework3'), [1.0, 1.0])
 
 
+@patch.dict(settings.MITX_FEATURES, {'ENABLE_PERSISTENT_GRADE_CACHE': True})
+class TestCourseGraderWithGradeCache(TestCourseGrader):
+    """
+    Run the course grader suite with persisted section totals, and check
+    that they are written, reused and invalidated.
+    """
+
+    def cached_totals(self):
+        """
+        Returns a dict of section url_name -> (earned, possible) from the grade cache.
+        """
+        return dict(
+            (row.section_key.split('/')[-1], (row.earned, row.possible))
+            for row in StudentSectionGrade.objects.filter(student=self.student_user, course_id=self.course.id)
+        )
+
+    def test_unseen_sections_not_cached(self):
+        self.basic_setup()
+        self.check_grade_percent(0)
+        self.assertEqual(self.cached_totals(), {})
+
+    def test_section_total_cached(self):
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+        self.assertEqual(self.cached_totals(), {'homework': (1.0, 3.0)})
+
+        # Grading again is answered from the cache
+        with patch('courseware.grades.get_score') as mock_get_score:
+            self.check_grade_percent(0.33)
+            self.assertFalse(mock_get_score.called)
+
+    def test_submission_invalidates_section(self):
+        self.dropping_setup()
+        self.dropping_homework_stage1()
+        self.check_grade_percent(0.75)
+        self.assertEqual(self.cached_totals(), {'homework1': (1.0, 2.0), 'homework2': (2.0, 2.0)})
+
+        self.submit_question_answer(self.hw1_names[1], {'2_1': 'Correct'})
+        self.assertEqual(self.cached_totals(), {'homework2': (2.0, 2.0)})
+        self.check_grade_percent(1.0)
+        self.assertEqual(self.cached_totals(), {'homework1': (2.0, 2.0), 'homework2': (2.0, 2.0)})
+
+    def test_structure_change_invalidates_section(self):
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+
+        # A new problem changes the section's version, so its cached total is ignored
+        self.add_dropdown_to_section(self.homework.location, 'p4', 1)
+        self.refresh_course()
+        self.check_grade_percent(0.25)
+        self.assertEqual(self.cached_totals(), {'homework': (1.0, 4.0)})
+
+    def test_content_change_invalidates_section(self):
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+
+        # p2 gains an input, so its max score goes from 1 to 2
+        prob_xml = OptionResponseXMLFactory().build_xml(
+            question_text='The correct answer is Correct',
+            num_inputs=2,
+            weight=2,
+            options=['Correct', 'Incorrect'],
+            correct_option='Correct'
+        )
+        editable_modulestore('direct').update_item(self.problem_location('p2'), prob_xml)
+        self.refresh_course()
+        self.check_grade_percent(0.25)
+        self.assertEqual(self.cached_totals(), {'homework': (1.0, 4.0)})
+
+    def test_submission_while_grading(self):
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        section = self.course.grading_context['graded_sections']['Homework'][0]
+
+        # A total computed from the state read before p1 was graded is not kept
+        grade_cache.set_section_grade(
+            self.student_user, self.course.id, section, grade_cache.section_version(section),
+            grade_cache.state_version([]), 0.0, 3.0
+        )
+        self.assertEqual(self.cached_totals(), {})
+        self.check_grade_percent(0.33)
+
+    def test_progress_caches_totals(self):
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.assertEqual(sorted(self.score_for_hw('homework')), [0.0, 0.0, 1.0])
+        self.assertEqual(self.cached_totals(), {'homework': (1.0, 3.0)})
+
+        with patch('courseware.grades.get_score') as mock_get_score:
+            self.check_grade_percent(0.33)
+            self.assertFalse(mock_get_score.called)
+
+
 class TestPythonGradedResponse(TestSubmittingProblems):
     """
     Check that we can submit a schematic and custom response, and it answers properly.
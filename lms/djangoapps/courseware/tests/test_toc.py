@@ -0,0 +1,81 @@
+"""
+Tests of courseware.toc
+"""
+from datetime import datetime, timedelta
+
+from django.test.utils import override_settings
+from django.utils.timezone import UTC
+from mock import patch
+
+from courseware.tests.factories import UserFactory
+from courseware.tests.modulestore_config import TEST_DATA_MIXED_MODULESTORE
+from courseware.toc import toc_skeleton, toc_for_user, build_toc_skeleton
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestTocSkeleton(ModuleStoreTestCase):
+    """
+    Check the contents and caching of TOC skeletons, and their per-user overlay.
+    """
+
+    def setUp(self):
+        course = CourseFactory.create()
+        self.chapter = ItemFactory.create(parent_location=course.location, category="chapter", display_name='Week 1')
+        ItemFactory.create(
+            parent_location=self.chapter.location,
+            category="sequential",
+            display_name='Homework',
+            metadata={'graded': True, 'format': 'Homework'},
+        )
+        tomorrow = datetime.now(UTC()) + timedelta(days=1)
+        ItemFactory.create(
+            parent_location=self.chapter.location,
+            category="sequential",
+            display_name='Next Week',
+            metadata={'start': tomorrow},
+        )
+        self.course = modulestore().get_instance(course.id, course.location)
+
+    def section_names(self, user):
+        """Names of the sections in the TOC of user"""
+        toc = toc_for_user(user, self.course.id, toc_skeleton(self.course), self.chapter.url_name, None)
+        return [section['display_name'] for chapter in toc for section in chapter['sections']]
+
+    def test_contents(self):
+        [chapter] = toc_skeleton(self.course)
+        self.assertEqual(chapter['display_name'], 'Week 1')
+        self.assertEqual([section['display_name'] for section in chapter['sections']], ['Homework', 'Next Week'])
+        self.assertEqual(chapter['sections'][0]['format'], 'Homework')
+        self.assertTrue(chapter['sections'][0]['graded'])
+
+    @patch.dict('django.conf.settings.MITX_FEATURES', {'DISABLE_START_DATES': False})
+    def test_start_dates(self):
+        self.assertEqual(self.section_names(UserFactory.create()), ['Homework'])
+        self.assertEqual(self.section_names(UserFactory.create(is_staff=True)), ['Homework', 'Next Week'])
+
+    def test_active(self):
+        [chapter] = toc_for_user(
+            UserFactory.create(), self.course.id, toc_skeleton(self.course), self.chapter.url_name, 'nope'
+        )
+        self.assertTrue(chapter['active'])
+        self.assertFalse(any(section['active'] for section in chapter['sections']))
+
+    def test_cached_until_course_changes(self):
+        with patch('courseware.toc.build_toc_skeleton', wraps=build_toc_skeleton) as mock_build:
+            toc_skeleton(self.course)
+            toc_skeleton(self.course)
+            self.assertEqual(mock_build.call_count, 1)
+
+            ItemFactory.create(parent_location=self.chapter.location, category="sequential", display_name='Extra')
+            [chapter] = toc_skeleton(self.course)
+            self.assertEqual(mock_build.call_count, 2)
+
+        self.assertEqual(len(chapter['sections']), 3)
+
+    def test_dynamic_children(self):
+        ItemFactory.create(parent_location=self.chapter.location, category="randomize")
+        course = modulestore().get_instance(self.course.id, self.course.location, depth=2)
+        self.assertIsNone(build_toc_skeleton(course))
@@ -19,7 +19,9 @@ from student.tests.factories import AdminFactory
 from mitxmako.middleware import MakoMiddleware
 
 from xmodule.modulestore.django import modulestore, clear_existing_modulestores
-from xmodule.modulestore.tests.factories import CourseFactory
+from xmodule.modulestore.search import path_to_location
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 
 import courseware.views as views
 from xmodule.modulestore import Location
@@ -67,6 +69,25 @@ class TestJumpTo(TestCase):
         self.assertEqual(response.status_code, 404)
 
 
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestPathToLocationCache(ModuleStoreTestCase):
+    """
+    Check that paths to locations are cached through the mixed modulestore.
+    """
+    def test_cached(self):
+        course = CourseFactory.create()
+        chapter = ItemFactory.create(parent_location=course.location, category='chapter')
+        section = ItemFactory.create(parent_location=chapter.location, category='sequential')
+        store = modulestore()
+        self.assertIsNotNone(store.get_course_cache(course.id))
+
+        path = path_to_location(store, course.id, section.location)
+        self.assertEqual(path[:3], (course.id, chapter.location.name, section.location.name))
+        with patch.object(store, 'get_parent_locations') as mock_get_parent_locations:
+            self.assertEqual(path_to_location(store, course.id, section.location), path)
+        self.assertFalse(mock_get_parent_locations.called)
+
+
 @override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
 class ViewsTestCase(TestCase):
     """ Tests for views.py methods. """
@@ -0,0 +1,173 @@
+"""
+A cached, descriptor-free table of contents of a course.
+
+module_render.toc_for_course() used to instantiate an XModule for the course,
+every chapter and every section on each courseware page view, only to list
+their display names, formats and due dates. The TOC skeleton keeps what the
+accordion needs, plus what access checks need, as plain (picklable) data:
+
+    [
+        {
+            'location': location url of the chapter,
+            'url_name': url_name,
+            'display_name': display name,
+            'start': start date or None,
+            'days_early_for_beta': days or None,
+            'sections': [
+                {
+                    'location', 'url_name', 'display_name', 'start', 'days_early_for_beta': as above,
+                    'format': format or '',
+                    'due': due date or None,
+                    'graded': bool,
+                },
+                ...
+            ],
+        },
+        ...
+    ]
+
+Chapters and sections hidden from the TOC are left out. The skeleton is built
+once per course version (see ModuleStore.get_course_version) and kept in the
+django cache, like the grading skeleton. toc_for_user() then only has to apply
+the user's access (start dates, beta testing, staff) and the active chapter
+and section.
+
+Courses whose TOC can differ between students (A/B tests, randomized
+children) or contains modules that failed to load have no skeleton.
+"""
+from collections import namedtuple
+import logging
+
+from django.core.cache import cache
+
+from courseware.access import has_access_to_summary
+from xmodule.error_module import ErrorDescriptor
+from xmodule.modulestore import Location
+from xmodule.modulestore.django import modulestore
+
+log = logging.getLogger(__name__)
+
+# How long a skeleton is kept in the django cache
+TOC_CACHE_TIMEOUT = 60 * 60 * 24
+
+# What access checks need to know about a chapter or section
+TocSummary = namedtuple('TocSummary', 'location start days_early_for_beta')
+
+
+def _toc_cache_key(course_id, version):
+    """Django cache key of the TOC skeleton of course_id at version"""
+    return u'courseware.toc.{0}.{1}'.format(course_id, version)
+
+
+def toc_skeleton(course):
+    """
+    Return the TOC skeleton of `course`, or None if it can't have one.
+
+    `course` only needs to be loaded with depth=0: on a cache miss, the course
+    is loaded down to its sections to build the skeleton.
+    """
+    version = modulestore().get_course_version(course.id)
+    if version is None:
+        if not hasattr(course, '_toc_skeleton'):
+            course._toc_skeleton = build_toc_skeleton(course)  # pylint: disable=protected-access
+        return course._toc_skeleton  # pylint: disable=protected-access
+
+    key = _toc_cache_key(course.id, version)
+    # a cached skeleton of None (no skeleton) is stored as False
+    skeleton = cache.get(key)
+    if skeleton is None:
+        log.debug("Building TOC skeleton of %s at version %s", course.id, version)
+        full_course = modulestore().get_instance(course.id, course.location, depth=2)
+        skeleton = build_toc_skeleton(full_course)
+        cache.set(key, skeleton if skeleton is not None else False, TOC_CACHE_TIMEOUT)
+    return skeleton or None
+
+
+def _summarize(descriptor):
+    """The fields of a chapter or section needed by every TOC entry"""
+    return {
+        'location': descriptor.location.url(),
+        'url_name': descriptor.url_name,
+        'display_name': descriptor.display_name_with_default,
+        'start': descriptor.start,
+        'days_early_for_beta': descriptor.days_early_for_beta,
+    }
+
+
+def build_toc_skeleton(course):
+    """
+    Compute the TOC skeleton of `course` from its descriptors, or return None
+    if the TOC depends on more than access.
+    """
+    def is_static(descriptor):
+        """True if the TOC entry of descriptor is the same for every student"""
+        return not (isinstance(descriptor, ErrorDescriptor) or descriptor.has_dynamic_children())
+
+    if not is_static(course):
+        return None
+
+    chapters = []
+    for chapter in course.get_children():
+        if not is_static(chapter):
+            return None
+        if chapter.hide_from_toc:
+            continue
+
+        sections = []
+        for section in chapter.get_children():
+            if not is_static(section):
+                return None
+            if section.hide_from_toc:
+                continue
+
+            entry = _summarize(section)
+            entry.update({
+                'format': section.format if section.format is not None else '',
+                'due': section.due,
+                'graded': section.graded,
+            })
+            sections.append(entry)
+
+        entry = _summarize(chapter)
+        entry['sections'] = sections
+        chapters.append(entry)
+
+    return chapters
+
+
+def _can_load(user, entry, course_id):
+    """Whether user can see the chapter or section of the TOC entry"""
+    summary = TocSummary(Location(entry['location']), entry['start'], entry['days_early_for_beta'])
+    return has_access_to_summary(user, summary, 'load', course_id)
+
+
+def toc_for_user(user, course_id, skeleton, active_chapter, active_section):
+    """
+    Return the table of contents of the course of `skeleton`, in the format
+    of module_render.toc_for_course(), with what `user` can see.
+    """
+    chapters = []
+    for chapter in skeleton:
+        if not _can_load(user, chapter, course_id):
+            continue
+
+        sections = []
+        for section in chapter['sections']:
+            if not _can_load(user, section, course_id):
+                continue
+            sections.append({
+                'display_name': section['display_name'],
+                'url_name': section['url_name'],
+                'format': section['format'],
+                'due': section['due'],
+                'active': chapter['url_name'] == active_chapter and section['url_name'] == active_section,
+                'graded': section['graded'],
+            })
+
+        chapters.append({
+            'display_name': chapter['display_name'],
+            'url_name': chapter['url_name'],
+            'sections': sections,
+            'active': chapter['url_name'] == active_chapter,
+        })
+    return chapters
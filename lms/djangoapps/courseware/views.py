@@ -373,9 +373,11 @@ def index(request, course_id, chapter=None, section=None,
             section_descriptor = modulestore().get_instance(course.id, section_descriptor.location, depth=None)
 
             # Load all descendants of the section, because we're going to display its
-            # html, which in general will need all of its children
+            # html, which in general will need all of its children. Sequences that only
+            # render their current tab just need the descendants of that tab.
+            render_lazily = settings.MITX_FEATURES.get('ENABLE_LAZY_SEQUENCE_RENDERING', False)
             section_field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
-                course_id, user, section_descriptor, depth=None)
+                course_id, user, section_descriptor, depth=1 if render_lazily else None)
 
             section_module = get_module_for_descriptor(request.user,
                 request,
@@ -390,6 +392,14 @@ def index(request, course_id, chapter=None, section=None,
                 # they don't have access to.
                 raise Http404
 
+            if render_lazily:
+                if getattr(section_module, 'render_lazily', False):
+                    active_item = section_module.get_active_item()
+                    if active_item is not None:
+                        section_field_data_cache.add_descriptor_descendents(active_item.descriptor)
+                else:
+                    section_field_data_cache.add_descriptor_descendents(section_descriptor)
+
             # Save where we are in the chapter
             save_child_position(chapter_module, section)
 
@@ -111,9 +111,12 @@ def inline_discussion(request, course_id, discussion_id):
     course = get_course_with_access(request.user, course_id, 'load_forum')
 
     try:
-        threads, query_params = get_threads(request, course_id, discussion_id, per_page=INLINE_THREADS_PER_PAGE)
+        # The user's info is fetched while the threads are
         cc_user = cc.User.from_django_user(request.user)
-        user_info = cc_user.to_dict()
+        (threads, query_params), user_info = cc.utils.perform_concurrently(
+            lambda: get_threads(request, course_id, discussion_id, per_page=INLINE_THREADS_PER_PAGE),
+            cc_user.to_dict,
+        )
     except (cc.utils.CommentClientError, cc.utils.CommentClientUnknownError):
         # TODO (vshnayder): since none of this code seems to be aware of the fact that
         # sometimes things go wrong, I suspect that the js client is also not
@@ -173,7 +176,12 @@ def forum_form_discussion(request, course_id):
     category_map = utils.get_discussion_category_map(course)
 
     try:
-        unsafethreads, query_params = get_threads(request, course_id)   # This might process a search query
+        # The user's info is fetched while the threads are
+        user = cc.User.from_django_user(request.user)
+        (unsafethreads, query_params), user_info = cc.utils.perform_concurrently(
+            lambda: get_threads(request, course_id),   # This might process a search query
+            user.to_dict,
+        )
         threads = [utils.safe_content(thread) for thread in unsafethreads]
     except cc.utils.CommentClientMaintenanceError:
         log.warning("Forum is in maintenance mode")
@@ -182,9 +190,6 @@ def forum_form_discussion(request, course_id):
         log.error("Error loading forum discussion threads: %s", str(err))
         raise Http404
 
-    user = cc.User.from_django_user(request.user)
-    user_info = user.to_dict()
-
     annotated_content_info = utils.get_metadata_for_threads(course_id, threads, request.user, user_info)
 
     for thread in threads:
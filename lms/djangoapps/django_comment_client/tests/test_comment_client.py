@@ -0,0 +1,75 @@
+"""
+Tests of the comments service client's request handling
+"""
+from django.test import TestCase
+from mock import patch, Mock
+import requests
+
+from comment_client import utils
+from comment_client import settings as cc_settings
+
+
+class PerformRequestTestCase(TestCase):
+    """
+    Check pooled requests, their retries and endpoint names.
+    """
+
+    def test_session_is_shared(self):
+        self.assertIs(utils.get_session(), utils.get_session())
+
+    def test_endpoint_name(self):
+        self.assertEqual(
+            utils.endpoint_name('get', cc_settings.PREFIX + '/threads/518d4237b023791dca00000d/comments'),
+            'get.threads.id.comments'
+        )
+        self.assertEqual(
+            utils.endpoint_name('post', cc_settings.PREFIX + '/i4x-MITx-999-course-Robot_Super_Course/threads'),
+            'post.id.threads'
+        )
+
+    @patch('comment_client.utils.time.sleep')
+    @patch('comment_client.utils.requests.Session.request')
+    def test_get_retried(self, mock_request, mock_sleep):
+        response = Mock(status_code=200, text='{"id": "1"}')
+        mock_request.side_effect = [requests.exceptions.ConnectionError('reset'), response]
+
+        self.assertEqual(utils.perform_request('get', cc_settings.PREFIX + '/users/1'), {'id': '1'})
+        self.assertEqual(mock_request.call_count, 2)
+        mock_sleep.assert_called_once_with(cc_settings.RETRY_BACKOFF)
+
+    @patch('comment_client.utils.time.sleep')
+    @patch('comment_client.utils.requests.Session.request')
+    def test_retries_exhausted(self, mock_request, _mock_sleep):
+        mock_request.side_effect = requests.exceptions.ConnectionError('down')
+        with self.assertRaises(utils.CommentClientError):
+            utils.perform_request('get', cc_settings.PREFIX + '/users/1')
+        self.assertEqual(mock_request.call_count, cc_settings.RETRIES + 1)
+
+    @patch('comment_client.utils.requests.Session.request')
+    def test_post_not_retried(self, mock_request):
+        mock_request.side_effect = requests.exceptions.ConnectionError('reset')
+        with self.assertRaises(utils.CommentClientError):
+            utils.perform_request('post', cc_settings.PREFIX + '/users', {'id': '1'})
+        self.assertEqual(mock_request.call_count, 1)
+
+
+class PerformConcurrentlyTestCase(TestCase):
+    """
+    Check that batches of calls return their results in order.
+    """
+
+    def test_results_in_order(self):
+        self.assertEqual(utils.perform_concurrently(lambda: 1, lambda: 2, lambda: 3), [1, 2, 3])
+
+    def test_errors_raised(self):
+        def fail():
+            raise utils.CommentClientError('failed')
+
+        with self.assertRaises(utils.CommentClientError):
+            utils.perform_concurrently(lambda: 1, fail)
+
+    def test_pool_reused(self):
+        utils.perform_concurrently(lambda: 1, lambda: 2)
+        pool = utils.get_pool()
+        utils.perform_concurrently(lambda: 1, lambda: 2)
+        self.assertIs(utils.get_pool(), pool)
@@ -3,19 +3,38 @@
 # django management command: dump grades to csv files
 # for use by batch processes
 
-from instructor.offline_gradecalc import offline_grade_calculation
+from optparse import make_option
+
+from instructor.offline_gradecalc import offline_grade_calculation, DEFAULT_SHARD_SIZE
 from courseware.courses import get_course_by_id
 from xmodule.modulestore.django import modulestore
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     help = "Compute grades for all students in a course, and store result in DB.\n"
-    help += "Usage: compute_grades course_id_or_dir \n"
+    help += "Usage: compute_grades course_id_or_dir [--workers N] [--shard-size N] [--resume RUN_ID]\n"
     help += "   course_id_or_dir: either course_id or course_dir\n"
     help += 'Example course_id: MITx/8.01rq_MW/Classical_Mechanics_Reading_Questions_Fall_2012_MW_Section'
 
+    option_list = BaseCommand.option_list + (
+        make_option('--workers',
+                    type='int',
+                    dest='workers',
+                    default=1,
+                    help='Number of worker processes grading shards in parallel'),
+        make_option('--shard-size',
+                    type='int',
+                    dest='shard_size',
+                    default=DEFAULT_SHARD_SIZE,
+                    help='Number of students per shard'),
+        make_option('--resume',
+                    dest='run_id',
+                    default=None,
+                    help='Run id of an interrupted run to continue'),
+    )
+
     def handle(self, *args, **options):
 
         print "args = ", args
@@ -26,6 +45,11 @@ class Command(BaseCommand):
             print self.help
             return
 
+        if options['shard_size'] <= 0:
+            raise CommandError("--shard-size must be positive")
+        if options['workers'] <= 0:
+            raise CommandError("--workers must be positive")
+
         try:
             course = get_course_by_id(course_id)
         except Exception as err:
@@ -40,4 +64,9 @@ class Command(BaseCommand):
         print "-----------------------------------------------------------------------------"
         print "Computing grades for %s" % (course.id)
 
-        offline_grade_calculation(course.id)
+        offline_grade_calculation(
+            course.id,
+            workers=options['workers'],
+            shard_size=options['shard_size'],
+            run_id=options['run_id'],
+        )
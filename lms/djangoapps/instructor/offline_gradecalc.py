@@ -4,14 +4,26 @@
 # be computed offline, by a batch process (eg cronjob).
 #
 # The grades are stored in the OfflineComputedGrade table of the courseware model.
+# Large courses can be split into shards of students graded by several worker processes; completed
+# shards are logged in OfflineComputedGradeLog, and the grades of each run are stored with its id so
+# that an interrupted run can be resumed.
 
 import json
+import multiprocessing
 import time
+import uuid
 
 from json import JSONEncoder
 from courseware import grades, models
+from courseware.bulk_grades import iterate_grades_for
 from courseware.courses import get_course_by_id
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from xmodule.modulestore.django import close_connections
+
+# Number of students graded and saved together
+DEFAULT_SHARD_SIZE = 1000
 
 
 class MyEncoder(JSONEncoder):
@@ -25,58 +37,134 @@ class MyEncoder(JSONEncoder):
             yield chunk
 
 
-def offline_grade_calculation(course_id):
+class DummyRequest(object):
+    """
+    Stand-in for the request that grading needs when XModules have to be created.
+    """
+    META = {}
+
+    def __init__(self):
+        self.user = None
+        self.session = {}
+
+    def get_host(self):
+        return 'edx.mit.edu'
+
+    def is_secure(self):
+        return False
+
+
+def offline_grade_calculation(course_id, workers=1, shard_size=DEFAULT_SHARD_SIZE, run_id=None):
     '''
     Compute grades for all students for a specified course, and save results to the DB.
+
+    Students are split into shards of `shard_size` consecutive user ids, which are
+    graded by a pool of `workers` processes.  Every completed shard is logged in
+    OfflineComputedGradeLog under `run_id`, and the grades are stored with it, so
+    passing the run_id of a run that was interrupted resumes it, skipping the
+    students it already graded.
     '''
+    if shard_size <= 0:
+        raise ValueError("shard_size must be positive, not %r" % shard_size)
 
     tstart = time.time()
-    enrolled_students = User.objects.filter(
+    if run_id is None:
+        run_id = uuid.uuid4().hex
+
+    student_ids = list(User.objects.filter(
         courseenrollment__course_id=course_id,
         courseenrollment__is_active=1
-    ).prefetch_related("groups").order_by('username')
-
-    enc = MyEncoder()
-
-    class DummyRequest(object):
-        META = {}
-        def __init__(self):
-            return
-        def get_host(self):
-            return 'edx.mit.edu'
-        def is_secure(self):
-            return False
-
-    print "%d enrolled students" % len(enrolled_students)
-    course = get_course_by_id(course_id)
-
-    for student in enrolled_students:
-        request = DummyRequest()
-        request.user = student
-        request.session = {}
-
-        gradeset = grades.grade(student, request, course, keep_raw_scores=True)
-        gs = enc.encode(gradeset)
-        ocg, created = models.OfflineComputedGrade.objects.get_or_create(user=student, course_id=course_id)
-        ocg.gradeset = gs
-        ocg.save()
-        print "%s done" % student  	# print statement used because this is run by a management command
+    ).order_by('id').values_list('id', flat=True))
+
+    print "%d enrolled students" % len(student_ids)
+    print "run id %s (pass it as --resume to continue this run if interrupted)" % run_id
+
+    completed = set(models.OfflineComputedGrade.objects.filter(
+        course_id=course_id,
+        run_id=run_id,
+    ).values_list('user_id', flat=True))
+    remaining = [student_id for student_id in student_ids if student_id not in completed]
+    shards = [remaining[i:i + shard_size] for i in xrange(0, len(remaining), shard_size)]
+    print "%d students left to grade in %d shards" % (len(remaining), len(shards))
+
+    jobs = [(course_id, run_id, shard) for shard in shards]
+    if workers > 1 and len(shards) > 1:
+        # Forked workers must not share the parent's database connection
+        connection.close()
+        pool = multiprocessing.Pool(workers, initializer=_init_worker)
+        try:
+            for result in pool.imap_unordered(_grade_shard_job, jobs):
+                print result  	# print statement used because this is run by a management command
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for job in jobs:
+            print _grade_shard_job(job)
 
     tend = time.time()
     dt = tend - tstart
 
-    ocgl = models.OfflineComputedGradeLog(course_id=course_id, seconds=dt, nstudents=len(enrolled_students))
+    ocgl = models.OfflineComputedGradeLog(course_id=course_id, seconds=dt, nstudents=len(student_ids), run_id=run_id)
     ocgl.save()
     print ocgl
     print "All Done!"
 
 
+def _init_worker():
+    '''
+    Open fresh connections to MongoDB and memcached in a worker of the pool, rather
+    than use the sockets inherited from the parent process.
+    '''
+    close_connections()
+    cache.close()
+
+
+def _grade_shard_job(args):
+    '''
+    Unpack the arguments of grade_shard, so that it can be run by multiprocessing.Pool.imap
+    '''
+    return grade_shard(*args)
+
+
+def grade_shard(course_id, run_id, student_ids):
+    '''
+    Compute and store the grades of the students with the given ids (sorted
+    ascending) as computed by run `run_id`, then log the shard as completed in
+    OfflineComputedGradeLog. Returns the log entry.
+    '''
+    tstart = time.time()
+    course = get_course_by_id(course_id)
+    students = User.objects.filter(id__in=student_ids).prefetch_related("groups").order_by('id')
+
+    enc = MyEncoder()
+    offline_grades = [
+        models.OfflineComputedGrade(user=student, course_id=course_id, gradeset=enc.encode(gradeset), run_id=run_id)
+        for student, gradeset in iterate_grades_for(course, students, DummyRequest(), keep_raw_scores=True)
+    ]
+
+    with transaction.commit_on_success():
+        models.OfflineComputedGrade.objects.filter(course_id=course_id, user__in=student_ids).delete()
+        models.OfflineComputedGrade.objects.bulk_create(offline_grades)
+
+        ocgl = models.OfflineComputedGradeLog(
+            course_id=course_id,
+            seconds=time.time() - tstart,
+            nstudents=len(offline_grades),
+            run_id=run_id,
+            first_user_id=student_ids[0],
+            last_user_id=student_ids[-1],
+        )
+        ocgl.save()
+    return ocgl
+
+
 def offline_grades_available(course_id):
     '''
     Returns False if no offline grades available for specified course.
     Otherwise returns latest log field entry about the available pre-computed grades.
     '''
-    ocgl = models.OfflineComputedGradeLog.objects.filter(course_id=course_id)
+    ocgl = models.OfflineComputedGradeLog.objects.filter(course_id=course_id, first_user_id__isnull=True)
     if not ocgl:
         return False
     return ocgl.latest('created')
@@ -98,3 +186,19 @@ def student_grades(student, request, course, keep_raw_scores=False, use_offline=
                     msg='Error: no offline gradeset available for %s, %s' % (student, course.id))
 
     return json.loads(ocg.gradeset)
+
+
+def iterate_student_grades(students, request, course, keep_raw_scores=False, use_offline=False):
+    '''
+    Yield (student, gradeset) for each of `students`, where gradeset is what
+    student_grades() would return.  Unless use_offline is True, the whole set of
+    students is graded in one batch (see courseware.bulk_grades), which is much
+    cheaper than calling student_grades() for each of them.
+    '''
+    if not use_offline:
+        for student, gradeset in iterate_grades_for(course, students, request, keep_raw_scores=keep_raw_scores):
+            yield student, gradeset
+        return
+
+    for student in students:
+        yield student, student_grades(student, request, course, keep_raw_scores=keep_raw_scores, use_offline=True)
@@ -0,0 +1,72 @@
+"""
+Tests of sharded offline grade calculation
+"""
+import json
+
+from django.test import TestCase
+from mock import patch
+
+from courseware.models import OfflineComputedGrade, OfflineComputedGradeLog
+from instructor.offline_gradecalc import offline_grade_calculation, offline_grades_available
+from student.tests.factories import UserFactory, CourseEnrollmentFactory
+
+COURSE_ID = 'edX/test/offline'
+
+
+def fake_grades(course, students, request, keep_raw_scores=False):  # pylint: disable=unused-argument
+    """Grade every student by their user id"""
+    for student in students:
+        yield student, {'percent': student.id}
+
+
+@patch('instructor.offline_gradecalc.get_course_by_id')
+@patch('instructor.offline_gradecalc.iterate_grades_for', side_effect=fake_grades)
+class TestOfflineGradeCalculation(TestCase):
+    """
+    Check that students are graded in shards that are logged and can be resumed.
+    """
+
+    def setUp(self):
+        self.users = [UserFactory.create() for _ in xrange(5)]
+        for user in self.users:
+            CourseEnrollmentFactory.create(user=user, course_id=COURSE_ID)
+
+    def shard_logs(self, run_id):
+        """Returns the (first, last, nstudents) of logged shards for run_id"""
+        return sorted(
+            OfflineComputedGradeLog.objects.filter(
+                course_id=COURSE_ID, run_id=run_id, first_user_id__isnull=False
+            ).values_list('first_user_id', 'last_user_id', 'nstudents')
+        )
+
+    def test_sharded_run(self, mock_iterate_grades, _mock_get_course):
+        offline_grade_calculation(COURSE_ID, shard_size=2, run_id='run1')
+
+        ids = [user.id for user in self.users]
+        self.assertEqual(self.shard_logs('run1'), [(ids[0], ids[1], 2), (ids[2], ids[3], 2), (ids[4], ids[4], 1)])
+        self.assertEqual(mock_iterate_grades.call_count, 3)
+        for user in self.users:
+            ocg = OfflineComputedGrade.objects.get(user=user, course_id=COURSE_ID)
+            self.assertEqual(json.loads(ocg.gradeset), {'percent': user.id})
+
+        # Only the whole-run entry is reported to instructors
+        latest = offline_grades_available(COURSE_ID)
+        self.assertIsNone(latest.first_user_id)
+        self.assertEqual(latest.nstudents, 5)
+
+    def test_resume(self, mock_iterate_grades, _mock_get_course):
+        ids = [user.id for user in self.users]
+        # ids[1] enrolled after the interrupted run graded ids[0] and ids[2]
+        for user in (self.users[0], self.users[2]):
+            OfflineComputedGrade.objects.create(user=user, course_id=COURSE_ID, gradeset='{}', run_id='run2')
+        offline_grade_calculation(COURSE_ID, shard_size=10, run_id='run2')
+
+        self.assertEqual(mock_iterate_grades.call_count, 1)
+        graded = [student.id for student in mock_iterate_grades.call_args[0][1]]
+        self.assertEqual(graded, [ids[1], ids[3], ids[4]])
+        self.assertEqual(OfflineComputedGrade.objects.filter(course_id=COURSE_ID, run_id='run2').count(), 5)
+
+    def test_invalid_shard_size(self, mock_iterate_grades, _mock_get_course):
+        with self.assertRaises(ValueError):
+            offline_grade_calculation(COURSE_ID, shard_size=0)
+        self.assertFalse(mock_iterate_grades.called)
@@ -182,6 +182,22 @@ MITX_FEATURES = {
 
     # Automatically approve student identity verification attempts
     'AUTOMATIC_VERIFY_STUDENT_IDENTITY_FOR_TESTING': False,
+
+    # Persist per-section grade totals (courseware.grade_cache) so that grading
+    # a student only recomputes sections whose scores have changed
+    'ENABLE_PERSISTENT_GRADE_CACHE': False,
+
+    # Keep the names of each user's groups, used for access checks, in the
+    # django cache across requests (they are always cached within a request)
+    'CACHE_ACCESS_GROUP_NAMES': False,
+
+    # Only render the current tab of sequences with the courseware page; the
+    # others are fetched when the student switches to them
+    'ENABLE_LAZY_SEQUENCE_RENDERING': False,
+
+    # Build the courseware accordion from a cached table of contents of the
+    # course, without creating XModules for its chapters and sections
+    'ENABLE_CACHED_TOC': False,
 }
 
 # Used for A/B testing
@@ -345,6 +361,12 @@ if MITX_FEATURES.get('ENABLE_SQL_TRACKING_LOGS'):
         }
     })
 
+# Deliver events to the tracking backends in batches, from a background
+# thread, instead of during the request; see track.batching for the options.
+TRACKING_ASYNC = {
+    'ENABLED': False,
+}
+
 # We're already logging events, and we don't want to capture user
 # names/passwords.  Heartbeat events are likely not interesting.
 TRACKING_IGNORE_URL_PATTERNS = [r'^/event', r'^/login', r'^/heartbeat']
@@ -366,6 +388,10 @@ MODULESTORE = {
 }
 CONTENTSTORE = None
 
+# Large assets served from the contentstore can be cached on local disk,
+# see contentserver.disk_cache
+ASSET_DISK_CACHE = None
+
 # Should we initialize the modulestores at startup, or wait until they are
 # needed?
 INIT_MODULESTORE_ON_STARTUP = True
@@ -389,6 +415,13 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # How many warm sandboxed workers each process keeps to run capa code,
+    # 0 meaning a new sandbox for each execution. See capa/safe_exec/pool.py
+    'pool_size': 0,
+    # How many seconds code run by the workers can take, if there is no
+    # REALTIME limit
+    'pool_timeout': 10,
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
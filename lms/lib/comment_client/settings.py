@@ -11,3 +11,14 @@ if hasattr(settings, "COMMENTS_SERVICE_KEY"):
     API_KEY = settings.COMMENTS_SERVICE_KEY
 else:
     API_KEY = "PUT_YOUR_API_KEY_HERE"
+
+# Number of keep-alive connections to the comments service kept by each process
+POOL_SIZE = getattr(settings, "COMMENTS_SERVICE_POOL_SIZE", 10)
+
+# Seconds to wait for the comments service to respond
+TIMEOUT = getattr(settings, "COMMENTS_SERVICE_TIMEOUT", 5)
+
+# GET requests whose connection fails are retried up to RETRIES times, waiting
+# RETRY_BACKOFF seconds before the first retry and twice as long before each next one
+RETRIES = getattr(settings, "COMMENTS_SERVICE_RETRIES", 2)
+RETRY_BACKOFF = getattr(settings, "COMMENTS_SERVICE_RETRY_BACKOFF", 0.1)
@@ -1,11 +1,34 @@
 from dogapi import dog_stats_api
 import json
 import logging
+from multiprocessing.pool import ThreadPool
+import os
+import threading
+import time
+import urlparse
+
 import requests
+from requests.adapters import HTTPAdapter
 import settings
 
 log = logging.getLogger(__name__)
 
+# Path segments of the comments service api that name resources; all other
+# segments are ids, which are left out of the endpoint names used for timing
+ENDPOINT_NAMES = frozenset([
+    'users', 'comments', 'threads', 'commentables', 'search', 'tags', 'votes',
+    'subscriptions', 'active_threads', 'subscribed_threads', 'stats', 'abuse_flag',
+    'abuse_unflag', 'pin', 'unpin', 'more_like_this', 'recent_active', 'trending',
+    'autocomplete',
+])
+
+_session = None
+_session_lock = threading.Lock()
+
+# (pid, pool) of the worker threads of perform_concurrently
+_pool = (None, None)
+_pool_lock = threading.Lock()
+
 
 def strip_none(dic):
     return dict([(k, v) for k, v in dic.iteritems() if v is not None])
@@ -28,16 +51,86 @@ def merge_dict(dic1, dic2):
     return dict(dic1.items() + dic2.items())
 
 
+def get_session():
+    """
+    Returns the process-wide requests Session used to talk to the comments
+    service, which keeps up to settings.POOL_SIZE connections alive.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def get_pool():
+    """
+    Returns the process-wide pool of settings.POOL_SIZE threads running
+    perform_concurrently's calls. A forked process (whose copy of the pool
+    has no threads) starts its own.
+    """
+    global _pool
+    pid, pool = _pool
+    if pid != os.getpid():
+        with _pool_lock:
+            pid, pool = _pool
+            if pid != os.getpid():
+                pool = ThreadPool(settings.POOL_SIZE)
+                _pool = (os.getpid(), pool)
+    return pool
+
+
+def endpoint_name(method, url):
+    """
+    Name of the api endpoint of a request, e.g. 'get.threads.id.comments', for
+    the per-endpoint timing of requests.
+    """
+    path = urlparse.urlparse(url).path
+    prefix_path = urlparse.urlparse(settings.PREFIX).path
+    if path.startswith(prefix_path):
+        path = path[len(prefix_path):]
+    segments = [
+        segment if segment in ENDPOINT_NAMES else 'id'
+        for segment in path.strip('/').split('/') if segment
+    ]
+    return '.'.join([method] + segments)
+
+
+def _send_request(method, url, data_or_params):
+    """
+    Send a request over the pooled session. Requests that can safely be
+    repeated are retried, with exponential backoff, when the connection fails
+    (for instance when the service closed a kept-alive connection).
+    """
+    attempt = 0
+    while True:
+        try:
+            if method in ['post', 'put', 'patch']:
+                return get_session().request(method, url, data=data_or_params, timeout=settings.TIMEOUT)
+            else:
+                return get_session().request(method, url, params=data_or_params, timeout=settings.TIMEOUT)
+        except requests.exceptions.ConnectionError:
+            if method != 'get' or attempt >= settings.RETRIES:
+                raise
+            delay = settings.RETRY_BACKOFF * (2 ** attempt)
+            log.info("Connection to the comments service failed, retrying %s %s in %ss", method, url, delay)
+            time.sleep(delay)
+            attempt += 1
+
+
 def perform_request(method, url, data_or_params=None, *args, **kwargs):
     if data_or_params is None:
         data_or_params = {}
     data_or_params['api_key'] = settings.API_KEY
+    endpoint = endpoint_name(method, url)
     try:
-        with dog_stats_api.timer('comment_client.request.time'):
-            if method in ['post', 'put', 'patch']:
-                response = requests.request(method, url, data=data_or_params, timeout=5)
-            else:
-                response = requests.request(method, url, params=data_or_params, timeout=5)
+        with dog_stats_api.timer('comment_client.request.time', tags=['endpoint:{0}'.format(endpoint)]):
+            response = _send_request(method, url, data_or_params)
     except Exception as err:
         # remove API key if it is in the params
         if 'api_key' in data_or_params:
@@ -62,6 +155,27 @@ def perform_request(method, url, data_or_params=None, *args, **kwargs):
             return json.loads(response.text)
 
 
+def perform_concurrently(*calls):
+    """
+    Run each of `calls`, functions of no arguments, and return the list of
+    their results, in order.
+
+    The first call runs in the calling thread; the others run at the same time
+    in the threads of get_pool(), sharing the pooled connections to the
+    comments service, so a batch of independent requests takes about as long
+    as the slowest one. As worker threads don't share the caller's database
+    connection, only the first call may use the database.
+
+    If any call raises, the exception of the first failing call is re-raised.
+    """
+    if len(calls) <= 1:
+        return [call() for call in calls]
+
+    async_results = [get_pool().apply_async(call) for call in calls[1:]]
+    first = calls[0]()
+    return [first] + [result.get() for result in async_results]
+
+
 class CommentClientError(Exception):
     def __init__(self, msg):
         self.message = msg
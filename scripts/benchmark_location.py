@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark of creating Locations and formatting their urls, comparing
+the validating parser, interned construction and Location.from_trusted().
+
+Usage: python scripts/benchmark_location.py [--number N]
+"""
+
+import argparse
+import timeit
+
+from xmodule.modulestore import Location
+
+URL = 'i4x://MITx/6.002x/problem/Sample_Algebraic_Problem'
+FIELDS = ['i4x', 'MITx', '6.002x', 'problem', 'Sample_Algebraic_Problem', None]
+SON = dict(zip(Location._fields, FIELDS))
+LOCATION = Location(URL)
+
+CASES = [
+    ('parse url (uncached)', lambda: Location._parse(URL)),
+    ('Location(url) (interned)', lambda: Location(URL)),
+    ('parse dict (uncached)', lambda: Location._parse(SON)),
+    ('Location(dict) (interned)', lambda: Location(SON)),
+    ('Location.from_trusted(dict)', lambda: Location.from_trusted(SON)),
+    ('url() (uncached)', LOCATION._build_url),
+    ('url() (cached)', LOCATION.url),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time Location construction")
+    parser.add_argument('--number', type=int, default=100000, help="calls per case")
+    args = parser.parse_args()
+
+    for name, case in CASES:
+        best = min(timeit.repeat(case, number=args.number, repeat=3))
+        print("{0:<32} {1:8.3f} us/call".format(name, best / args.number * 1e6))
+
+
+if __name__ == '__main__':
+    main()